@@ -0,0 +1,200 @@
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import numpy as np
+
+# Type codes of the columnar layout; anything else is counted as "other"
+TRANSACTION_TYPES = ("income", "expense", "investment", "other")
+TYPE_CODES = {name: code for code, name in enumerate(TRANSACTION_TYPES)}
+INCOME, EXPENSE, INVESTMENT, OTHER = range(len(TRANSACTION_TYPES))
+
+# Only these fields are fetched from storage for analytics
+RECORD_FIELDS = ("date", "amount", "transaction_type", "category")
+
+class RecordColumns:
+    """A user's records as parallel NumPy arrays.
+
+    ``months`` holds months since year 0 (year * 12 + month - 1), the
+    granularity every report below works at; ``categories`` maps category
+    codes back to names.
+    """
+
+    __slots__ = ("months", "amounts", "types", "category_codes", "categories")
+
+    def __init__(self, months: np.ndarray, amounts: np.ndarray, types: np.ndarray,
+                 category_codes: np.ndarray, categories: List[str]):
+        self.months = months
+        self.amounts = amounts
+        self.types = types
+        self.category_codes = category_codes
+        self.categories = categories
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+async def load_columns(records: AsyncIterator[Dict[str, Any]]) -> RecordColumns:
+    """Build columns from streamed records without keeping the records around"""
+    months: List[int] = []
+    amounts: List[float] = []
+    types: List[int] = []
+    category_codes: List[int] = []
+    categories: Dict[str, int] = {}
+    async for record in records:
+        date = record["date"]
+        if isinstance(date, str):
+            date = datetime.fromisoformat(date)
+        months.append(month_index(date))
+        amounts.append(record.get("amount") or 0.0)
+        types.append(TYPE_CODES.get(record.get("transaction_type"), OTHER))
+        category = record.get("category") or ""
+        code = categories.get(category)
+        if code is None:
+            code = categories[category] = len(categories)
+        category_codes.append(code)
+    return RecordColumns(
+        np.array(months, dtype=np.int32),
+        np.array(amounts, dtype=np.float64),
+        np.array(types, dtype=np.int8),
+        np.array(category_codes, dtype=np.int32),
+        list(categories)
+    )
+
+def month_label(month_index: int) -> str:
+    return f"{month_index // 12:04d}-{month_index % 12 + 1:02d}"
+
+def _round(values: np.ndarray) -> List[Optional[float]]:
+    """2-decimal floats for JSON, with NaN (undefined ratios) as null"""
+    rounded = np.round(values, 2)
+    return [None if np.isnan(value) else float(value) for value in rounded]
+
+def month_index(value: datetime) -> int:
+    return value.year * 12 + value.month - 1
+
+def _month_span(columns: RecordColumns, first_month: Optional[int], last_month: Optional[int]):
+    if first_month is None:
+        first_month = int(columns.months.min())
+    if last_month is None:
+        last_month = int(columns.months.max())
+    return first_month, last_month - first_month + 1
+
+def _monthly_totals(columns: RecordColumns, first_month: Optional[int], last_month: Optional[int]):
+    """Totals per (month, type) for every month in the span, empty months included"""
+    first, span = _month_span(columns, first_month, last_month)
+    cells = (columns.months - first).astype(np.int64) * len(TRANSACTION_TYPES) + columns.types
+    totals = np.bincount(cells, weights=columns.amounts, minlength=span * len(TRANSACTION_TYPES))
+    return first, totals.reshape(span, len(TRANSACTION_TYPES))
+
+def cash_flow_report(columns: RecordColumns, window: int = 3, first_month: Optional[int] = None,
+                     last_month: Optional[int] = None) -> Dict[str, Any]:
+    """Monthly cash flow with rolling net, savings rate and month-over-month deltas.
+
+    net cash flow = income - expense - investment (cash left over)
+    savings rate  = (income - expense) / income (investments count as saved)
+
+    Months run from ``first_month`` to ``last_month`` (month indexes, see
+    month_index()) when given, otherwise over the span of the records.
+    """
+    if len(columns) == 0 and (first_month is None or last_month is None):
+        return {
+            "window": window,
+            "months": [],
+            "totals": {
+                "income": 0.0,
+                "expense": 0.0,
+                "investment": 0.0,
+                "net": 0.0,
+                "savings_rate": None,
+                "records": 0
+            }
+        }
+
+    first, totals = _monthly_totals(columns, first_month, last_month)
+    income, expense, investment = totals[:, INCOME], totals[:, EXPENSE], totals[:, INVESTMENT]
+    net = income - expense - investment
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        savings_rate = np.where(income > 0, (income - expense) / income, np.nan)
+
+    # Trailing mean over up to ``window`` months, shorter at the start
+    cumulative = np.concatenate(([0.0], np.cumsum(net)))
+    ends = np.arange(1, len(net) + 1)
+    starts = np.maximum(ends - window, 0)
+    rolling_net = (cumulative[ends] - cumulative[starts]) / (ends - starts)
+
+    previous = np.concatenate(([np.nan], net[:-1]))
+    net_delta = net - previous
+    with np.errstate(divide="ignore", invalid="ignore"):
+        net_delta_pct = np.where(np.abs(previous) > 0, net_delta / np.abs(previous), np.nan)
+    income_delta = np.diff(income, prepend=np.nan)
+    expense_delta = np.diff(expense, prepend=np.nan)
+
+    labels = [month_label(first + offset) for offset in range(len(net))]
+    columns_out = {
+        "income": _round(income),
+        "expense": _round(expense),
+        "investment": _round(investment),
+        "net": _round(net),
+        "rolling_net": _round(rolling_net),
+        "savings_rate": _round(savings_rate * 100),
+        "income_delta": _round(income_delta),
+        "expense_delta": _round(expense_delta),
+        "net_delta": _round(net_delta),
+        "net_delta_pct": _round(net_delta_pct * 100)
+    }
+    total_income = float(income.sum())
+    total_expense = float(expense.sum())
+    return {
+        "window": window,
+        "months": [
+            {"month": label, **{name: values[index] for name, values in columns_out.items()}}
+            for index, label in enumerate(labels)
+        ],
+        "totals": {
+            "income": round(total_income, 2),
+            "expense": round(total_expense, 2),
+            "investment": round(float(investment.sum()), 2),
+            "net": round(float(net.sum()), 2),
+            "savings_rate": round((total_income - total_expense) / total_income * 100, 2) if total_income else None,
+            "records": len(columns)
+        }
+    }
+
+def category_report(columns: RecordColumns, by_month: bool = False) -> Dict[str, Any]:
+    """Totals per category and transaction type, with each category's share of its type"""
+    if len(columns) == 0:
+        return {"categories": []}
+
+    n_types = len(TRANSACTION_TYPES)
+    n_categories = len(columns.categories)
+    cells = columns.category_codes.astype(np.int64) * n_types + columns.types
+    totals = np.bincount(cells, weights=columns.amounts, minlength=n_categories * n_types).reshape(n_categories, n_types)
+    counts = np.bincount(cells, minlength=n_categories * n_types).reshape(n_categories, n_types)
+    type_totals = totals.sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        shares = np.where(type_totals > 0, totals / type_totals * 100, np.nan)
+
+    if by_month:
+        first, span = _month_span(columns, None, None)
+        month_cells = columns.category_codes.astype(np.int64) * span + (columns.months - first)
+        monthly = np.bincount(month_cells, weights=columns.amounts, minlength=n_categories * span)
+        monthly = monthly.reshape(n_categories, span)
+
+    categories = []
+    # Largest categories first
+    for code in np.argsort(-totals.sum(axis=1), kind="stable"):
+        types = {
+            TRANSACTION_TYPES[type_code]: {
+                "total": round(float(totals[code, type_code]), 2),
+                "count": int(counts[code, type_code]),
+                "share": _round(shares[code, type_code:type_code + 1])[0]
+            }
+            for type_code in np.flatnonzero(counts[code])
+        }
+        entry = {"category": columns.categories[code], "total": round(float(totals[code].sum()), 2), "types": types}
+        if by_month:
+            entry["months"] = {
+                month_label(first + offset): round(float(monthly[code, offset]), 2)
+                for offset in np.flatnonzero(monthly[code])
+            }
+        categories.append(entry)
+    return {"categories": categories}
@@ -0,0 +1,9 @@
+"""
+Offline benchmark suite for the Finance App API.
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.compare baseline.json results.json
+
+Everything runs in-process against the memory storage backend unless
+--base-url points the load generator at a running server.
+"""
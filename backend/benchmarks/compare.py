@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Compare two benchmark result files
+Usage: python -m benchmarks.compare baseline.json candidate.json [--metric p95_ms] [--threshold 0.1]
+"""
+
+import argparse
+import json
+import sys
+
+def compare(baseline, candidate, metric, threshold):
+    """Yield (name, old, new, change) for every benchmark present in both files"""
+    for suite in ("micro", "load"):
+        for name, old in baseline.get(suite, {}).items():
+            new = candidate.get(suite, {}).get(name)
+            if new is None or old.get(metric) is None or new.get(metric) is None:
+                continue
+            change = (new[metric] - old[metric]) / old[metric] if old[metric] else 0.0
+            yield f"{suite}.{name}", old[metric], new[metric], change
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare benchmark results")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--metric", default="p95_ms")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative slowdown reported as a regression")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    regressions = 0
+    for name, old, new, change in compare(baseline, candidate, args.metric, args.threshold):
+        flag = ""
+        if change > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{name:60} {old:>12.3f} {new:>12.3f} {change:>+8.1%}{flag}")
+    print(f"{regressions} regression(s) above {args.threshold:.0%} in {args.metric}")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
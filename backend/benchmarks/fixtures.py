@@ -0,0 +1,56 @@
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+RISK_LEVELS = ("Low", "Moderate", "High")
+HORIZONS = ("Short", "Medium", "Long")
+TRANSACTION_TYPES = ("income", "expense", "investment")
+CATEGORIES = ("salary", "rent", "food", "travel", "utilities", "mutual_funds", "stocks")
+
+def user_profile(rng: random.Random) -> Dict[str, Any]:
+    """Request payload for UserProfile (field aliases, as the frontend sends it)"""
+    monthly_income = rng.randrange(20000, 400000, 1000)
+    monthly_expenses = int(monthly_income * rng.uniform(0.3, 0.9))
+    return {
+        "name": "Benchmark User",
+        "age": rng.randint(21, 60),
+        "gender": rng.choice(("male", "female")),
+        "occupation": "engineer",
+        "maritalStatus": rng.choice(("single", "married")),
+        "numberOfDependents": rng.randint(0, 4),
+        "annualIncome": monthly_income * 12,
+        "monthlyIncome": monthly_income,
+        "monthlyExpenses": monthly_expenses,
+        "currentNetWorth": rng.randrange(0, 10000000, 1000),
+        "investedAsset": rng.randrange(0, 5000000, 1000),
+        "riskTakingAbility": rng.choice(RISK_LEVELS),
+        "preferredInvestmentHorizon": rng.choice(HORIZONS),
+        "primaryFinancialGoal": "retirement",
+        "goalTimelineYears": rng.randint(5, 35),
+        "monthlySurplus": monthly_income - monthly_expenses,
+        "startingPrincipal": rng.randrange(0, 2000000, 1000),
+        "liquidityPreference": rng.choice(("Low", "Medium", "High")),
+        "loan": rng.choice((0, 0, rng.randrange(100000, 5000000, 1000))),
+        "insurance": rng.choice((0, rng.randrange(500000, 20000000, 1000)))
+    }
+
+def profile_inputs(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Predictor input for a UserProfile payload (snake_case field names)"""
+    from models.schemas import UserProfile
+    return UserProfile(**payload).dict()
+
+def finance_record(rng: random.Random, user_id: str) -> Dict[str, Any]:
+    """Request payload for FinanceRecord"""
+    date = datetime(2024, 1, 1) + timedelta(days=rng.randint(0, 364), seconds=rng.randint(0, 86399))
+    return {
+        "user_id": user_id,
+        "transaction_type": rng.choice(TRANSACTION_TYPES),
+        "amount": round(rng.uniform(10, 100000), 2),
+        "category": rng.choice(CATEGORIES),
+        "description": "benchmark",
+        "date": date.isoformat()
+    }
+
+def user_profiles(seed: int, count: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    return [user_profile(rng) for _ in range(count)]
@@ -0,0 +1,155 @@
+import asyncio
+import random
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from benchmarks.fixtures import finance_record, user_profiles
+from benchmarks.timing import summarize
+
+@dataclass
+class Scenario:
+    """One endpoint under load; ``request(i)`` returns (method, path, kwargs) for call i"""
+    name: str
+    request: Callable[[int], tuple]
+    requests: int
+
+def build_scenarios(state: Dict[str, Any], seed: int, scale: float = 1.0) -> List[Scenario]:
+    rng = random.Random(seed)
+    users = state["user_ids"]
+    records = state["record_ids"]
+    profiles = user_profiles(seed, 200)
+    batch = {"user_profiles": profiles[:100], "prediction_type": "retirement"}
+
+    def count(n: int) -> int:
+        return max(1, int(n * scale))
+
+    def create_record(i):
+        return "POST", "/api/finance/", {"json": finance_record(rng, users[i % len(users)])}
+
+    def update_record(i):
+        record_id = records[i % len(records)]
+        return "PUT", f"/api/finance/{record_id}", {"json": finance_record(rng, state["owners"][record_id])}
+
+    return [
+        Scenario("finance.create", create_record, count(2000)),
+        Scenario("finance.get", lambda i: ("GET", f"/api/finance/{records[i % len(records)]}", {}), count(2000)),
+        Scenario("finance.list_user", lambda i: (
+            "GET", f"/api/finance/user/{users[i % len(users)]}", {"params": {"limit": 100}}
+        ), count(1000)),
+        Scenario("finance.summary", lambda i: ("GET", f"/api/finance/user/{users[i % len(users)]}/summary", {}),
+                 count(1000)),
+        Scenario("finance.update", update_record, count(1000)),
+        Scenario("users.get", lambda i: ("GET", f"/api/users/{users[i % len(users)]}", {}), count(2000)),
+        Scenario("users.update", lambda i: (
+            "PUT", f"/api/users/{users[i % len(users)]}", {"json": profiles[i % len(profiles)]}
+        ), count(1000)),
+        # 200 distinct profiles, so the prediction cache warms up during the run
+        Scenario("predict.combined", lambda i: (
+            "POST", "/api/predict/combined", {"json": profiles[i % len(profiles)]}
+        ), count(2000)),
+        Scenario("predict.retirement", lambda i: (
+            "POST", "/api/predict/retirement", {"json": profiles[i % len(profiles)]}
+        ), count(1000)),
+        Scenario("predict.investment", lambda i: (
+            "POST", "/api/predict/investment", {"json": profiles[i % len(profiles)]}
+        ), count(1000)),
+        Scenario("predict.risk_assessment", lambda i: (
+            "POST", "/api/predict/risk-assessment", {"json": profiles[i % len(profiles)]}
+        ), count(1000)),
+        Scenario("predict.retirement_montecarlo", lambda i: (
+            "POST", "/api/predict/retirement",
+            {"json": profiles[i % len(profiles)], "params": {"mode": "montecarlo", "paths": 2000, "seed": seed}}
+        ), count(100)),
+        Scenario("predict.batch_100", lambda i: ("POST", "/api/predict/batch", {"json": batch}), count(100)),
+        Scenario("finance.delete", lambda i: ("DELETE", f"/api/finance/{records[i % len(records)]}", {}),
+                 count(500)),
+    ]
+
+@asynccontextmanager
+async def api_client(base_url: Optional[str]) -> AsyncIterator[Any]:
+    """HTTP client for a running server, or for the app served in-process"""
+    import httpx
+
+    if base_url:
+        async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+            yield client
+        return
+
+    from main import app
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=60) as client:
+            yield client
+
+async def seed_data(client, seed: int, users: int, records_per_user: int) -> Dict[str, Any]:
+    """Create the users and finance records the scenarios read and update"""
+    rng = random.Random(seed)
+    profiles = user_profiles(seed + 1, users)
+    state: Dict[str, Any] = {"user_ids": [], "record_ids": [], "owners": {}}
+    for index, profile in enumerate(profiles):
+        user_id = f"bench-user-{index}"
+        response = await client.post("/api/users/", params={"user_id": user_id}, json=profile)
+        response.raise_for_status()
+        state["user_ids"].append(user_id)
+        for _ in range(records_per_user):
+            response = await client.post("/api/finance/", json=finance_record(rng, user_id))
+            response.raise_for_status()
+            record_id = response.json()["id"]
+            state["record_ids"].append(record_id)
+            state["owners"][record_id] = user_id
+    return state
+
+async def run_scenario(client, scenario: Scenario, concurrency: int) -> Dict[str, Any]:
+    """Latencies and throughput of the 2xx responses, plus the share of failures.
+
+    Rejected and failed requests are usually the fastest ones, so they are
+    kept out of the percentiles and reported as ``error_rate`` instead.
+    """
+    samples: List[float] = []
+    statuses: Counter = Counter()
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index
+        while next_index < scenario.requests:
+            index = next_index
+            next_index += 1
+            method, path, kwargs = scenario.request(index)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+            except Exception as e:
+                statuses[type(e).__name__] += 1
+                continue
+            elapsed = time.perf_counter() - started
+            statuses[str(response.status_code)] += 1
+            if response.is_success:
+                samples.append(elapsed)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result = summarize(samples, time.perf_counter() - started)
+    errors = scenario.requests - len(samples)
+    result["requests"] = scenario.requests
+    result["errors"] = errors
+    result["error_rate"] = round(errors / scenario.requests, 4)
+    result["statuses"] = dict(sorted(statuses.items()))
+    return result
+
+async def run_load(base_url: Optional[str] = None, concurrency: int = 16, seed: int = 42,
+                   scale: float = 1.0, users: int = 50, records_per_user: int = 40,
+                   only: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    async with api_client(base_url) as client:
+        state = await seed_data(client, seed, users, records_per_user)
+        for scenario in build_scenarios(state, seed, scale):
+            if only and not any(scenario.name.startswith(prefix) for prefix in only):
+                continue
+            results[scenario.name] = await run_scenario(client, scenario, concurrency)
+            result = results[scenario.name]
+            print(f"  {scenario.name}: {result.get('throughput_per_s')} req/s, "
+                  f"p99 {result.get('p99_ms')} ms, errors {result['error_rate']:.1%}")
+    return results
@@ -0,0 +1,75 @@
+import random
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+from benchmarks.fixtures import finance_record, profile_inputs, user_profiles
+from benchmarks.timing import time_calls
+from models import schemas
+
+def predictor_cases(seed: int) -> List[Tuple[str, Callable[[], Any], int]]:
+    """(name, call, iterations) for every public FinancialPredictor method"""
+    from ml.predictor import FinancialPredictor
+
+    predictor = FinancialPredictor()
+    predictor.load_models()
+    profiles = [profile_inputs(payload) for payload in user_profiles(seed, 1000)]
+    profile = profiles[0]
+    details = predictor.predict_all(profile)
+
+    return [
+        ("predict_retirement", lambda: predictor.predict_retirement(profile), 2000),
+        ("predict_investment_allocation", lambda: predictor.predict_investment_allocation(profile), 2000),
+        ("assess_financial_risk", lambda: predictor.assess_financial_risk(profile), 2000),
+        ("predict_all", lambda: predictor.predict_all(profile), 1000),
+        ("build_response[combined]", lambda: predictor.build_response("combined", details), 2000),
+        ("predict[combined]", lambda: predictor.predict(profile, "combined"), 1000),
+        ("predict_batch[retirement,1000]", lambda: predictor.predict_batch(profiles, "retirement"), 20),
+        ("predict_batch[investment,1000]", lambda: predictor.predict_batch(profiles, "investment"), 20),
+        ("predict_batch[risk_assessment,1000]", lambda: predictor.predict_batch(profiles, "risk_assessment"), 20),
+        ("simulate_retirement[10000 paths]",
+         lambda: predictor.simulate_retirement(profile, paths=10000, seed=seed), 10),
+    ]
+
+def schema_payloads(seed: int) -> Dict[str, Dict[str, Any]]:
+    """One representative payload per schema in models/schemas.py"""
+    from ml.predictor import FinancialPredictor
+
+    rng = random.Random(seed)
+    profile = user_profiles(seed, 1)[0]
+    record = finance_record(rng, "bench-user")
+    now = datetime.now().isoformat()
+    prediction = FinancialPredictor().predict(profile_inputs(profile), "combined")
+    prediction["generated_at"] = now
+    return {
+        "UserProfile": profile,
+        "UserProfileResponse": {**profile, "user_id": "bench-user", "created_at": now, "updated_at": now},
+        "FinanceRecord": record,
+        "FinanceRecordResponse": {**record, "id": "bench-record", "created_at": now},
+        "PredictionRequest": {"user_profile": profile, "prediction_type": "combined"},
+        "PredictionResponse": prediction,
+        "BatchPredictionRequest": {
+            "user_profiles": user_profiles(seed, 100),
+            "prediction_type": "retirement"
+        },
+    }
+
+def schema_cases(seed: int) -> List[Tuple[str, Callable[[], Any], int]]:
+    """Validate a request-shaped payload and serialize it back to JSON"""
+    cases = []
+    for name, payload in schema_payloads(seed).items():
+        model = getattr(schemas, name)
+        iterations = 200 if name.startswith("Batch") else 5000
+
+        def round_trip(model=model, payload=payload):
+            return model.model_validate(payload).model_dump_json(by_alias=True)
+
+        cases.append((f"{name}.round_trip", round_trip, iterations))
+    return cases
+
+def run_micro(seed: int = 42, scale: float = 1.0) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    for group, cases in (("predictor", predictor_cases(seed)), ("schemas", schema_cases(seed))):
+        for name, func, iterations in cases:
+            results[f"{group}.{name}"] = time_calls(func, max(1, int(iterations * scale)))
+            print(f"  {group}.{name}: p50 {results[f'{group}.{name}']['p50_ms']} ms")
+    return results
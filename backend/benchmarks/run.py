@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Run the benchmark suite and write the results as JSON
+Usage: python -m benchmarks.run [--suite micro|load|all] [--output results.json] [--max-error-rate 0.01]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def environment(args):
+    import numpy
+
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "numpy": numpy.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "storage_backend": os.getenv("STORAGE_BACKEND"),
+        "inference_mode": os.getenv("INFERENCE_MODE", "thread"),
+        "admission_max_queue": os.getenv("ADMISSION_MAX_QUEUE"),
+        "admission_queue_timeout": os.getenv("ADMISSION_QUEUE_TIMEOUT"),
+        "base_url": args.base_url,
+        "concurrency": args.concurrency,
+        "seed": args.seed,
+        "scale": args.scale
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Finance App API benchmarks")
+    parser.add_argument("--suite", choices=("micro", "load", "all"), default="all")
+    parser.add_argument("--output", default="benchmark-results.json", help="Where to write the JSON results")
+    parser.add_argument("--base-url", help="Load-test a running server instead of the in-process app")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients in the load test")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplier for every iteration/request count")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", action="append", help="Only run load scenarios with this name prefix (repeatable)")
+    parser.add_argument("--max-error-rate", type=float, default=0.01,
+                        help="Fail when a load scenario has more non-2xx responses than this share")
+    args = parser.parse_args()
+
+    # Offline by default: never touch a real Firestore project from a benchmark
+    os.environ.setdefault("STORAGE_BACKEND", "memory")
+    # Results must not depend on models published in the working tree
+    os.environ.setdefault("MODEL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".models"))
+    # Measure the service, not load shedding: let every client queue for as
+    # long as its request timeout (in-process only; a --base-url server keeps
+    # its own limits)
+    os.environ.setdefault("ADMISSION_MAX_QUEUE", str(max(args.concurrency, 1)))
+    os.environ.setdefault("ADMISSION_QUEUE_TIMEOUT", "60")
+
+    results = {"environment": environment(args)}
+    if args.suite in ("micro", "all"):
+        from benchmarks.micro import run_micro
+        print("Micro-benchmarks")
+        results["micro"] = run_micro(seed=args.seed, scale=args.scale)
+    if args.suite in ("load", "all"):
+        from benchmarks.load import run_load
+        print("Load test")
+        results["load"] = asyncio.run(run_load(
+            base_url=args.base_url,
+            concurrency=args.concurrency,
+            seed=args.seed,
+            scale=args.scale,
+            only=args.only
+        ))
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    failing = {
+        name: result["error_rate"] for name, result in results.get("load", {}).items()
+        if result["error_rate"] > args.max_error_rate
+    }
+    for name, error_rate in failing.items():
+        print(f"{name}: {error_rate:.1%} of requests failed (limit {args.max_error_rate:.1%})")
+    sys.exit(1 if failing else 0)
+
+if __name__ == "__main__":
+    main()
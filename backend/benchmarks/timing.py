@@ -0,0 +1,33 @@
+import time
+from typing import Any, Callable, Dict, List, Sequence
+
+import numpy as np
+
+def summarize(samples: Sequence[float], elapsed: float) -> Dict[str, Any]:
+    """Throughput and latency percentiles (milliseconds) for a list of durations in seconds"""
+    latencies = np.asarray(samples, dtype=np.float64) * 1000.0
+    if latencies.size == 0:
+        return {"count": 0, "elapsed_s": round(elapsed, 4)}
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "count": int(latencies.size),
+        "elapsed_s": round(elapsed, 4),
+        "throughput_per_s": round(latencies.size / elapsed, 2) if elapsed else None,
+        "mean_ms": round(float(latencies.mean()), 4),
+        "p50_ms": round(float(p50), 4),
+        "p95_ms": round(float(p95), 4),
+        "p99_ms": round(float(p99), 4),
+        "max_ms": round(float(latencies.max()), 4)
+    }
+
+def time_calls(func: Callable[[], Any], iterations: int, warmup: int = 10) -> Dict[str, Any]:
+    """Call ``func`` repeatedly and summarize the per-call latency"""
+    for _ in range(warmup):
+        func()
+    samples: List[float] = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call_started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - call_started)
+    return summarize(samples, time.perf_counter() - started)
@@ -1,14 +1,16 @@
 import firebase_admin
 from firebase_admin import credentials, firestore
+import logging
 import os
 
-# Initialize Firebase Admin SDK
+logger = logging.getLogger(__name__)
+
+# Initialize Firebase Admin SDK; raises when it cannot be initialized
 def initialize_firebase():
-    if not firebase_admin._apps:
-        # In production, use service account key file
-        # For development, you can use the default credentials
-        try:
-            # Try to use service account key if available
+    try:
+        if not firebase_admin._apps:
+            # In production, use service account key file
+            # For development, you can use the default credentials
             service_account_path = os.getenv("FIREBASE_SERVICE_ACCOUNT_PATH")
             if service_account_path and os.path.exists(service_account_path):
                 cred = credentials.Certificate(service_account_path)
@@ -16,13 +18,32 @@ def initialize_firebase():
             else:
                 # Use default credentials (for development)
                 firebase_admin.initialize_app()
-        except Exception as e:
-            print(f"Firebase initialization error: {e}")
-            # For demo purposes, we'll continue without Firebase
-            return None
-    
-    return firestore.client()
+        # Credentials are only resolved here
+        return firestore.client()
+    except Exception:
+        logger.exception("Firebase initialization failed")
+        raise
 
 # Get Firestore client
 def get_firestore_client():
     return initialize_firebase()
+
+def create_firestore_clients(pool_size: int = 1):
+    """Create a pool of Firestore clients, each with its own gRPC channel.
+
+    Spreading requests over several channels avoids queueing behind the
+    concurrent-stream limit of a single HTTP/2 connection. Raises the
+    initialization error when Firebase cannot be initialized.
+    """
+    primary = initialize_firebase()
+
+    from google.cloud import firestore as cloud_firestore
+
+    app = firebase_admin.get_app()
+    clients = [primary]
+    for _ in range(max(pool_size, 1) - 1):
+        clients.append(cloud_firestore.Client(
+            project=app.project_id,
+            credentials=app.credential.get_credential()
+        ))
+    return clients
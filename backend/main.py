@@ -1,17 +1,60 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
-from routers import users, finance, predictions
+from routers import users, finance, predictions, admin
+from ml.cache import prediction_cache
+from ml.executor import inference_executor
+from monitoring.admission import AdmissionMiddleware, admission_controller
+from monitoring.metrics import registry as metrics_registry, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from monitoring.middleware import MetricsMiddleware
+from monitoring.profiling import ProfilingMiddleware
+from storage.backends import create_backend
+from storage.executor import shutdown_executor
+from storage.instrumented import InstrumentedBackend
+from storage.ledger import LedgerCache
+from storage.repositories import UserRepository, FinanceRepository
+import logging
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One storage backend (and its Firestore channel pool) per process,
+    # shared by every request
+    storage = InstrumentedBackend(create_backend())
+    app.state.storage = storage
+    app.state.users = UserRepository(storage)
+    app.state.finance = FinanceRepository(storage, ledger=LedgerCache.from_env())
+    logger.info("Storage backend: %s", storage.name)
+    inference_executor.start()
+    # Load models once the server is already accepting requests; process
+    # workers load their own copies when they start
+    if os.getenv("PREWARM_MODELS", "1") == "1" and inference_executor.mode != "process":
+        app.state.prewarm = asyncio.get_running_loop().run_in_executor(
+            None, inference_executor.predictor.load_models
+        )
+    yield
+    inference_executor.shutdown()
+    storage.close()
+    shutdown_executor()
+
 app = FastAPI(
     title="Finance App API",
     description="FastAPI backend for finance application with ML predictions",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Sheds prediction traffic beyond capacity, see monitoring/admission.py;
+# added first so rejections still pass through the CORS middleware
+app.add_middleware(AdmissionMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -19,12 +62,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Response headers browser code may read: paging, load-shedding backoff
+    # and the id of a profiled request
+    expose_headers=["X-Next-Page-Token", "Retry-After", "X-Profile-Id"],
 )
 
+# Opt-in per-request profiling, see monitoring/profiling.py
+app.add_middleware(ProfilingMiddleware)
+
+# Outermost, so the latency covers every other middleware
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(users.router, prefix="/api/users", tags=["users"])
 app.include_router(finance.router, prefix="/api/finance", tags=["finance"])
 app.include_router(predictions.router, prefix="/api/predict", tags=["predictions"])
+app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
 
 @app.get("/")
 async def root():
@@ -32,7 +85,71 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    return {"status": "healthy", "storage": app.state.storage.name}
+
+# Point-in-time gauges read when /metrics is scraped
+metrics_registry.gauge(
+    "inference_pending", "Inference calls queued or running",
+    collect=lambda: {(): inference_executor.pending}
+)
+metrics_registry.gauge(
+    "inference_max_pending", "Inference calls allowed to be queued or running",
+    collect=lambda: {(): inference_executor.max_pending}
+)
+metrics_registry.gauge(
+    "prediction_cache_entries", "Entries in the prediction cache",
+    collect=lambda: {(): prediction_cache.stats()["entries"]}
+)
+metrics_registry.counter(
+    "prediction_cache_events_total", "Prediction cache hits, misses, evictions and invalidations since start",
+    ("event",),
+    collect=lambda: {
+        (event,): prediction_cache.stats()[event]
+        for event in ("hits", "misses", "evictions", "invalidations")
+    }
+)
+
+metrics_registry.gauge(
+    "ledger_cache_records", "Finance records held in the ledger cache",
+    collect=lambda: {(): app.state.finance.ledger.records} if hasattr(app.state, "finance") else {}
+)
+metrics_registry.counter(
+    "ledger_cache_events_total", "Ledger cache hits, misses, user loads, evictions and skipped loads since start",
+    ("event",),
+    collect=lambda: {
+        (event,): app.state.finance.ledger.stats()[event]
+        for event in ("hits", "misses", "loads", "evictions", "skips")
+    } if hasattr(app.state, "finance") else {}
+)
+
+metrics_registry.gauge(
+    "admission_active", "Requests running under admission control",
+    ("route",),
+    collect=lambda: {(route,): limiter.active for route, limiter in admission_controller.limiters.items()}
+)
+metrics_registry.gauge(
+    "admission_queued", "Requests waiting for an admission slot",
+    ("route",),
+    collect=lambda: {(route,): limiter.queued for route, limiter in admission_controller.limiters.items()}
+)
+metrics_registry.gauge(
+    "admission_limit", "Current admission limits per route",
+    ("route", "limit"),
+    collect=lambda: {
+        (route, limit): getattr(limiter, limit)
+        for route, limiter in admission_controller.limiters.items()
+        for limit in ("max_concurrent", "max_queue", "queue_timeout")
+    }
+)
+metrics_registry.gauge(
+    "admission_client_rate", "Requests per second allowed per client (0 is unlimited)",
+    collect=lambda: {(): admission_controller.buckets.rate}
+)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
 
 if __name__ == "__main__":
     import uvicorn
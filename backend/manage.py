@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Management commands
+Usage: python manage.py <command> [options]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from dotenv import load_dotenv
+from storage.backends import create_backend
+from storage.executor import shutdown_executor
+from storage.repositories import FinanceRepository, UserRepository
+
+async def rebuild_summaries(args):
+    """Recompute monthly summaries from finance_records.
+
+    Run it after deploying summaries for the first time, or to repair
+    drift. Records written for a user while that user is being rebuilt may
+    be counted twice or missed, so prefer a quiet period.
+    """
+    storage = create_backend()
+    try:
+        finance = FinanceRepository(storage)
+        users = 0
+        months = 0
+        user_ids = args.user_id or finance.iter_user_ids()
+        if isinstance(user_ids, list):
+            user_ids = _as_async(user_ids)
+        async for user_id in user_ids:
+            months += await finance.rebuild_summaries(user_id)
+            users += 1
+            if users % 100 == 0:
+                print(f"Rebuilt {users} users...")
+        print(f"Rebuilt {months} monthly summaries for {users} users")
+    finally:
+        storage.close()
+        shutdown_executor()
+
+async def train(args):
+    """Train every model type on stored users and records and publish a new version.
+
+    Users and records are streamed page by page; at most --max-rows rows
+    are kept in memory, a uniform sample once there are more.
+    """
+    from ml.registry import ModelRegistry
+    from ml.training import TrainingConfig, train_models
+
+    config = TrainingConfig(
+        max_rows=args.max_rows,
+        holdout=args.holdout,
+        chunk_size=args.chunk_size,
+        page_size=args.page_size,
+        n_estimators=args.n_estimators,
+        max_depth=args.max_depth or None,
+        n_jobs=args.n_jobs,
+        seed=args.seed,
+        compress=args.compress
+    )
+    storage = create_backend()
+    try:
+        await train_models(
+            UserRepository(storage),
+            FinanceRepository(storage),
+            config,
+            registry=ModelRegistry(args.model_dir) if args.model_dir else None,
+            version=args.version,
+            activate=args.activate
+        )
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    finally:
+        storage.close()
+        shutdown_executor()
+
+# Run in a fresh interpreter: import the app, run its startup and report
+# when it would start accepting requests
+_STARTUP_PROBE = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+async def probe():
+    async with main.app.router.lifespan_context(main.app):
+        ready = time.perf_counter()
+        # Imports after this point (background prewarm) do not delay readiness
+        print("ready", file=sys.stderr, flush=True)
+        print(json.dumps({"ready_at": time.time(), "import_s": imported - started, "startup_s": ready - imported}))
+
+asyncio.run(probe())
+"""
+
+_IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+def probe_startup():
+    env = dict(os.environ)
+    # Never reach out to Firestore from a timing run unless asked to
+    env.setdefault("STORAGE_BACKEND", "memory")
+    # The model prewarm thread would otherwise race the probe for the GIL
+    # and show its imports in the report, although it never delays readiness
+    env.setdefault("PREWARM_MODELS", "0")
+    launched = time.time()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _STARTUP_PROBE],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Startup probe failed:\n{result.stderr[-2000:]}")
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings["ready_s"] = timings.pop("ready_at") - launched
+
+    # -X importtime lists each module after the modules it imported, indented
+    # by depth. Charge every subtree to its top-level package, skipping
+    # submodules already counted within their own package.
+    packages = {}
+    children = {}
+    for line in result.stderr.split("\nready\n")[0].splitlines():
+        match = _IMPORT_TIME_LINE.match(line)
+        if not match:
+            continue
+        depth = len(match.group(3)) // 2
+        node = (match.group(4), int(match.group(2)) / 1e6, children.pop(depth + 1, []))
+        children.setdefault(depth, []).append(node)
+
+    def charge(node, parent_package):
+        name, seconds, nested = node
+        package = name.split(".")[0]
+        if package != parent_package:
+            packages[package] = packages.get(package, 0) + seconds
+        for child in nested:
+            charge(child, package)
+
+    for node in children.get(0, []):
+        charge(node, None)
+    timings["imports"] = packages
+    return timings
+
+async def startup_report(args):
+    """Measure how long the API takes to become ready in a fresh process.
+
+    Exits with status 1 when --budget is given and the median time from
+    process launch to ready exceeds it, so it can gate CI or a deploy.
+    """
+    runs = [probe_startup() for _ in range(args.runs)]
+    report = {
+        phase: round(statistics.median(run[phase] for run in runs), 4)
+        for phase in ("ready_s", "import_s", "startup_s")
+    }
+    imports = runs[-1]["imports"]
+    report["imports"] = {
+        package: round(seconds, 4)
+        for package, seconds in sorted(imports.items(), key=lambda item: -item[1])[:args.top]
+    }
+    report["budget_s"] = args.budget
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"Ready after {report['ready_s']:.3f}s (median of {args.runs}): "
+              f"imports {report['import_s']:.3f}s, startup {report['startup_s']:.3f}s")
+        print("Slowest top-level imports:")
+        for package, seconds in report["imports"].items():
+            print(f"  {package:30} {seconds:8.3f}s")
+
+    if args.budget is not None and report["ready_s"] > args.budget:
+        print(f"Startup budget exceeded: {report['ready_s']:.3f}s > {args.budget:.3f}s", file=sys.stderr)
+        sys.exit(1)
+
+async def _as_async(items):
+    for item in items:
+        yield item
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Finance App management commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = commands.add_parser("rebuild-summaries", help="Backfill monthly finance summaries")
+    rebuild.add_argument("--user-id", action="append", help="Only rebuild this user (repeatable)")
+    rebuild.set_defaults(handler=rebuild_summaries)
+
+    training = commands.add_parser("train", help="Train and publish models from stored users and records")
+    training.add_argument("--max-rows", type=int, default=500000, help="Rows held in memory (training plus holdout)")
+    training.add_argument("--holdout", type=float, default=0.2, help="Share of users held out for evaluation")
+    training.add_argument("--chunk-size", type=int, default=10000, help="Users encoded per feature chunk")
+    training.add_argument("--page-size", type=int, default=1000, help="Documents fetched per storage query")
+    training.add_argument("--n-estimators", type=int, default=100)
+    training.add_argument("--max-depth", type=int, default=12, help="0 for unlimited")
+    training.add_argument("--n-jobs", type=int, default=-1, help="Cores used for fitting; -1 for all")
+    training.add_argument("--seed", type=int, default=42)
+    training.add_argument("--compress", type=int, default=3, help="joblib compression level; 0 keeps artifacts mmap-able")
+    training.add_argument("--version", help="Version name; a timestamp by default")
+    training.add_argument("--model-dir", help="Registry directory; MODEL_DIR by default")
+    training.add_argument("--activate", action="store_true", help="Make the new version active once published")
+    training.set_defaults(handler=train)
+
+    startup = commands.add_parser("startup-report", help="Time app import and startup, optionally against a budget")
+    startup.add_argument("--budget", type=float, help="Fail when launch-to-ready takes longer (seconds)")
+    startup.add_argument("--runs", type=int, default=3, help="Fresh processes to time; the median is reported")
+    startup.add_argument("--top", type=int, default=15, help="Number of slowest imports to list")
+    startup.add_argument("--json", action="store_true", help="Print the report as JSON")
+    startup.set_defaults(handler=startup_report)
+
+    args = parser.parse_args()
+    asyncio.run(args.handler(args))
+
+if __name__ == "__main__":
+    main()
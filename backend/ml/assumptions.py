@@ -0,0 +1,41 @@
+from dataclasses import dataclass
+from typing import Tuple
+import numpy as np
+
+ASSET_CLASSES = ("equity", "debt", "gold")
+
+@dataclass(frozen=True)
+class MarketAssumptions:
+    """Long-run annual return, risk and inflation assumptions per asset class.
+
+    Instances are immutable and hashable so derived tables can be cached per
+    assumption set.
+    """
+
+    # Mean annual returns; the defaults match the weights used by
+    # predict_investment_allocation
+    expected_returns: Tuple[float, ...] = (0.12, 0.07, 0.08)
+    volatilities: Tuple[float, ...] = (0.18, 0.05, 0.15)
+    correlations: Tuple[Tuple[float, ...], ...] = (
+        (1.0, 0.1, -0.1),
+        (0.1, 1.0, 0.1),
+        (-0.1, 0.1, 1.0),
+    )
+    inflation: float = 0.06
+    inflation_volatility: float = 0.015
+
+    @property
+    def returns(self) -> np.ndarray:
+        return np.array(self.expected_returns)
+
+    @property
+    def covariance(self) -> np.ndarray:
+        vol = np.array(self.volatilities)
+        return np.outer(vol, vol) * np.array(self.correlations)
+
+    def portfolio(self, weights: np.ndarray) -> Tuple[float, float]:
+        """Annual mean return and volatility of a weight vector summing to 1"""
+        weights = np.asarray(weights, dtype=float)
+        return float(weights @ self.returns), float(np.sqrt(weights @ self.covariance @ weights))
+
+DEFAULT_ASSUMPTIONS = MarketAssumptions()
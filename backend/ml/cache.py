@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Profile fields each prediction reads; nothing else can change its result
+PREDICTION_FIELDS = {
+    "retirement": ("age", "annual_income", "monthly_surplus", "goal_timeline_years"),
+    "investment": ("age", "risk_taking_ability", "preferred_investment_horizon"),
+    "risk_assessment": ("monthly_income", "monthly_expenses", "loan", "number_of_dependents", "insurance"),
+}
+PREDICTION_FIELDS["combined"] = tuple(sorted({
+    field for fields in PREDICTION_FIELDS.values() for field in fields
+}))
+
+# Registry model types whose versions are part of each prediction's cache key
+PREDICTION_MODELS = {
+    "retirement": ("retirement",),
+    "investment": ("investment",),
+    "risk_assessment": ("risk",),
+    "combined": ("retirement", "investment", "risk"),
+}
+
+CacheKey = Tuple[str, str, str]  # (prediction_type, model_version, fingerprint)
+
+def profile_fingerprint(profile: Dict[str, Any], prediction_type: str) -> str:
+    """Stable hash of the profile fields a prediction type depends on"""
+    values = [profile.get(field) for field in PREDICTION_FIELDS[prediction_type]]
+    payload = json.dumps(values, separators=(",", ":"), default=str)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+class PredictionCache:
+    """Bounded LRU cache of prediction results with a time-to-live.
+
+    Cached results are shared between requests and must be treated as
+    read-only.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: CacheKey) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                    self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: CacheKey, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def key(self, profile: Dict[str, Any], prediction_type: str, model_version: str) -> CacheKey:
+        return (prediction_type, model_version, profile_fingerprint(profile, prediction_type))
+
+    def invalidate_profile(self, profile: Dict[str, Any],
+                           prediction_types: Optional[Iterable[str]] = None) -> int:
+        """Drop cached predictions computed from this profile's values"""
+        fingerprints = {
+            (prediction_type, profile_fingerprint(profile, prediction_type))
+            for prediction_type in (prediction_types or PREDICTION_FIELDS)
+        }
+        with self._lock:
+            stale = [key for key in self._entries if (key[0], key[2]) in fingerprints]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+def changed_prediction_types(old: Dict[str, Any], new: Dict[str, Any]) -> List[str]:
+    """Prediction types whose input fields differ between two profiles"""
+    return [
+        prediction_type for prediction_type, fields in PREDICTION_FIELDS.items()
+        if any(old.get(field) != new.get(field) for field in fields)
+    ]
+
+prediction_cache = PredictionCache(
+    max_entries=int(os.getenv("PREDICTION_CACHE_SIZE", "10000")),
+    ttl_seconds=float(os.getenv("PREDICTION_CACHE_TTL", "3600"))
+)
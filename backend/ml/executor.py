@@ -0,0 +1,168 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Optional
+
+from ml.predictor import FinancialPredictor
+from monitoring.metrics import inference_queue_duration, predictor_duration
+
+class InferenceBusy(Exception):
+    """Raised when the inference queue is full"""
+
+class InferenceTimeout(Exception):
+    """Raised when an inference call does not finish within the timeout"""
+
+# Predictor owned by each worker process of a process pool
+_worker_predictor: Optional[FinancialPredictor] = None
+
+def _init_worker(preload: bool):
+    global _worker_predictor
+    _worker_predictor = FinancialPredictor()
+    if preload:
+        _worker_predictor.load_models()
+
+def _call_in_worker(method: str, args: tuple, kwargs: dict) -> tuple:
+    return _call(_worker_predictor, method, args, kwargs)
+
+def _call(predictor: FinancialPredictor, method: str, args: tuple, kwargs: dict) -> tuple:
+    """Run a predictor method; returns (result, seconds spent in the method)"""
+    started = time.perf_counter()
+    result = getattr(predictor, method)(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+class InferenceExecutor:
+    """Runs FinancialPredictor methods off the event loop.
+
+    Modes:
+      inline  - call on the event loop (no isolation, lowest overhead)
+      thread  - thread pool sharing one predictor; suits the NumPy paths,
+                which release the GIL
+      process - process pool with a predictor (and its models) loaded in
+                every child; scales pure-Python work across cores
+
+    At most ``max_pending`` calls may be queued or running; beyond that
+    run() fails fast with InferenceBusy instead of growing the queue. A
+    slot is only released when the work itself finishes, so calls that
+    timed out still count until their worker is free again.
+    """
+
+    def __init__(self, mode: str = "thread", max_workers: Optional[int] = None,
+                 max_pending: Optional[int] = None, timeout: float = 10.0,
+                 preload: bool = True, start_method: str = "spawn"):
+        if mode not in ("inline", "thread", "process"):
+            raise ValueError(f"Unknown inference mode: {mode}")
+        self.mode = mode
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.max_workers * 4
+        self.timeout = timeout
+        self.preload = preload
+        self.start_method = start_method
+        self.predictor = FinancialPredictor()
+        self.pending = 0
+        self._pool: Optional[Executor] = None
+        self._pool_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "InferenceExecutor":
+        workers = os.getenv("INFERENCE_WORKERS")
+        pending = os.getenv("INFERENCE_MAX_PENDING")
+        return cls(
+            mode=os.getenv("INFERENCE_MODE", "thread"),
+            max_workers=int(workers) if workers else None,
+            max_pending=int(pending) if pending else None,
+            timeout=float(os.getenv("INFERENCE_TIMEOUT", "10")),
+            preload=os.getenv("INFERENCE_PRELOAD", "1") == "1",
+            start_method=os.getenv("INFERENCE_START_METHOD", "spawn")
+        )
+
+    def start(self):
+        """Create the worker pool; process workers load their models now"""
+        if self.mode == "inline":
+            return
+        with self._pool_lock:
+            if self._pool is not None:
+                return
+            if self.mode == "process":
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=_init_worker,
+                    initargs=(self.preload,)
+                )
+                # Spawn the children now so their models are loaded before traffic arrives
+                for _ in range(self.max_workers):
+                    self._pool.submit(os.getpid)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def _release(self):
+        self.pending -= 1
+
+    async def run(self, method: str, *args, **kwargs) -> Any:
+        """Call a FinancialPredictor method by name in the configured pool"""
+        if self.mode == "inline":
+            started = time.perf_counter()
+            try:
+                result, elapsed = _call(self.predictor, method, args, kwargs)
+            except Exception:
+                predictor_duration.observe(time.perf_counter() - started, method=method, outcome="error")
+                raise
+            predictor_duration.observe(elapsed, method=method, outcome="ok")
+            return result
+        if self.pending >= self.max_pending:
+            raise InferenceBusy(f"{self.pending} inference calls pending")
+
+        self.start()
+        loop = asyncio.get_running_loop()
+        submitted = time.perf_counter()
+        if self.mode == "process":
+            future = self._pool.submit(_call_in_worker, method, args, kwargs)
+        else:
+            future = self._pool.submit(_call, self.predictor, method, args, kwargs)
+        self.pending += 1
+
+        def on_done(_):
+            try:
+                loop.call_soon_threadsafe(self._release)
+            except RuntimeError:
+                # Event loop already closed during shutdown
+                self._release()
+
+        future.add_done_callback(on_done)
+
+        try:
+            result, elapsed = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            # Frees the slot right away if the call had not started yet
+            future.cancel()
+            predictor_duration.observe(time.perf_counter() - submitted, method=method, outcome="timeout")
+            raise InferenceTimeout(f"{method} did not finish within {self.timeout}s")
+        except Exception:
+            # Includes queueing: a failed call cannot report its own duration
+            predictor_duration.observe(time.perf_counter() - submitted, method=method, outcome="error")
+            raise
+        predictor_duration.observe(elapsed, method=method, outcome="ok")
+        inference_queue_duration.observe(
+            max(0.0, time.perf_counter() - submitted - elapsed), method=method
+        )
+        return result
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "timeout": self.timeout
+        }
+
+inference_executor = InferenceExecutor.from_env()
@@ -0,0 +1,88 @@
+import os
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+import numpy as np
+from ml.assumptions import ASSET_CLASSES, DEFAULT_ASSUMPTIONS, MarketAssumptions
+
+# Risk aversion, the lambda in return - lambda / 2 * variance, per risk_taking_ability
+RISK_AVERSION = {"Low": 8.0, "Moderate": 4.0, "High": 2.0}
+# Longer horizons can ride out more volatility
+HORIZON_FACTORS = {"Short": 1.5, "Medium": 1.0, "Long": 0.75}
+# Smallest debt share, in percent, kept liquid for each liquidity_preference
+MIN_DEBT_PERCENT = {"Low": 0, "Medium": 10, "High": 20}
+
+DEFAULT_GRID_STEP = int(os.getenv("OPTIMIZER_GRID_STEP", "1"))
+
+def allocation_grid(step: int = 1) -> np.ndarray:
+    """Every split of 100% over ASSET_CLASSES in whole multiples of ``step`` percent"""
+    if step < 1 or 100 % step:
+        raise ValueError(f"Grid step must divide 100, got {step}")
+    levels = np.arange(0, 101, step)
+    first, second = np.meshgrid(levels, levels, indexing="ij")
+    first, second = first.ravel(), second.ravel()
+    valid = first + second <= 100
+    first, second = first[valid], second[valid]
+    return np.column_stack([first, second, 100 - first - second])
+
+class Frontier:
+    """Efficient allocations of a grid, sorted by volatility.
+
+    A grid point is kept when no point with the same or lower variance has
+    a higher expected return. Whatever the risk aversion, the allocation
+    maximising return - lambda / 2 * variance is one of these points, so a
+    request only scans the frontier (a few hundred points at a 1% step)
+    rather than the whole grid.
+    """
+
+    __slots__ = ("percents", "returns", "variances", "grid_size")
+
+    def __init__(self, assumptions: MarketAssumptions, step: int, min_debt_percent: int = 0):
+        grid = allocation_grid(step)
+        grid = grid[grid[:, ASSET_CLASSES.index("debt")] >= min_debt_percent]
+        weights = grid / 100
+        returns = weights @ assumptions.returns
+        variances = np.einsum("ij,jk,ik->i", weights, assumptions.covariance, weights)
+
+        # Walk up in variance, keeping each point that beats every return seen so far
+        order = np.lexsort((-returns, variances))
+        ordered = returns[order]
+        best_before = np.concatenate(([-np.inf], np.maximum.accumulate(ordered)[:-1]))
+        efficient = order[ordered > best_before]
+
+        self.percents = grid[efficient]
+        self.returns = returns[efficient]
+        self.variances = variances[efficient]
+        self.grid_size = len(grid)
+
+    def best(self, risk_aversion: float) -> int:
+        """Index of the frontier point with the highest mean-variance utility"""
+        return int(np.argmax(self.returns - risk_aversion / 2 * self.variances))
+
+@lru_cache(maxsize=32)
+def efficient_frontier(assumptions: MarketAssumptions = DEFAULT_ASSUMPTIONS, step: int = DEFAULT_GRID_STEP,
+                       min_debt_percent: int = 0) -> Frontier:
+    """Frontier for an assumption set, built once and then shared"""
+    return Frontier(assumptions, step, min_debt_percent)
+
+def optimize_allocation(profile: Dict[str, Any], assumptions: MarketAssumptions = DEFAULT_ASSUMPTIONS,
+                        step: Optional[int] = None) -> Dict[str, Any]:
+    """Mean-variance allocation matched to a profile's risk, horizon and liquidity"""
+    risk_ability = profile.get('risk_taking_ability', 'Moderate')
+    horizon = profile.get('preferred_investment_horizon', 'Medium')
+    liquidity = profile.get('liquidity_preference', 'Medium')
+
+    risk_aversion = RISK_AVERSION.get(risk_ability, 4.0) * HORIZON_FACTORS.get(horizon, 1.0)
+    frontier = efficient_frontier(assumptions, step or DEFAULT_GRID_STEP, MIN_DEBT_PERCENT.get(liquidity, 10))
+    index = frontier.best(risk_aversion)
+
+    expected_return = float(frontier.returns[index])
+    variance = float(frontier.variances[index])
+    return {
+        "allocation": dict(zip(ASSET_CLASSES, frontier.percents[index].tolist())),
+        "expected_return": expected_return,
+        "volatility": float(np.sqrt(variance)),
+        # Certainty-equivalent return at the profile's risk aversion
+        "risk_adjusted_return": expected_return - risk_aversion / 2 * variance,
+        "risk_aversion": risk_aversion
+    }
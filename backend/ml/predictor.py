@@ -1,60 +1,103 @@
 import numpy as np
-import pandas as pd
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.preprocessing import LabelEncoder
-import joblib
-import os
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+from ml.registry import ModelRegistry, MODEL_TYPES, model_registry
+from ml.montecarlo import simulate_retirement
+from ml.optimizer import optimize_allocation
+from ml.sweep import retirement_sweep
+
+RETIREMENT_TIPS = [
+    "Consider increasing SIP by 10% annually",
+    "Diversify across equity and debt instruments",
+    "Review and rebalance portfolio annually"
+]
+
+INVESTMENT_TIPS = [
+    "Rebalance portfolio quarterly",
+    "Consider tax-saving instruments"
+]
+
+MITIGATION_STRATEGIES = [
+    "Build emergency fund of 6-12 months expenses",
+    "Increase insurance coverage to 10x annual income",
+    "Reduce unnecessary expenses",
+    "Consider additional income sources",
+    "Pay down high-interest debt first"
+]
+
+# Value assumed for each profile field the predictions read when it is missing
+PROFILE_DEFAULTS = {
+    'age': 30,
+    'annual_income': 500000,
+    'monthly_income': 50000,
+    'monthly_expenses': 30000,
+    'monthly_surplus': 20000,
+    'starting_principal': 0,
+    'goal_timeline_years': 30,
+    'risk_taking_ability': 'Moderate',
+    'preferred_investment_horizon': 'Medium',
+    'loan': 0,
+    'number_of_dependents': 0,
+    'insurance': 0
+}
+
+# Categorical encodings used by the ML feature vector
+RISK_MAPPING = {"Low": 1, "Moderate": 2, "High": 3}
+HORIZON_MAPPING = {"Short": 1, "Medium": 2, "Long": 3}
+
+FEATURE_NAMES = ("age", "annual_income_lakhs", "monthly_expenses_10k", "risk_level", "horizon_level")
+
+# Rule-based predictions carry a fixed confidence per type
+CONFIDENCE_SCORES = {
+    "retirement": 0.75,
+    "investment": 0.8,
+    "risk_assessment": 0.85
+}
+
+PREDICTION_TYPES = ("retirement", "investment", "risk_assessment")
+
+def _column(profiles: List[Dict[str, Any]], key: str, dtype=np.int64) -> np.ndarray:
+    """Gather one profile field into an array, applying the same default as the scalar methods"""
+    default = PROFILE_DEFAULTS[key]
+    return np.fromiter((p.get(key, default) for p in profiles), dtype=dtype, count=len(profiles))
+
+def encode_features(profiles: List[Dict[str, Any]]) -> np.ndarray:
+    """Feature matrix (one row per profile) for the ML models"""
+    features = np.empty((len(profiles), len(FEATURE_NAMES)))
+    features[:, 0] = _column(profiles, 'age', np.float64)
+    features[:, 1] = _column(profiles, 'annual_income', np.float64) / 100000  # Normalize
+    features[:, 2] = _column(profiles, 'monthly_expenses', np.float64) / 10000  # Normalize
+    features[:, 3] = [RISK_MAPPING.get(p.get('risk_taking_ability', 'Moderate'), 2) for p in profiles]
+    features[:, 4] = [HORIZON_MAPPING.get(p.get('preferred_investment_horizon', 'Medium'), 2) for p in profiles]
+    return features
 
 class FinancialPredictor:
-    def __init__(self):
-        self.models = {}
-        self.encoders = {}
-        self.load_models()
-    
+    def __init__(self, registry: Optional[ModelRegistry] = None):
+        # Models are resolved through the registry on first use rather than
+        # fitted here, so constructing a predictor is cheap
+        self.registry = registry or model_registry
+
+    @property
+    def models(self) -> Dict[str, Any]:
+        return {model_type: self.registry.get(model_type) for model_type in MODEL_TYPES}
+
     def load_models(self):
-        """Load pre-trained models or initialize dummy models"""
-        try:
-            # In production, load actual trained models
-            # For demo, we'll use dummy models with mock predictions
-            self.models['retirement'] = RandomForestRegressor(n_estimators=10, random_state=42)
-            self.models['investment'] = RandomForestRegressor(n_estimators=10, random_state=42)
-            self.models['risk'] = RandomForestRegressor(n_estimators=10, random_state=42)
-            
-            # Initialize with dummy data for demo
-            self._initialize_dummy_models()
-        except Exception as e:
-            print(f"Model loading error: {e}")
-            self._initialize_dummy_models()
-    
-    def _initialize_dummy_models(self):
-        """Initialize models with dummy data for demonstration"""
-        # Create dummy training data
-        np.random.seed(42)
-        dummy_features = np.random.rand(100, 5)  # 5 features
-        dummy_targets = np.random.rand(100)
-        
-        for model_name in self.models:
-            self.models[model_name].fit(dummy_features, dummy_targets)
-    
+        """Eagerly load the active version of every model type"""
+        for model_type in MODEL_TYPES:
+            try:
+                self.registry.get(model_type)
+            except Exception as e:
+                print(f"Model loading error ({model_type}): {e}")
+
     def _encode_categorical_features(self, profile: Dict[str, Any]) -> np.ndarray:
         """Convert user profile to numerical features for ML model"""
-        # Risk mapping
-        risk_mapping = {"Low": 1, "Moderate": 2, "High": 3}
-        horizon_mapping = {"Short": 1, "Medium": 2, "Long": 3}
-        
-        features = [
-            profile.get('age', 30),
-            profile.get('annual_income', 500000) / 100000,  # Normalize
-            profile.get('monthly_expenses', 30000) / 10000,  # Normalize
-            risk_mapping.get(profile.get('risk_taking_ability', 'Moderate'), 2),
-            horizon_mapping.get(profile.get('preferred_investment_horizon', 'Medium'), 2)
-        ]
-        
-        return np.array(features).reshape(1, -1)
-    
-    def predict(self, user_profile: Dict[str, Any], prediction_type: str) -> Dict[str, Any]:
-        """Main prediction method"""
+        return encode_features([profile])
+
+    def _profile_inputs(self, profile: Dict[str, Any]) -> Dict[str, Any]:
+        """Every field the predictions read, with defaults resolved once"""
+        return {key: profile.get(key, default) for key, default in PROFILE_DEFAULTS.items()}
+
+    def predict_details(self, user_profile: Dict[str, Any], prediction_type: str) -> Dict[str, Any]:
+        """Result of the single-type method for a prediction type"""
         if prediction_type == "retirement":
             return self.predict_retirement(user_profile)
         elif prediction_type == "investment":
@@ -63,7 +106,214 @@ class FinancialPredictor:
             return self.assess_financial_risk(user_profile)
         else:
             raise ValueError(f"Unknown prediction type: {prediction_type}")
-    
+
+    def predict_all(self, user_profile: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Retirement, allocation and risk for one profile in a single pass"""
+        inputs = self._profile_inputs(user_profile)
+        return {
+            "retirement": self.predict_retirement(inputs),
+            "investment": self.predict_investment_allocation(inputs),
+            "risk_assessment": self.assess_financial_risk(inputs)
+        }
+
+    def build_response(self, prediction_type: str, details: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Shape predict_all() output into the fields of PredictionResponse.
+
+        ``prediction_type`` selects which recommendations lead; "combined"
+        includes all of them.
+        """
+        if prediction_type == "combined":
+            focus = PREDICTION_TYPES
+        elif prediction_type in PREDICTION_TYPES:
+            focus = (prediction_type,)
+        else:
+            raise ValueError(f"Unknown prediction type: {prediction_type}")
+
+        retirement = details["retirement"]
+        investment = details["investment"]
+        risk = details["risk_assessment"]
+
+        recommendations = []
+        for name in focus:
+            tips = risk["mitigation_strategies"] if name == "risk_assessment" else details[name]["recommendations"]
+            recommendations.extend(tip for tip in tips if tip not in recommendations)
+
+        return {
+            "prediction_type": prediction_type,
+            "recommendations": recommendations,
+            "risk_score": float(risk["risk_score"]),
+            "projected_returns": {
+                "retirement_corpus_needed": retirement["corpus_needed"],
+                "monthly_sip_required": retirement["monthly_sip"],
+                "years_to_retirement": retirement["years_to_retirement"],
+                **investment["expected_returns"]
+            },
+            "investment_allocation": investment["allocation"],
+            "confidence_score": round(sum(CONFIDENCE_SCORES[name] for name in focus) / len(focus), 2),
+            "details": details
+        }
+
+    def predict(self, user_profile: Dict[str, Any], prediction_type: str) -> Dict[str, Any]:
+        """Main prediction method; returns every field of PredictionResponse but generated_at"""
+        return self.build_response(prediction_type, self.predict_all(user_profile))
+
+    def predict_batch(self, profiles: List[Dict[str, Any]], prediction_type: str) -> List[Dict[str, Any]]:
+        """Vectorized counterpart of predict_details() for many profiles at once.
+
+        Each result is identical to what the per-profile method returns.
+        """
+        if prediction_type == "retirement":
+            return self._predict_retirement_batch(profiles)
+        elif prediction_type == "investment":
+            return self._predict_investment_allocation_batch(profiles)
+        elif prediction_type == "risk_assessment":
+            return self._assess_financial_risk_batch(profiles)
+        else:
+            raise ValueError(f"Unknown prediction type: {prediction_type}")
+
+    def _predict_retirement_batch(self, profiles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Batch version of predict_retirement"""
+        if not profiles:
+            return []
+        age = _column(profiles, 'age')
+        annual_income = _column(profiles, 'annual_income')
+        goal_timeline = _column(profiles, 'goal_timeline_years')
+
+        retirement_age = np.minimum(age + goal_timeline, 60)
+        years_to_retirement = retirement_age - age
+
+        corpus_needed = annual_income * 0.7 * 25
+
+        # Growth factors are computed once per distinct horizon with Python's
+        # pow so the SIP matches predict_retirement bit for bit
+        monthly_rate = 0.12/12
+        months, inverse = np.unique(np.maximum(years_to_retirement, 0) * 12, return_inverse=True)
+        growth = np.array([(1 + monthly_rate) ** int(m) for m in months])[inverse]
+        has_horizon = years_to_retirement > 0
+        annuity_factor = np.where(has_horizon, (growth - 1) / monthly_rate, 1.0)
+        monthly_sip = np.where(has_horizon, corpus_needed / annuity_factor, corpus_needed)
+
+        return [
+            {
+                "corpus_needed": corpus,
+                "monthly_sip": sip,
+                "years_to_retirement": years,
+                "recommendations": [
+                    f"Start investing ₹{sip:,} monthly for retirement",
+                    *RETIREMENT_TIPS
+                ]
+            }
+            for corpus, sip, years in zip(
+                np.trunc(corpus_needed).astype(np.int64).tolist(),
+                np.trunc(monthly_sip).astype(np.int64).tolist(),
+                years_to_retirement.tolist()
+            )
+        ]
+
+    def _predict_investment_allocation_batch(self, profiles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Batch version of predict_investment_allocation"""
+        if not profiles:
+            return []
+        age = _column(profiles, 'age')
+        risk_ability = np.array([p.get('risk_taking_ability', 'Moderate') for p in profiles], dtype=object)
+
+        aggressive = (risk_ability == "High") & (age < 35)
+        moderate = ~aggressive & (risk_ability == "Moderate")
+
+        equity_percent = np.select([aggressive, moderate], [80, 100 - age], np.maximum(30, 60 - age))
+        debt_percent = np.select([aggressive, moderate], [15, age - 10], np.minimum(60, 40 + age))
+        gold_percent = np.where(aggressive, 5, 10)
+
+        # Ensure percentages add up to 100
+        total = equity_percent + debt_percent + gold_percent
+        equity_percent = np.trunc((equity_percent / total) * 100).astype(np.int64)
+        debt_percent = np.trunc((debt_percent / total) * 100).astype(np.int64)
+        gold_percent = 100 - equity_percent - debt_percent
+
+        expected_annual_return = (
+            equity_percent * 0.12 +
+            debt_percent * 0.07 +
+            gold_percent * 0.08
+        ) / 100
+        annual_return_percent = (expected_annual_return * 100).tolist()
+        risk_adjusted_return = (expected_annual_return * 0.9 * 100).tolist()
+
+        results = []
+        for i, (equity, debt, gold) in enumerate(zip(
+            equity_percent.tolist(), debt_percent.tolist(), gold_percent.tolist()
+        )):
+            results.append({
+                "allocation": {
+                    "equity": equity,
+                    "debt": debt,
+                    "gold": gold
+                },
+                "expected_returns": {
+                    "annual_return_percent": round(annual_return_percent[i], 2),
+                    "risk_adjusted_return": round(risk_adjusted_return[i], 2)
+                },
+                "risk_level": risk_ability[i],
+                "recommendations": [
+                    f"Allocate {equity}% to equity for growth",
+                    f"Keep {debt}% in debt for stability",
+                    f"Maintain {gold}% in gold for inflation hedge",
+                    *INVESTMENT_TIPS
+                ]
+            })
+        return results
+
+    def _assess_financial_risk_batch(self, profiles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Batch version of assess_financial_risk"""
+        if not profiles:
+            return []
+        monthly_income = _column(profiles, 'monthly_income')
+        monthly_expenses = _column(profiles, 'monthly_expenses')
+        loan = _column(profiles, 'loan')
+        dependents = _column(profiles, 'number_of_dependents')
+        insurance = _column(profiles, 'insurance')
+
+        has_income = monthly_income > 0
+        safe_income = np.where(has_income, monthly_income, 1)
+        expense_ratio = np.where(has_income, monthly_expenses / safe_income, 1)
+        debt_to_income = np.where(has_income, (loan / 12) / safe_income, 0)
+        insurance_coverage = np.where(has_income, insurance / (safe_income * 12), 0)
+
+        # Same thresholds and weights as assess_financial_risk, in the same order
+        factor_flags = [
+            (expense_ratio > 0.8, 30, "High expense-to-income ratio"),
+            (debt_to_income > 0.4, 25, "High debt burden"),
+            (insurance_coverage < 5, 20, "Insufficient insurance coverage"),
+            (dependents > 2, 15, "Multiple dependents"),
+            (monthly_income - monthly_expenses < 10000, 10, "Low savings capacity")
+        ]
+
+        risk_score = np.zeros(len(profiles), dtype=np.int64)
+        factor_mask = np.zeros(len(profiles), dtype=np.int64)
+        for bit, (flags, weight, _) in enumerate(factor_flags):
+            risk_score += np.where(flags, weight, 0)
+            factor_mask |= flags.astype(np.int64) << bit
+
+        # 0 = Low, 1 = Moderate, 2 = High
+        category_code = (risk_score >= 20).astype(np.int64) + (risk_score >= 50)
+        categories = ["Low Risk", "Moderate Risk", "High Risk"]
+
+        # Every combination of flagged factors, in rule order, indexed by bitmask
+        labels = [label for _, _, label in factor_flags]
+        factor_lists = [
+            [label for bit, label in enumerate(labels) if mask >> bit & 1]
+            for mask in range(1 << len(labels))
+        ]
+
+        return [
+            {
+                "risk_score": min(score, 100),
+                "risk_category": categories[code],
+                "risk_factors": list(factor_lists[mask]),
+                "mitigation_strategies": list(MITIGATION_STRATEGIES)
+            }
+            for score, code, mask in zip(risk_score.tolist(), category_code.tolist(), factor_mask.tolist())
+        ]
+
     def predict_retirement(self, profile: Dict[str, Any]) -> Dict[str, Any]:
         """Predict retirement planning metrics"""
         age = profile.get('age', 30)
@@ -88,9 +338,7 @@ class FinancialPredictor:
         
         recommendations = [
             f"Start investing ₹{int(monthly_sip):,} monthly for retirement",
-            "Consider increasing SIP by 10% annually",
-            "Diversify across equity and debt instruments",
-            "Review and rebalance portfolio annually"
+            *RETIREMENT_TIPS
         ]
         
         return {
@@ -100,6 +348,54 @@ class FinancialPredictor:
             "recommendations": recommendations
         }
     
+    def sweep_retirement(self, profile: Dict[str, Any], retirement_ages: List[int], step_ups: List[float],
+                         annual_returns: List[float], inflations: List[float]) -> Dict[str, Any]:
+        """Required SIP for every combination of the what-if parameters, see ml/sweep.py"""
+        return retirement_sweep(
+            profile.get('age', 30),
+            profile.get('annual_income', 500000),
+            retirement_ages, step_ups, annual_returns, inflations
+        )
+
+    def simulate_retirement(self, profile: Dict[str, Any], paths: int = 10000,
+                            seed: Optional[int] = None, chunk_size: int = 2000) -> Dict[str, Any]:
+        """Monte Carlo retirement projection.
+
+        Uses the same horizon and corpus target as predict_retirement, the
+        user's monthly surplus and starting principal as contributions, and
+        the allocation from predict_investment_allocation.
+        """
+        retirement = self.predict_retirement(profile)
+        allocation = self.predict_investment_allocation(profile)["allocation"]
+
+        simulation = simulate_retirement(
+            monthly_contribution=profile.get('monthly_surplus', 20000),
+            starting_principal=profile.get('starting_principal', 0),
+            allocation=allocation,
+            months=max(retirement["years_to_retirement"], 0) * 12,
+            corpus_target=retirement["corpus_needed"],
+            paths=paths,
+            seed=seed,
+            chunk_size=chunk_size
+        )
+
+        success = simulation["success_probability"]
+        recommendations = [
+            f"{success:.0%} chance of reaching ₹{retirement['corpus_needed']:,} (today's value) by retirement",
+            f"Median projected corpus: ₹{simulation['corpus_percentiles']['p50']:,} in today's value"
+        ]
+        if success < 0.8:
+            recommendations.append("Increase your monthly investment or extend your horizon to improve your odds")
+        recommendations.extend(RETIREMENT_TIPS)
+
+        return {
+            "corpus_needed": retirement["corpus_needed"],
+            "years_to_retirement": retirement["years_to_retirement"],
+            "allocation": allocation,
+            **simulation,
+            "recommendations": recommendations
+        }
+
     def predict_investment_allocation(self, profile: Dict[str, Any]) -> Dict[str, Any]:
         """Predict optimal investment allocation"""
         age = profile.get('age', 30)
@@ -143,8 +439,7 @@ class FinancialPredictor:
             f"Allocate {equity_percent}% to equity for growth",
             f"Keep {debt_percent}% in debt for stability",
             f"Maintain {gold_percent}% in gold for inflation hedge",
-            "Rebalance portfolio quarterly",
-            "Consider tax-saving instruments"
+            *INVESTMENT_TIPS
         ]
         
         return {
@@ -156,6 +451,30 @@ class FinancialPredictor:
             "risk_level": risk_ability,
             "recommendations": recommendations
         }
+
+    def optimize_investment_allocation(self, profile: Dict[str, Any]) -> Dict[str, Any]:
+        """Allocation from the mean-variance frontier instead of the fixed rules.
+
+        Same shape as predict_investment_allocation; risk_adjusted_return is
+        the certainty-equivalent return at the profile's risk aversion.
+        """
+        optimized = optimize_allocation(profile)
+        allocation = optimized["allocation"]
+        return {
+            "allocation": allocation,
+            "expected_returns": {
+                "annual_return_percent": round(optimized["expected_return"] * 100, 2),
+                "risk_adjusted_return": round(optimized["risk_adjusted_return"] * 100, 2),
+                "annual_volatility_percent": round(optimized["volatility"] * 100, 2)
+            },
+            "risk_level": profile.get('risk_taking_ability', 'Moderate'),
+            "recommendations": [
+                f"Allocate {allocation['equity']}% to equity for growth",
+                f"Keep {allocation['debt']}% in debt for stability",
+                f"Maintain {allocation['gold']}% in gold for inflation hedge",
+                *INVESTMENT_TIPS
+            ]
+        }
     
     def assess_financial_risk(self, profile: Dict[str, Any]) -> Dict[str, Any]:
         """Assess financial risk profile"""
@@ -202,17 +521,9 @@ class FinancialPredictor:
         else:
             risk_category = "High Risk"
         
-        mitigation_strategies = [
-            "Build emergency fund of 6-12 months expenses",
-            "Increase insurance coverage to 10x annual income",
-            "Reduce unnecessary expenses",
-            "Consider additional income sources",
-            "Pay down high-interest debt first"
-        ]
-        
         return {
             "risk_score": min(risk_score, 100),
             "risk_category": risk_category,
             "risk_factors": risk_factors,
-            "mitigation_strategies": mitigation_strategies
+            "mitigation_strategies": list(MITIGATION_STRATEGIES)
         }
@@ -0,0 +1,208 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+MODEL_TYPES = ("retirement", "investment", "risk")
+
+# Version used when no artifact has been published for a model type
+DUMMY_VERSION = "dummy"
+
+DEFAULT_MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "artifacts")
+
+ARTIFACT_SUFFIX = ".joblib"
+METADATA_SUFFIX = ".json"
+ACTIVE_POINTER = "ACTIVE"
+
+class ModelRegistry:
+    """Versioned model artifacts on disk, loaded lazily per model type.
+
+    Artifacts live at ``<model_dir>/<model_type>/<version>.joblib`` with an
+    optional ``<version>.json`` metadata file next to them. The active version
+    of a type is the one named in ``<model_type>/ACTIVE``, or the newest
+    version on disk, or a dummy model when nothing has been published yet.
+
+    Uncompressed artifacts are loaded with ``mmap_mode`` so the numpy arrays
+    they hold are backed by the page cache and shared between forked workers.
+    """
+
+    def __init__(self, model_dir: Optional[str] = None, mmap_mode: Optional[str] = "r",
+                 refresh_interval: Optional[float] = None):
+        self.model_dir = model_dir or os.getenv("MODEL_DIR", DEFAULT_MODEL_DIR)
+        self.mmap_mode = mmap_mode
+        # How often a loaded model re-checks the ACTIVE pointer, so that a
+        # version activated through one worker is picked up by the others
+        self.refresh_interval = float(
+            refresh_interval if refresh_interval is not None
+            else os.getenv("MODEL_REFRESH_INTERVAL", "30")
+        )
+        self._loaded: Dict[str, Dict[str, Any]] = {}
+        # Version lookups for types that are not loaded yet: type -> (version, checked_at)
+        self._resolved: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def _type_dir(self, model_type: str) -> str:
+        if model_type not in MODEL_TYPES:
+            raise ValueError(f"Unknown model type: {model_type}")
+        return os.path.join(self.model_dir, model_type)
+
+    def _artifact_path(self, model_type: str, version: str) -> str:
+        return os.path.join(self._type_dir(model_type), version + ARTIFACT_SUFFIX)
+
+    def available_versions(self, model_type: str) -> List[str]:
+        """Published versions of a model type, oldest first"""
+        type_dir = self._type_dir(model_type)
+        if not os.path.isdir(type_dir):
+            return []
+        return sorted(
+            name[:-len(ARTIFACT_SUFFIX)]
+            for name in os.listdir(type_dir)
+            if name.endswith(ARTIFACT_SUFFIX)
+        )
+
+    def resolve_version(self, model_type: str) -> str:
+        """Version that should be serving for a model type, read from disk"""
+        pointer = os.path.join(self._type_dir(model_type), ACTIVE_POINTER)
+        try:
+            with open(pointer) as f:
+                version = f.read().strip()
+            if version == DUMMY_VERSION or (
+                version and os.path.exists(self._artifact_path(model_type, version))
+            ):
+                return version
+        except FileNotFoundError:
+            pass
+        versions = self.available_versions(model_type)
+        return versions[-1] if versions else DUMMY_VERSION
+
+    def active_version(self, model_type: str) -> str:
+        """Version currently serving for a model type, without forcing a load"""
+        entry = self._loaded.get(model_type)
+        now = time.monotonic()
+        if entry is not None:
+            if now >= entry["checked_at"] + self.refresh_interval:
+                # Picks up a version activated by another worker
+                self.get(model_type)
+                entry = self._loaded[model_type]
+            return entry["version"]
+        resolved = self._resolved.get(model_type)
+        if resolved is None or now >= resolved[1] + self.refresh_interval:
+            resolved = (self.resolve_version(model_type), now)
+            self._resolved[model_type] = resolved
+        return resolved[0]
+
+    def get(self, model_type: str):
+        """Return the active model for a type, loading it on first use"""
+        entry = self._loaded.get(model_type)
+        if entry is not None and time.monotonic() < entry["checked_at"] + self.refresh_interval:
+            return entry["model"]
+
+        with self._lock:
+            entry = self._loaded.get(model_type)
+            version = self.resolve_version(model_type)
+            if entry is not None and entry["version"] == version:
+                entry["checked_at"] = time.monotonic()
+                return entry["model"]
+            self._loaded[model_type] = self._load(model_type, version)
+            return self._loaded[model_type]["model"]
+
+    def activate(self, model_type: str, version: str) -> Dict[str, Any]:
+        """Hot-swap a model type to a published version.
+
+        The new model is loaded before it replaces the old one, so requests
+        keep being served by the previous version until the swap.
+        """
+        if version != DUMMY_VERSION and version not in self.available_versions(model_type):
+            raise ValueError(f"Unknown version '{version}' for model type '{model_type}'")
+
+        entry = self._load(model_type, version)
+        pointer = os.path.join(self._type_dir(model_type), ACTIVE_POINTER)
+        os.makedirs(os.path.dirname(pointer), exist_ok=True)
+        with open(pointer + ".tmp", "w") as f:
+            f.write(version)
+        os.replace(pointer + ".tmp", pointer)
+
+        with self._lock:
+            self._loaded[model_type] = entry
+        return self.describe(model_type)
+
+    def save(self, model_type: str, model, version: Optional[str] = None,
+             metadata: Optional[Dict[str, Any]] = None, compress: int = 0) -> str:
+        """Publish a fitted model as a new version.
+
+        Artifacts are written uncompressed by default so they can be
+        memory-mapped; compressed artifacts are smaller but load into
+        private memory in every worker.
+        """
+        import joblib
+
+        version = version or datetime.now().strftime("%Y%m%d%H%M%S")
+        path = self._artifact_path(model_type, version)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        joblib.dump(model, path + ".tmp", compress=compress)
+        os.replace(path + ".tmp", path)
+
+        info = dict(metadata or {})
+        info.update({
+            "model_type": model_type,
+            "version": version,
+            "compress": compress,
+            "saved_at": datetime.now().isoformat()
+        })
+        with open(os.path.join(os.path.dirname(path), version + METADATA_SUFFIX), "w") as f:
+            json.dump(info, f, indent=2, default=str)
+        return version
+
+    def metadata(self, model_type: str, version: str) -> Dict[str, Any]:
+        path = os.path.join(self._type_dir(model_type), version + METADATA_SUFFIX)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def describe(self, model_type: str) -> Dict[str, Any]:
+        entry = self._loaded.get(model_type)
+        return {
+            "model_type": model_type,
+            "loaded": entry is not None,
+            "active_version": self.active_version(model_type),
+            "available_versions": self.available_versions(model_type),
+            "loaded_at": entry["loaded_at"] if entry else None
+        }
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [self.describe(model_type) for model_type in MODEL_TYPES]
+
+    def _load(self, model_type: str, version: str) -> Dict[str, Any]:
+        if version == DUMMY_VERSION:
+            model = _fit_dummy_model()
+        else:
+            import joblib
+            # Compressed artifacts cannot be memory-mapped; joblib would warn and ignore it
+            compressed = self.metadata(model_type, version).get("compress", 0)
+            model = joblib.load(
+                self._artifact_path(model_type, version),
+                mmap_mode=None if compressed else self.mmap_mode
+            )
+        return {
+            "version": version,
+            "model": model,
+            "loaded_at": datetime.now(),
+            "checked_at": time.monotonic()
+        }
+
+def _fit_dummy_model():
+    """Demo model used until a trained artifact is published"""
+    from sklearn.ensemble import RandomForestRegressor
+
+    rng = np.random.RandomState(42)
+    dummy_features = rng.rand(100, 5)  # 5 features
+    dummy_targets = rng.rand(100)
+    return RandomForestRegressor(n_estimators=10, random_state=42).fit(dummy_features, dummy_targets)
+
+model_registry = ModelRegistry()
@@ -0,0 +1,110 @@
+import math
+import os
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+# Largest grid one sweep request may evaluate, and points per axis
+SWEEP_MAX_CELLS = int(os.getenv("SWEEP_MAX_CELLS", "100000"))
+SWEEP_MAX_AXIS_POINTS = 500
+
+SWEEP_AXES = ("retirement_age", "sip_step_up", "annual_return", "inflation")
+
+def sweep_points(start: float, stop: float, step: float) -> int:
+    """Number of points from ``start`` to ``stop`` inclusive, ``step`` apart"""
+    if not all(math.isfinite(bound) for bound in (start, stop, step)):
+        raise ValueError("Range bounds must be finite numbers")
+    if stop < start:
+        raise ValueError(f"Range end {stop} is below its start {start}")
+    if step <= 0:
+        raise ValueError("Range step must be positive")
+    count = (stop - start) / step
+    if not count < SWEEP_MAX_AXIS_POINTS:
+        raise ValueError(f"A range may have at most {SWEEP_MAX_AXIS_POINTS} points")
+    return int(np.floor(count + 1e-9)) + 1
+
+def sweep_values(start: float, stop: float, step: float, integer: bool = False) -> List[float]:
+    """Points from ``start`` to ``stop`` inclusive, ``step`` apart"""
+    count = sweep_points(start, stop, step)
+    values = np.round(start + step * np.arange(count), 10)
+    if integer:
+        if not np.all(values == np.round(values)):
+            raise ValueError("Retirement ages must be whole years")
+        return [int(value) for value in values]
+    return values.tolist()
+
+def retirement_sweep(age: int, annual_income: float, retirement_ages: Sequence[int],
+                     step_ups: Sequence[float], annual_returns: Sequence[float],
+                     inflations: Sequence[float]) -> Dict[str, Any]:
+    """Required starting SIP over the Cartesian grid of the four sweep axes.
+
+    Uses predict_retirement's corpus (25x 70% of income, in today's money),
+    grown by inflation to the retirement date. The SIP rises by the step-up
+    once a year, so its future value is a growing annuity:
+
+        S * ((1+m)^12 - 1) / m * (R^n - (1+g)^n) / (R - (1+g)),  R = (1+m)^12
+
+    with monthly return m, step-up g and n years. With no step-up it reduces
+    to predict_retirement's level annuity, which is then evaluated the same
+    way (Python pow per distinct rate and horizon) so the results match it
+    exactly. Returns integer SIPs shaped (ages, step-ups, returns, inflations).
+    Raises ValueError when an input puts a SIP or corpus out of range.
+    """
+    try:
+        return _retirement_sweep(age, annual_income, retirement_ages, step_ups, annual_returns, inflations)
+    except (OverflowError, ZeroDivisionError) as e:
+        raise ValueError(f"Sweep parameters are out of range: {e}") from e
+
+def _retirement_sweep(age: int, annual_income: float, retirement_ages: Sequence[int],
+                      step_ups: Sequence[float], annual_returns: Sequence[float],
+                      inflations: Sequence[float]) -> Dict[str, Any]:
+    ages = np.asarray(retirement_ages, dtype=np.int64)
+    years = ages - age
+    horizon = np.maximum(years, 0)
+    g = np.asarray(step_ups, dtype=float)[None, :, None]
+    rates = [rate / 12 for rate in annual_returns]
+    m = np.array(rates)[None, None, :]
+    inflation = np.asarray(inflations, dtype=float)
+
+    corpus_needed = annual_income * 0.7 * 25
+    nominal = corpus_needed * (1 + inflation[None, :]) ** horizon[:, None]
+
+    # Level annuity factor per (age, rate), as predict_retirement computes it
+    level = 0.0
+    if np.any(g == 0):
+        level = np.array([
+            [((1 + rate) ** (int(n) * 12) - 1) / rate if rate else 12.0 * n for rate in rates]
+            for n in horizon
+        ])[:, None, :]
+
+    n = horizon[:, None, None].astype(float)
+    annual = (1 + m) ** 12
+    with np.errstate(divide="ignore", invalid="ignore"):
+        year_factor = np.where(m != 0, (annual - 1) / m, 12.0)
+        growing = np.where(
+            np.isclose(annual, 1 + g),
+            n * annual ** (n - 1),
+            (annual ** n - (1 + g) ** n) / (annual - (1 + g))
+        )
+    annuity = np.where(g == 0, level, year_factor * growing)
+
+    has_horizon = (horizon > 0)[:, None, None, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        monthly_sip = np.where(
+            has_horizon,
+            nominal[:, None, None, :] / annuity[..., None],
+            nominal[:, None, None, :]
+        )
+
+    # A non-positive or infinite annuity, or an overflowing corpus, has no
+    # meaningful SIP and would not survive the int64 conversion
+    if not (np.all(np.isfinite(nominal)) and np.all(np.isfinite(monthly_sip))
+            and np.all(monthly_sip >= 0) and np.max(monthly_sip, initial=0) < 2 ** 63):
+        raise ValueError("Sweep parameters are out of range: no finite monthly SIP for some combinations")
+
+    return {
+        "years_to_retirement": years.tolist(),
+        "corpus_needed": int(corpus_needed),
+        "corpus_needed_nominal": np.trunc(nominal).astype(np.int64).tolist(),
+        "monthly_sip": np.trunc(monthly_sip).astype(np.int64).tolist()
+    }
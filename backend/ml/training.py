@@ -0,0 +1,260 @@
+import hashlib
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ml.predictor import FEATURE_NAMES, encode_features
+from ml.registry import ModelRegistry, model_registry
+from storage.repositories import FinanceRepository, UserRepository
+
+# Profile fields encode_features() reads; everything else stays in storage
+PROFILE_FIELDS = ("user_id", "age", "annual_income", "monthly_expenses",
+                  "risk_taking_ability", "preferred_investment_horizon")
+RECORD_FIELDS = ("user_id", "date", "amount", "transaction_type")
+
+# What each model type learns from a user's transaction history, one
+# column of the target matrix each:
+#   retirement - savings rate, (income - expenses) / income
+#   investment - share of income invested
+#   risk       - share of months spending more than was earned
+TARGETS = {
+    "retirement": "savings_rate",
+    "investment": "investment_share",
+    "risk": "deficit_month_share",
+}
+
+@dataclass
+class TrainingConfig:
+    max_rows: int = 500000      # training rows kept in memory, sampled uniformly
+    holdout: float = 0.2        # share of users held out for evaluation
+    chunk_size: int = 10000     # users encoded per feature chunk
+    page_size: int = 1000       # documents fetched per storage query
+    n_estimators: int = 100
+    max_depth: Optional[int] = 12
+    n_jobs: int = -1
+    seed: int = 42
+    compress: int = 3
+
+class TransactionHistory:
+    """Monthly income and outflow totals of one user"""
+
+    __slots__ = ("months", "records")
+
+    def __init__(self):
+        self.months: Dict[Tuple[int, int], List[float]] = {}
+        self.records = 0
+
+    def add(self, record: Dict[str, Any]):
+        date = record["date"]
+        month = self.months.setdefault((date.year, date.month), [0.0, 0.0, 0.0])
+        kind = record.get("transaction_type")
+        if kind == "income":
+            month[0] += record["amount"]
+        elif kind == "expense":
+            month[1] += record["amount"]
+        elif kind == "investment":
+            month[2] += record["amount"]
+        self.records += 1
+
+    def targets(self) -> Optional[List[float]]:
+        """One value per TARGETS entry, or None when there is no income to relate to"""
+        totals = np.array(list(self.months.values())).reshape(-1, 3)
+        income, expenses, invested = totals.sum(axis=0)
+        if income <= 0:
+            return None
+        return [
+            float(np.clip((income - expenses) / income, -1.0, 1.0)),
+            float(np.clip(invested / income, 0.0, 1.0)),
+            float(np.mean(totals[:, 1] + totals[:, 2] > totals[:, 0]))
+        ]
+
+class Reservoir:
+    """Uniform sample of at most ``capacity`` rows from a stream (algorithm R).
+
+    Arrays are allocated once up front, so memory stays the same however
+    many rows go through.
+    """
+
+    def __init__(self, capacity: int, n_features: int, n_targets: int, rng: np.random.Generator):
+        self.capacity = capacity
+        self.features = np.empty((capacity, n_features))
+        self.targets = np.empty((capacity, n_targets))
+        self.rng = rng
+        self.size = 0
+        self.seen = 0
+
+    def add(self, features: np.ndarray, targets: np.ndarray):
+        free = min(len(features), self.capacity - self.size)
+        if free:
+            self.features[self.size:self.size + free] = features[:free]
+            self.targets[self.size:self.size + free] = targets[:free]
+            self.size += free
+        if free < len(features):
+            # Row k of the stream replaces a random slot with probability capacity / (k + 1)
+            positions = self.seen + free + np.arange(len(features) - free)
+            slots = self.rng.integers(0, positions + 1)
+            keep = slots < self.capacity
+            self.features[slots[keep]] = features[free:][keep]
+            self.targets[slots[keep]] = targets[free:][keep]
+        self.seen += len(features)
+
+    def rows(self) -> Tuple[np.ndarray, np.ndarray]:
+        return self.features[:self.size], self.targets[:self.size]
+
+    @property
+    def nbytes(self) -> int:
+        return self.features.nbytes + self.targets.nbytes
+
+def is_holdout(user_id: str, fraction: float) -> bool:
+    """Stable split by user, so a user's rows never end up on both sides"""
+    digest = hashlib.blake2b(user_id.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2 ** 64 < fraction
+
+async def user_histories(users: UserRepository, finance: FinanceRepository,
+                         page_size: int = 1000) -> AsyncIterator[Tuple[Dict[str, Any], TransactionHistory]]:
+    """Yield each user profile with its transaction history.
+
+    Both collections are streamed once in user_id order and merged, so
+    only one user's monthly totals are held at a time.
+    """
+    records = finance.iter_all(
+        order_by=(("user_id", "asc"), ("id", "asc")), fields=RECORD_FIELDS, page_size=page_size
+    )
+    try:
+        record = await anext(records, None)
+        async for profile in users.iter_all(
+            order_by=(("user_id", "asc"),), fields=PROFILE_FIELDS, page_size=page_size
+        ):
+            user_id = profile["user_id"]
+            history = TransactionHistory()
+            # Records of users without a profile are skipped
+            while record is not None and record["user_id"] < user_id:
+                record = await anext(records, None)
+            while record is not None and record["user_id"] == user_id:
+                history.add(record)
+                record = await anext(records, None)
+            yield profile, history
+    finally:
+        await records.aclose()
+
+async def collect_samples(users: UserRepository, finance: FinanceRepository, config: TrainingConfig,
+                          log: Callable[[str], None] = print) -> Tuple[Reservoir, Reservoir, Dict[str, int]]:
+    """Stream storage into fixed-size training and holdout samples"""
+    rng = np.random.default_rng(config.seed)
+    holdout_rows = max(1, int(config.max_rows * config.holdout))
+    train = Reservoir(config.max_rows - holdout_rows, len(FEATURE_NAMES), len(TARGETS), rng)
+    holdout = Reservoir(holdout_rows, len(FEATURE_NAMES), len(TARGETS), rng)
+    stats = {"users": 0, "records": 0, "labelled_users": 0}
+
+    profiles: List[Dict[str, Any]] = []
+    targets: List[List[float]] = []
+    held_out: List[bool] = []
+
+    def flush():
+        features = encode_features(profiles)
+        values = np.array(targets)
+        mask = np.array(held_out)
+        train.add(features[~mask], values[~mask])
+        holdout.add(features[mask], values[mask])
+        profiles.clear()
+        targets.clear()
+        held_out.clear()
+
+    async for profile, history in user_histories(users, finance, config.page_size):
+        stats["users"] += 1
+        stats["records"] += history.records
+        values = history.targets()
+        if values is not None:
+            profiles.append(profile)
+            targets.append(values)
+            held_out.append(is_holdout(profile["user_id"], config.holdout))
+            if len(profiles) >= config.chunk_size:
+                flush()
+        if stats["users"] % 10000 == 0:
+            log(f"Read {stats['users']} users, {stats['records']} records...")
+    if profiles:
+        flush()
+
+    stats["labelled_users"] = train.seen + holdout.seen
+    return train, holdout, stats
+
+def evaluate(model, features: np.ndarray, targets: np.ndarray, baseline: float) -> Dict[str, float]:
+    """Holdout error of a model, next to that of predicting the training mean"""
+    predictions = model.predict(features)
+    errors = predictions - targets
+    variance = float(np.var(targets))
+    return {
+        "mae": round(float(np.mean(np.abs(errors))), 6),
+        "rmse": round(float(np.sqrt(np.mean(errors ** 2))), 6),
+        "r2": round(1 - float(np.mean(errors ** 2)) / variance, 6) if variance > 0 else 0.0,
+        "baseline_mae": round(float(np.mean(np.abs(targets - baseline))), 6)
+    }
+
+async def train_models(users: UserRepository, finance: FinanceRepository,
+                       config: Optional[TrainingConfig] = None, registry: Optional[ModelRegistry] = None,
+                       version: Optional[str] = None, activate: bool = False,
+                       log: Callable[[str], None] = print) -> Dict[str, Dict[str, Any]]:
+    """Train every model type on stored data and publish it as a new version.
+
+    Memory is bounded by ``config.max_rows`` whatever the size of the
+    collections; beyond that the rows are a uniform sample. Returns the
+    metadata written for each model type.
+    """
+    from sklearn.ensemble import RandomForestRegressor
+
+    config = config or TrainingConfig()
+    registry = registry or model_registry
+    started = time.perf_counter()
+    train, holdout, stats = await collect_samples(users, finance, config, log)
+    train_features, train_targets = train.rows()
+    holdout_features, holdout_targets = holdout.rows()
+    if len(train_features) < 2 or len(holdout_features) < 1:
+        raise ValueError(
+            f"Not enough labelled users to train ({train.seen} training, {holdout.seen} holdout)"
+        )
+    log(f"Sampled {len(train_features)} of {train.seen} training and "
+        f"{len(holdout_features)} of {holdout.seen} holdout rows "
+        f"({(train.nbytes + holdout.nbytes) / 2 ** 20:.1f} MiB)")
+
+    version = version or time.strftime("%Y%m%d%H%M%S")
+    published = {}
+    for column, (model_type, target) in enumerate(TARGETS.items()):
+        fit_started = time.perf_counter()
+        model = RandomForestRegressor(
+            n_estimators=config.n_estimators,
+            max_depth=config.max_depth,
+            n_jobs=config.n_jobs,
+            random_state=config.seed
+        ).fit(train_features, train_targets[:, column])
+        fit_seconds = time.perf_counter() - fit_started
+        metrics = evaluate(
+            model, holdout_features, holdout_targets[:, column],
+            float(np.mean(train_targets[:, column]))
+        )
+        # Serving predicts a row at a time, where a thread pool only adds overhead
+        model.set_params(n_jobs=None)
+
+        metadata = {
+            "target": target,
+            "features": list(FEATURE_NAMES),
+            "training_rows": int(len(train_features)),
+            "training_rows_seen": int(train.seen),
+            "holdout_rows": int(len(holdout_features)),
+            "holdout_rows_seen": int(holdout.seen),
+            "source": {**stats, "backend": finance.backend.name},
+            "holdout_metrics": metrics,
+            "fit_seconds": round(fit_seconds, 3),
+            "config": asdict(config)
+        }
+        registry.save(model_type, model, version=version, metadata=metadata, compress=config.compress)
+        if activate:
+            registry.activate(model_type, version)
+        published[model_type] = registry.metadata(model_type, version)
+        log(f"{model_type}: {target} MAE {metrics['mae']} (baseline {metrics['baseline_mae']}), "
+            f"R² {metrics['r2']}, fit in {fit_seconds:.1f}s")
+
+    log(f"Published version {version}{' (active)' if activate else ''} "
+        f"in {time.perf_counter() - started:.1f}s")
+    return published
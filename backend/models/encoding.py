@@ -0,0 +1,103 @@
+import json
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Type
+
+import numpy as np
+from fastapi import Request
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+# orjson and msgpack are optional: without orjson responses fall back to the
+# standard library encoder, and without msgpack only JSON is offered
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - depends on the environment
+    msgpack = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack", "application/vnd.msgpack")
+
+def _default(value: Any) -> Any:
+    """Encode the non-JSON types found in stored documents and predictions.
+
+    Datetimes become ISO 8601 strings, exactly as FastAPI's own encoder
+    writes them, so switching encoders does not change any payload.
+    """
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+def dumps_json(content: Any) -> bytes:
+    if orjson is not None:
+        # orjson writes datetimes in isoformat() form natively; subclasses
+        # such as Firestore's DatetimeWithNanoseconds reach _default
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+def dumps_msgpack(content: Any) -> bytes:
+    return msgpack.packb(content, default=_default, use_bin_type=True, datetime=False)
+
+def wants_msgpack(request: Request) -> bool:
+    """True when the Accept header prefers MessagePack over JSON"""
+    accept = request.headers.get("accept")
+    if msgpack is None or not accept or "msgpack" not in accept:
+        return False
+    best_msgpack = best_json = 0.0
+    for item in accept.split(","):
+        media_type, *params = [part.strip() for part in item.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if media_type.lower() in MSGPACK_MEDIA_TYPES:
+            best_msgpack = max(best_msgpack, quality)
+        elif media_type.lower() in (JSON_MEDIA_TYPE, "application/*", "*/*"):
+            best_json = max(best_json, quality)
+    return best_msgpack > 0 and best_msgpack >= best_json
+
+def encoded_response(request: Request, content: Any, status_code: int = 200,
+                     headers: Optional[Dict[str, str]] = None) -> Response:
+    """Serialize trusted data directly, without response_model validation.
+
+    Returning a Response skips FastAPI's validation and jsonable_encoder
+    pass; callers are responsible for shaping ``content`` to the documented
+    schema (see project()). MessagePack is returned when the client asks for
+    it in Accept, JSON otherwise.
+    """
+    if wants_msgpack(request):
+        body, media_type = dumps_msgpack(content), MSGPACK_MEDIA_TYPE
+    else:
+        body, media_type = dumps_json(content), JSON_MEDIA_TYPE
+    response = Response(body, status_code=status_code, media_type=media_type, headers=headers)
+    response.headers["Vary"] = "Accept"
+    return response
+
+def project(schema: Type[BaseModel], document: Dict[str, Any]) -> Dict[str, Any]:
+    """The fields of ``schema`` taken from a stored document, defaults filled in.
+
+    For documents the API wrote itself, this gives the same output as
+    validating them with the schema, at a fraction of the cost.
+    """
+    return project_many(schema, [document])[0]
+
+def project_many(schema: Type[BaseModel], documents: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    fields = [
+        (name, None if field.is_required() else field.default)
+        for name, field in schema.model_fields.items()
+    ]
+    return [{name: document.get(name, default) for name, default in fields} for document in documents]
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from typing import Optional
 from datetime import datetime
+from ml.sweep import SWEEP_MAX_CELLS, sweep_points
 
 class UserProfile(BaseModel):
     name: str
@@ -43,10 +44,11 @@ class FinanceRecord(BaseModel):
 class FinanceRecordResponse(FinanceRecord):
     id: str
     created_at: datetime
+    updated_at: Optional[datetime] = None  # set once the record has been edited
 
 class PredictionRequest(BaseModel):
     user_profile: UserProfile
-    prediction_type: str  # retirement, investment, risk_assessment
+    prediction_type: str  # retirement, investment, risk_assessment, combined
 
 class PredictionResponse(BaseModel):
     prediction_type: str
@@ -56,3 +58,53 @@ class PredictionResponse(BaseModel):
     investment_allocation: dict
     confidence_score: float
     generated_at: datetime
+    details: Optional[dict] = None  # per-type results keyed by prediction type
+
+class SweepRange(BaseModel):
+    start: float
+    stop: float  # inclusive
+    step: float = Field(1, gt=0)
+
+    @model_validator(mode="after")
+    def check_points(self):
+        sweep_points(self.start, self.stop, self.step)
+        return self
+
+# Per-axis bounds keep every sweep point inside the range where the annuity
+# math stays finite
+class AgeSweepRange(SweepRange):
+    start: float = Field(ge=18, le=100)
+    stop: float = Field(ge=18, le=100)
+    step: float = Field(1, ge=1, le=82)
+
+class RateSweepRange(SweepRange):
+    start: float = Field(ge=-0.5, le=1)
+    stop: float = Field(ge=-0.5, le=1)
+    step: float = Field(0.01, ge=0.0001, le=1.5)
+
+class RetirementSweepRequest(BaseModel):
+    user_profile: UserProfile
+    retirement_age: Optional[AgeSweepRange] = None  # default: the profile's planned retirement age
+    sip_step_up: Optional[RateSweepRange] = None  # yearly SIP increase, 0.1 = 10%; default 0
+    annual_return: Optional[RateSweepRange] = None  # default 0.12
+    inflation: Optional[RateSweepRange] = None  # default 0
+
+    @model_validator(mode="after")
+    def check_cells(self):
+        cells = 1
+        for bounds in (self.retirement_age, self.sip_step_up, self.annual_return, self.inflation):
+            if bounds is not None:
+                cells *= sweep_points(bounds.start, bounds.stop, bounds.step)
+        if cells > SWEEP_MAX_CELLS:
+            raise ValueError(f"Sweep has {cells} combinations, at most {SWEEP_MAX_CELLS} are allowed")
+        return self
+
+class BatchPredictionRequest(BaseModel):
+    user_profiles: list[UserProfile]
+    prediction_type: str  # retirement, investment, risk_assessment
+
+class BatchPredictionResponse(BaseModel):
+    prediction_type: str
+    count: int
+    results: list[dict]
+    generated_at: datetime
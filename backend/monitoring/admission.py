@@ -0,0 +1,326 @@
+import asyncio
+import json
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+
+from monitoring.metrics import admission_rejections, admission_wait_duration
+from monitoring.middleware import UNMATCHED_ROUTE, route_template
+
+LIMIT_FIELDS = ("max_concurrent", "max_queue", "queue_timeout")
+
+class Rejected(Exception):
+    """Raised when a request is shed instead of admitted"""
+
+    def __init__(self, status_code: int, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+class ConcurrencyLimiter:
+    """At most ``max_concurrent`` requests running, ``max_queue`` more waiting.
+
+    Waiters are admitted first in, first out. A request that waits longer
+    than ``queue_timeout`` seconds, or finds the queue full, is rejected.
+    Limits may be changed while requests are running: raising
+    ``max_concurrent`` admits waiters right away, lowering it lets running
+    requests finish.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, retry_after: float):
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise Rejected(503, "queue_full", retry_after)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._waiters.append(future)
+        timer = loop.call_later(self.queue_timeout, self._expire, future, retry_after)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                # The slot was handed over just as the client went away
+                self.release()
+            elif future in self._waiters:
+                self._waiters.remove(future)
+            raise
+        finally:
+            timer.cancel()
+
+    def _expire(self, future: asyncio.Future, retry_after: float):
+        if not future.done():
+            self._waiters.remove(future)
+            future.set_exception(Rejected(503, "queue_timeout", retry_after))
+
+    def release(self):
+        self.active -= 1
+        self.wake()
+
+    def wake(self):
+        """Hand free slots to waiters, oldest first"""
+        while self.active < self.max_concurrent and self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                self.active += 1
+                future.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "active": self.active,
+            "queued": self.queued
+        }
+
+class TokenBuckets:
+    """One token bucket per client, refilled at ``rate`` tokens per second.
+
+    A bucket holds at most ``burst`` tokens and every request takes one.
+    Only the ``max_clients`` most recently seen clients are remembered; a
+    forgotten client comes back with a full bucket. A rate of 0 disables
+    the limit.
+    """
+
+    def __init__(self, rate: float, burst: int, max_clients: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        # client -> (tokens, refilled_at)
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def take(self, client: str) -> float:
+        """Take a token; returns 0 if one was available, else seconds until one is"""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            tokens = float(self.burst)
+        else:
+            tokens = min(float(self.burst), bucket[0] + (now - bucket[1]) * self.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+        self._buckets[client] = (tokens, now)
+        self._buckets.move_to_end(client)
+        while len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self):
+        self._buckets.clear()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+class AdmissionController:
+    """Admission control for the routes under ``prefixes``.
+
+    Every route template gets its own ConcurrencyLimiter, using the default
+    limits unless the route has overrides. On top of that each client
+    (the ``client_header`` value when configured, else the peer address)
+    is rate limited by a token bucket shared across those routes.
+
+    Over capacity a request is answered right away with 503 (queue full or
+    waited too long) or 429 (client over its rate), both with Retry-After,
+    instead of piling up behind requests the server cannot finish in time.
+    State is per process; with several workers the limits apply to each.
+
+    By default the queue holds what the running requests can work through
+    within ``queue_timeout``: queue_timeout * max_concurrent / service_time,
+    with ``service_time`` the expected seconds per request. A request that
+    finds the queue full could not have been served in time anyway, while
+    bursts of fast requests wait briefly instead of being shed.
+    """
+
+    def __init__(self, prefixes: Tuple[str, ...] = ("/api/predict",),
+                 max_concurrent: Optional[int] = None, max_queue: Optional[int] = None,
+                 queue_timeout: float = 2.0, service_time: float = 0.05, retry_after: float = 1.0,
+                 rate: float = 0.0, burst: int = 20, client_header: Optional[str] = None,
+                 routes: Optional[Dict[str, Dict[str, Any]]] = None):
+        cpus = os.cpu_count() or 1
+        max_concurrent = max_concurrent or cpus * 2
+        if max_queue is None:
+            max_queue = math.ceil(queue_timeout * max_concurrent / service_time)
+        self.prefixes = prefixes
+        self.defaults = {
+            "max_concurrent": max_concurrent,
+            "max_queue": max_queue,
+            "queue_timeout": queue_timeout
+        }
+        self.retry_after = retry_after
+        self.client_header = client_header.lower().encode() if client_header else None
+        self.overrides: Dict[str, Dict[str, Any]] = {}
+        self.limiters: Dict[str, ConcurrencyLimiter] = {}
+        self.buckets = TokenBuckets(rate, burst)
+        for route, limits in (routes or {}).items():
+            self.configure(route, **limits)
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        """Limits from the environment; all optional.
+
+        ADMISSION_PREFIXES        comma-separated path prefixes (/api/predict)
+        ADMISSION_MAX_CONCURRENT  running requests per route (2 per CPU)
+        ADMISSION_MAX_QUEUE       waiting requests per route (derived, see above)
+        ADMISSION_QUEUE_TIMEOUT   seconds a request may wait (2)
+        ADMISSION_SERVICE_TIME    expected seconds per request, sizes the queue (0.05)
+        ADMISSION_RETRY_AFTER     Retry-After on 503s, in seconds (1)
+        ADMISSION_CLIENT_RATE     requests per second per client, 0 for no limit (0)
+        ADMISSION_CLIENT_BURST    requests a client may send at once (20)
+        ADMISSION_CLIENT_HEADER   header identifying clients, else the peer address
+        ADMISSION_ROUTES          JSON of per-route limits
+        """
+        concurrent = os.getenv("ADMISSION_MAX_CONCURRENT")
+        queue = os.getenv("ADMISSION_MAX_QUEUE")
+        return cls(
+            prefixes=tuple(
+                prefix.strip() for prefix in os.getenv("ADMISSION_PREFIXES", "/api/predict").split(",")
+                if prefix.strip()
+            ),
+            max_concurrent=int(concurrent) if concurrent else None,
+            max_queue=int(queue) if queue else None,
+            queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2")),
+            service_time=float(os.getenv("ADMISSION_SERVICE_TIME", "0.05")),
+            retry_after=float(os.getenv("ADMISSION_RETRY_AFTER", "1")),
+            rate=float(os.getenv("ADMISSION_CLIENT_RATE", "0")),
+            burst=int(os.getenv("ADMISSION_CLIENT_BURST", "20")),
+            client_header=os.getenv("ADMISSION_CLIENT_HEADER") or None,
+            # e.g. {"/api/predict/batch": {"max_concurrent": 2, "max_queue": 4}}
+            routes=json.loads(os.getenv("ADMISSION_ROUTES", "{}"))
+        )
+
+    def applies(self, path: str) -> bool:
+        return any(path.startswith(prefix) for prefix in self.prefixes)
+
+    def limits(self, route: str) -> Dict[str, Any]:
+        return {**self.defaults, **self.overrides.get(route, {})}
+
+    def limiter(self, route: str) -> ConcurrencyLimiter:
+        limiter = self.limiters.get(route)
+        if limiter is None:
+            limiter = self.limiters[route] = ConcurrencyLimiter(**self.limits(route))
+        return limiter
+
+    def configure(self, route: Optional[str] = None, **limits):
+        """Change the default limits, or one route's, taking effect immediately"""
+        unknown = set(limits) - set(LIMIT_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown limits: {', '.join(sorted(unknown))}")
+        limits = {name: value for name, value in limits.items() if value is not None}
+        if route is None:
+            self.defaults.update(limits)
+        else:
+            self.overrides.setdefault(route, {}).update(limits)
+        for name, limiter in self.limiters.items():
+            if route is None or name == route:
+                for field, value in self.limits(name).items():
+                    setattr(limiter, field, value)
+                limiter.wake()
+
+    def configure_clients(self, rate: Optional[float] = None, burst: Optional[int] = None):
+        if rate is not None:
+            self.buckets.rate = rate
+        if burst is not None:
+            self.buckets.burst = burst
+        self.buckets.clear()
+
+    def client_key(self, scope) -> str:
+        if self.client_header is not None:
+            for name, value in scope["headers"]:
+                if name == self.client_header:
+                    return value.decode("latin-1")
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    @asynccontextmanager
+    async def admit(self, route: str, client: str):
+        wait = self.buckets.take(client)
+        if wait > 0:
+            admission_rejections.inc(route=route, reason="rate_limited")
+            raise Rejected(429, "rate_limited", wait)
+
+        limiter = self.limiter(route)
+        started = time.perf_counter()
+        try:
+            await limiter.acquire(self.retry_after)
+        except Rejected as e:
+            admission_rejections.inc(route=route, reason=e.reason)
+            raise
+        admission_wait_duration.observe(time.perf_counter() - started, route=route)
+        try:
+            yield
+        finally:
+            limiter.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "prefixes": list(self.prefixes),
+            "defaults": dict(self.defaults),
+            "overrides": {route: dict(limits) for route, limits in self.overrides.items()},
+            "routes": {route: limiter.stats() for route, limiter in self.limiters.items()},
+            "clients": {
+                "rate": self.buckets.rate,
+                "burst": self.buckets.burst,
+                "tracked": len(self.buckets)
+            },
+            "retry_after": self.retry_after
+        }
+
+REJECTION_DETAILS = {
+    "queue_full": "Prediction service is at capacity, please retry",
+    "queue_timeout": "Prediction service is at capacity, please retry",
+    "rate_limited": "Too many requests, please slow down"
+}
+
+class AdmissionMiddleware:
+    """ASGI middleware applying an AdmissionController before routing"""
+
+    def __init__(self, app, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller or admission_controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.controller.applies(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        route = route_template(scope)
+        if route == UNMATCHED_ROUTE:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            async with self.controller.admit(route, self.controller.client_key(scope)):
+                await self.app(scope, receive, send)
+        except Rejected as e:
+            response = JSONResponse(
+                {"detail": REJECTION_DETAILS[e.reason]},
+                status_code=e.status_code,
+                headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))}
+            )
+            await response(scope, receive, send)
+
+admission_controller = AdmissionController.from_env()
@@ -0,0 +1,58 @@
+import time
+from typing import Optional
+
+from starlette.routing import Match
+
+from monitoring.metrics import http_request_duration, http_requests, http_requests_in_flight
+
+# Label used for requests that match no route, so scanners probing random
+# paths cannot blow up the number of time series
+UNMATCHED_ROUTE = "<unmatched>"
+
+def route_template(scope) -> str:
+    """Path template of the route a request will be dispatched to"""
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match != Match.NONE:
+            return getattr(route, "path", UNMATCHED_ROUTE)
+    return UNMATCHED_ROUTE
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route request counts, latency and in-flight requests.
+
+    Requests are labelled with the route template ("/api/finance/{record_id}")
+    rather than the raw path, which keeps label cardinality bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(scope)
+        status: Optional[int] = None
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc(method=method, route=route)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            status = 500
+            raise
+        finally:
+            # Streaming responses are timed until their last chunk is sent
+            elapsed = time.perf_counter() - started
+            http_requests_in_flight.dec(method=method, route=route)
+            labels = {"method": method, "route": route, "status": str(status or 500)}
+            http_requests.inc(**labels)
+            http_request_duration.observe(elapsed, **labels)
@@ -0,0 +1,250 @@
+import asyncio
+import cProfile
+import io
+import json
+import marshal
+import os
+import pstats
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs
+
+DEFAULT_PROFILE_DIR = os.path.join(tempfile.gettempdir(), "finance-app-profiles")
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY_PARAM = "profile"
+
+# Ids are generated here; anything else is rejected before touching the filesystem
+PROFILE_ID_PATTERN = re.compile(r"^[0-9]{20}-[0-9a-f]{12}$")
+
+class ProfileStore:
+    """Profiles on disk, keeping only the newest ``max_profiles``.
+
+    Each profile is ``<id>.json`` (request metadata) plus either
+    ``<id>.prof`` (cProfile/pstats data, readable by snakeviz or gprof2dot)
+    or ``<id>.folded`` (collapsed stacks, one "frame;frame;frame count" line
+    per stack, the input format of flamegraph.pl and speedscope).
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_profiles: Optional[int] = None):
+        self.directory = directory or os.getenv("PROFILE_DIR", DEFAULT_PROFILE_DIR)
+        self.max_profiles = max_profiles or int(os.getenv("PROFILE_MAX_COUNT", "100"))
+        self._lock = threading.Lock()
+
+    def new_id(self) -> str:
+        return f"{datetime.now().strftime('%Y%m%d%H%M%S%f')}-{uuid.uuid4().hex[:12]}"
+
+    def _path(self, profile_id: str, suffix: str) -> str:
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            raise KeyError(profile_id)
+        return os.path.join(self.directory, profile_id + suffix)
+
+    def save(self, profile_id: str, data: bytes, suffix: str, metadata: Dict[str, Any]):
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self._path(profile_id, suffix), "wb") as f:
+                f.write(data)
+            with open(self._path(profile_id, ".json"), "w") as f:
+                json.dump({**metadata, "id": profile_id, "format": suffix.lstrip(".")}, f, default=str)
+            self._evict()
+
+    def _evict(self):
+        # Ids start with a timestamp, so name order is age order
+        ids = self.ids()
+        for profile_id in ids[:max(0, len(ids) - self.max_profiles)]:
+            for suffix in (".json", ".prof", ".folded"):
+                try:
+                    os.remove(self._path(profile_id, suffix))
+                except FileNotFoundError:
+                    pass
+
+    def ids(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            name[:-len(".json")] for name in os.listdir(self.directory)
+            if name.endswith(".json") and PROFILE_ID_PATTERN.match(name[:-len(".json")])
+        )
+
+    def metadata(self, profile_id: str) -> Dict[str, Any]:
+        try:
+            with open(self._path(profile_id, ".json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise KeyError(profile_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Metadata of every stored profile, newest first"""
+        profiles = []
+        for profile_id in reversed(self.ids()):
+            try:
+                profiles.append(self.metadata(profile_id))
+            except (KeyError, ValueError):
+                continue
+        return profiles
+
+    def data_path(self, profile_id: str) -> str:
+        """Path of the profile data file"""
+        path = self._path(profile_id, "." + self.metadata(profile_id)["format"])
+        if not os.path.exists(path):
+            raise KeyError(profile_id)
+        return path
+
+    def summary(self, profile_id: str, sort: str = "cumulative", limit: int = 50) -> str:
+        """Human-readable report: a pstats table, or the heaviest collapsed stacks"""
+        path = self.data_path(profile_id)
+        if path.endswith(".prof"):
+            output = io.StringIO()
+            pstats.Stats(path, stream=output).strip_dirs().sort_stats(sort).print_stats(limit)
+            return output.getvalue()
+        with open(path) as f:
+            stacks = [line.rsplit(" ", 1) for line in f.read().splitlines() if line]
+        stacks.sort(key=lambda item: int(item[1]), reverse=True)
+        return "\n".join(f"{count:>8} {stack}" for stack, count in stacks[:limit]) + "\n"
+
+profile_store = ProfileStore()
+
+class StackSampler:
+    """Samples one thread's Python stack at a fixed interval into collapsed-stack counts"""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def folded(self) -> bytes:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items()).encode()
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles selected requests.
+
+    A request is profiled when it carries ``X-Profile: <PROFILE_TOKEN>`` or
+    ``?profile=<PROFILE_TOKEN>`` (on demand; disabled while PROFILE_TOKEN is
+    unset), or at random with probability PROFILE_SAMPLE_RATE. The profile id
+    is returned in the ``X-Profile-Id`` response header and the profile can
+    be fetched from /api/admin/profiles/{id}.
+
+    PROFILE_MODE selects ``cprofile`` (deterministic, exact call counts,
+    noticeable overhead) or ``sample`` (stack sampling every
+    PROFILE_SAMPLE_INTERVAL seconds, flamegraph-ready, low overhead).
+
+    Both profile the event loop thread, so coroutines of other requests
+    running concurrently show up too; work handed to the storage and
+    inference pools appears as the time spent awaiting it. Only one request
+    is profiled at a time per process. Requests that are not profiled only
+    pay for a header scan and, with sampling enabled, one random draw.
+    """
+
+    def __init__(self, app, store: Optional[ProfileStore] = None):
+        self.app = app
+        self.store = store or profile_store
+        self.token = os.getenv("PROFILE_TOKEN") or None
+        self.sample_rate = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+        self.mode = os.getenv("PROFILE_MODE", "cprofile")
+        if self.mode not in ("cprofile", "sample"):
+            raise ValueError(f"Unknown profile mode: {self.mode}")
+        self.sample_interval = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.001"))
+        self._active = threading.Lock()
+
+    def _requested(self, scope) -> bool:
+        if self.token is None:
+            return False
+        token = self.token.encode()
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return value == token
+        query = scope.get("query_string", b"")
+        if PROFILE_QUERY_PARAM.encode() in query:
+            return parse_qs(query.decode("latin-1")).get(PROFILE_QUERY_PARAM, [None])[0] == self.token
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        requested = self._requested(scope)
+        if not (requested or (self.sample_rate and random.random() < self.sample_rate)):
+            await self.app(scope, receive, send)
+            return
+        if not self._active.acquire(blocking=False):
+            # Another request is being profiled; serve this one normally
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self._profile(scope, receive, send, "header" if requested else "sampled")
+        finally:
+            self._active.release()
+
+    async def _profile(self, scope, receive, send, trigger: str):
+        profile_id = self.store.new_id()
+        status = None
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile_id.encode())
+                ]
+            await send(message)
+
+        if self.mode == "cprofile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+        else:
+            profiler = StackSampler(threading.get_ident(), self.sample_interval)
+            profiler.start()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            if self.mode == "cprofile":
+                profiler.disable()
+            else:
+                profiler.stop()
+            metadata = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status,
+                "trigger": trigger,
+                "mode": self.mode,
+                "duration_ms": round(elapsed * 1000, 3),
+                "created_at": datetime.now().isoformat()
+            }
+            await asyncio.to_thread(self._save, profile_id, profiler, metadata)
+
+    def _save(self, profile_id: str, profiler, metadata: Dict[str, Any]):
+        if isinstance(profiler, cProfile.Profile):
+            profiler.create_stats()
+            self.store.save(profile_id, marshal.dumps(profiler.stats), ".prof", metadata)
+        else:
+            self.store.save(profile_id, profiler.folded(), ".folded", metadata)
@@ -0,0 +1,128 @@
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request
+from fastapi.responses import FileResponse, PlainTextResponse
+from ml.cache import prediction_cache
+from ml.executor import inference_executor
+from ml.registry import model_registry, MODEL_TYPES
+from monitoring.admission import admission_controller
+from monitoring.profiling import profile_store
+from typing import Optional
+import asyncio
+import hmac
+import os
+
+router = APIRouter()
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Guard management endpoints with ADMIN_TOKEN; without one they are closed"""
+    expected = os.getenv("ADMIN_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set ADMIN_TOKEN to enable them")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, expected):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@router.get("/models", dependencies=[Depends(require_admin)])
+async def list_models():
+    """List loaded and published model versions"""
+    return {"models": model_registry.status()}
+
+@router.get("/models/{model_type}/{version}", dependencies=[Depends(require_admin)])
+async def get_model_metadata(model_type: str, version: str):
+    """Get the metadata stored alongside a model artifact"""
+    if model_type not in MODEL_TYPES:
+        raise HTTPException(status_code=404, detail=f"Unknown model type: {model_type}")
+    if version not in model_registry.available_versions(model_type):
+        raise HTTPException(status_code=404, detail="Model version not found")
+    return model_registry.metadata(model_type, version)
+
+@router.post("/models/{model_type}/activate", dependencies=[Depends(require_admin)])
+async def activate_model(model_type: str, version: str):
+    """Hot-swap the serving version of a model type"""
+    if model_type not in MODEL_TYPES:
+        raise HTTPException(status_code=404, detail=f"Unknown model type: {model_type}")
+    try:
+        # Loading the artifact is blocking file I/O; the swap itself happens
+        # under the registry lock once the new model is in memory
+        return await asyncio.to_thread(model_registry.activate, model_type, version)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/cache", dependencies=[Depends(require_admin)])
+async def get_prediction_cache_stats():
+    """Hit/miss counters and size of the prediction cache"""
+    return prediction_cache.stats()
+
+@router.delete("/cache", dependencies=[Depends(require_admin)])
+async def clear_prediction_cache():
+    """Drop every cached prediction"""
+    prediction_cache.clear()
+    return {"message": "Prediction cache cleared"}
+
+@router.get("/ledger", dependencies=[Depends(require_admin)])
+async def get_ledger_cache_stats(request: Request):
+    """Finance ledger cache occupancy and hit rate"""
+    return request.app.state.finance.ledger.stats()
+
+@router.delete("/ledger", dependencies=[Depends(require_admin)])
+async def clear_ledger_cache(request: Request, user_id: Optional[str] = None):
+    """Drop cached ledgers, of one user or of everyone"""
+    request.app.state.finance.ledger.invalidate(user_id)
+    return {"message": "Ledger cache cleared", "user_id": user_id}
+
+@router.get("/inference", dependencies=[Depends(require_admin)])
+async def get_inference_stats():
+    """Inference executor mode, capacity and current queue depth"""
+    return inference_executor.stats()
+
+@router.get("/admission", dependencies=[Depends(require_admin)])
+async def get_admission_stats():
+    """Admission limits and the current load of every limited route"""
+    return admission_controller.stats()
+
+@router.put("/admission", dependencies=[Depends(require_admin)])
+async def configure_admission(
+    route: Optional[str] = Query(None, description="Route template, e.g. /api/predict/batch; default limits when omitted"),
+    max_concurrent: Optional[int] = Query(None, ge=1),
+    max_queue: Optional[int] = Query(None, ge=0),
+    queue_timeout: Optional[float] = Query(None, ge=0),
+    client_rate: Optional[float] = Query(None, ge=0, description="Requests per second per client, 0 for unlimited"),
+    client_burst: Optional[int] = Query(None, ge=1)
+):
+    """Change admission limits at runtime; applies to this worker process"""
+    if route is not None and not admission_controller.applies(route):
+        raise HTTPException(status_code=400, detail=f"Route is not under admission control: {route}")
+    if route is not None and (client_rate is not None or client_burst is not None):
+        raise HTTPException(status_code=400, detail="Client rate limits apply to every route")
+    admission_controller.configure(
+        route, max_concurrent=max_concurrent, max_queue=max_queue, queue_timeout=queue_timeout
+    )
+    if client_rate is not None or client_burst is not None:
+        admission_controller.configure_clients(client_rate, client_burst)
+    return admission_controller.stats()
+
+@router.get("/profiles", dependencies=[Depends(require_admin)])
+async def list_profiles():
+    """Stored request profiles, newest first"""
+    return {"profiles": profile_store.list()}
+
+@router.get("/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def get_profile_summary(
+    profile_id: str,
+    sort: str = Query("cumulative", pattern=r"^(cumulative|tottime|ncalls|calls|time)$"),
+    limit: int = Query(50, ge=1, le=1000)
+):
+    """Text report of a profile: top functions, or heaviest stacks for sampled profiles"""
+    try:
+        return PlainTextResponse(profile_store.summary(profile_id, sort=sort, limit=limit))
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+@router.get("/profiles/{profile_id}/download", dependencies=[Depends(require_admin)])
+async def download_profile(profile_id: str):
+    """Raw profile data: pstats (.prof) or collapsed stacks (.folded)"""
+    try:
+        path = profile_store.data_path(profile_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, filename=os.path.basename(path), media_type="application/octet-stream")
@@ -1,137 +1,371 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from analytics.cashflow import RECORD_FIELDS, TRANSACTION_TYPES, category_report, cash_flow_report, load_columns, month_index
+from models.encoding import dumps_json, encoded_response, project, project_many
 from models.schemas import FinanceRecord, FinanceRecordResponse
-from config.firebase_config import get_firestore_client
-from datetime import datetime
-from typing import List, Optional
+from storage.backends import DocumentNotFound, MAX_BATCH_SIZE
+from storage.bulk import BatchWriter, BulkParseError, get_parser
+from storage.cursors import decode_cursor
+from storage import export
+from storage.repositories import FinanceRepository
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Literal, Optional, Union
+import os
+import re
 import uuid
 
 router = APIRouter()
 
-def get_db():
-    return get_firestore_client()
+def get_db(request: Request) -> FinanceRepository:
+    return request.app.state.finance
 
 @router.post("/", response_model=dict)
-async def create_finance_record(record: FinanceRecord, db=Depends(get_db)):
+async def create_finance_record(record: FinanceRecord, db: FinanceRepository = Depends(get_db)):
     """Create a new finance record"""
     try:
-        if db is None:
-            # Mock response for demo
-            return {"message": "Finance record created successfully", "id": str(uuid.uuid4())}
-        
         record_data = record.dict()
         record_data.update({
             "id": str(uuid.uuid4()),
             "created_at": datetime.now()
         })
         
-        # Save to Firestore
-        doc_ref = db.collection('finance_records').document(record_data["id"])
-        doc_ref.set(record_data)
+        # Save to storage
+        await db.create(record_data)
         
         return {"message": "Finance record created successfully", "id": record_data["id"]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/user/{user_id}", response_model=List[dict])
+# Per-row errors beyond this are counted but not itemized in the response
+MAX_REPORTED_ERRORS = 1000
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in error.errors()
+    )
+
+@router.post("/bulk", response_model=dict)
+async def bulk_create_finance_records(
+    request: Request,
+    user_id: Optional[str] = Query(None, description="Applied to rows without a user_id"),
+    db: FinanceRepository = Depends(get_db)
+):
+    """Import many finance records from a JSON array, NDJSON or CSV body.
+
+    The body is parsed and validated as it streams in and written in batches
+    of up to 250, so the upload is never held in memory as a whole. Rows that
+    fail validation are skipped and reported with their 1-based row number.
+    """
+    try:
+        parser = get_parser(request.headers.get("content-type"))
+    except BulkParseError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+
+    # Half a batch of records leaves room for their summary increments, so
+    # each create_many() call commits atomically
+    writer = BatchWriter(db.create_many, batch_size=MAX_BATCH_SIZE // 2)
+    errors = []
+    failed = 0
+    row = 0
+
+    def report(row_numbers, message):
+        nonlocal failed
+        failed += len(row_numbers)
+        for number in row_numbers:
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"row": number, "error": message})
+
+    try:
+        async for item in parser(request.stream()):
+            row += 1
+            if isinstance(item, Exception):
+                report([row], str(item))
+                continue
+            if not isinstance(item, dict):
+                report([row], "Expected an object")
+                continue
+            if user_id and not item.get("user_id"):
+                item["user_id"] = user_id
+            try:
+                record_data = FinanceRecord(**item).dict()
+            except ValidationError as e:
+                report([row], _validation_message(e))
+                continue
+            record_data.update({
+                "id": str(uuid.uuid4()),
+                "created_at": datetime.now()
+            })
+            await writer.add(row, record_data)
+    except BulkParseError as e:
+        await writer.close()
+        raise HTTPException(status_code=400, detail={
+            "error": str(e),
+            "row": row,
+            "created": writer.written
+        })
+    await writer.close()
+
+    for row_numbers, message in writer.failures:
+        report(row_numbers, f"Write failed: {message}")
+
+    return {
+        "message": "Bulk import finished",
+        "created": writer.written,
+        "failed": failed,
+        "errors": sorted(errors, key=lambda error: error["row"]),
+        "errors_truncated": failed > len(errors)
+    }
+
+@router.get("/user/{user_id}", response_model=List[FinanceRecordResponse])
 async def get_user_finance_records(
-    user_id: str, 
+    user_id: str,
+    request: Request,
     transaction_type: Optional[str] = Query(None),
-    limit: int = Query(100, le=1000),
-    db=Depends(get_db)
+    date_from: Union[datetime, date, None] = Query(None, alias="from", description="Inclusive lower bound on date"),
+    date_to: Union[datetime, date, None] = Query(None, alias="to", description="Exclusive upper bound on date"),
+    limit: int = Query(100, ge=1, le=1000),
+    page_token: Optional[str] = Query(None, description="X-Next-Page-Token from the previous page"),
+    db: FinanceRepository = Depends(get_db)
 ):
-    """Get finance records for a user"""
+    """Get one page of finance records for a user, newest first.
+
+    When more records exist, the token for the next page is returned in the
+    X-Next-Page-Token header; pass the same filters along with it.
+    """
+    date_from, date_to = _date_bound(date_from), _date_bound(date_to)
+    if date_from and date_to and date_from >= date_to:
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
+    try:
+        start_after = decode_cursor(page_token) if page_token else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        records, next_token = await db.list_for_user(
+            user_id,
+            transaction_type=transaction_type,
+            limit=limit,
+            start_after=start_after,
+            date_from=date_from,
+            date_to=date_to
+        )
+        headers = {"X-Next-Page-Token": next_token} if next_token else None
+        return encoded_response(request, project_many(FinanceRecordResponse, records), headers=headers)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/user/{user_id}/summary", response_model=List[dict])
+async def get_user_finance_summary(
+    user_id: str,
+    request: Request,
+    from_month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="YYYY-MM, inclusive"),
+    to_month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="YYYY-MM, inclusive"),
+    db: FinanceRepository = Depends(get_db)
+):
+    """Get a user's monthly totals by transaction type and category"""
+    try:
+        summaries = await db.summaries_for_user(user_id, from_month=from_month, to_month=to_month)
+        return encoded_response(request, summaries)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Analytics read whole date ranges, so fetch them in larger pages
+ANALYTICS_PAGE_SIZE = int(os.getenv("ANALYTICS_PAGE_SIZE", "10000"))
+
+def _date_bound(value: Union[datetime, date, None]) -> Optional[datetime]:
+    """Query bound as a naive UTC datetime; plain dates mean midnight"""
+    if value is None:
+        return None
+    if not isinstance(value, datetime):
+        return datetime(value.year, value.month, value.day)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+async def _user_columns(db: FinanceRepository, user_id: str, transaction_type: Optional[str],
+                        date_from: Optional[datetime], date_to: Optional[datetime]):
+    if date_from and date_to and date_from >= date_to:
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
+    return await load_columns(db.iter_for_user(
+        user_id,
+        transaction_type=transaction_type,
+        page_size=ANALYTICS_PAGE_SIZE,
+        date_from=date_from,
+        date_to=date_to,
+        fields=RECORD_FIELDS
+    ))
+
+@router.get("/user/{user_id}/totals", response_model=dict)
+async def get_user_finance_totals(
+    user_id: str,
+    request: Request,
+    transaction_type: Optional[str] = Query(None, description="Only total this type"),
+    date_from: Union[datetime, date, None] = Query(None, alias="from", description="Inclusive lower bound on date"),
+    date_to: Union[datetime, date, None] = Query(None, alias="to", description="Exclusive upper bound on date"),
+    db: FinanceRepository = Depends(get_db)
+):
+    """Record count and amount total per transaction type, e.g. this month's expenses.
+
+    Totals are aggregated by Firestore, so no records are transferred.
+    ``count`` and ``total`` at the top level cover every type, including
+    any not listed in ``by_type``.
+    """
+    date_from, date_to = _date_bound(date_from), _date_bound(date_to)
+    if date_from and date_to and date_from >= date_to:
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
     try:
-        if db is None:
-            # Mock response for demo
-            return [
-                {
-                    "id": "1",
-                    "user_id": user_id,
-                    "transaction_type": "income",
-                    "amount": 100000,
-                    "category": "salary",
-                    "description": "Monthly salary",
-                    "date": datetime.now().isoformat(),
-                    "created_at": datetime.now().isoformat()
-                },
-                {
-                    "id": "2",
-                    "user_id": user_id,
-                    "transaction_type": "expense",
-                    "amount": 25000,
-                    "category": "rent",
-                    "description": "Monthly rent",
-                    "date": datetime.now().isoformat(),
-                    "created_at": datetime.now().isoformat()
-                }
-            ]
-        
-        query = db.collection('finance_records').where('user_id', '==', user_id)
-        
         if transaction_type:
-            query = query.where('transaction_type', '==', transaction_type)
-        
-        query = query.limit(limit)
-        docs = query.stream()
-        
-        records = []
-        for doc in docs:
-            record = doc.to_dict()
-            records.append(record)
-        
-        return records
+            totals = await db.totals_for_user(user_id, [transaction_type], date_from, date_to)
+            totals[None] = totals[transaction_type]
+        else:
+            totals = await db.totals_for_user(user_id, [*TRANSACTION_TYPES, None], date_from, date_to)
+        overall = totals.pop(None)
+        return encoded_response(request, {
+            "user_id": user_id,
+            "from": date_from,
+            "to": date_to,
+            "count": overall["count"],
+            "total": round(overall["sum"], 2),
+            "by_type": {
+                name: {"count": result["count"], "total": round(result["sum"], 2)}
+                for name, result in totals.items()
+            }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/{record_id}", response_model=dict)
-async def get_finance_record(record_id: str, db=Depends(get_db)):
+@router.get("/user/{user_id}/analytics/cashflow", response_model=dict)
+async def get_user_cash_flow(
+    user_id: str,
+    request: Request,
+    date_from: Union[datetime, date, None] = Query(None, alias="from", description="Inclusive lower bound on date"),
+    date_to: Union[datetime, date, None] = Query(None, alias="to", description="Exclusive upper bound on date"),
+    window: int = Query(3, ge=1, le=24, description="Months in the rolling net cash flow"),
+    db: FinanceRepository = Depends(get_db)
+):
+    """Monthly income, expense, net cash flow, savings rate and month-over-month deltas.
+
+    With from/to, every month of the range is listed even if it is empty.
+    """
+    date_from, date_to = _date_bound(date_from), _date_bound(date_to)
+    columns = await _user_columns(db, user_id, None, date_from, date_to)
+    try:
+        return encoded_response(request, cash_flow_report(
+            columns,
+            window=window,
+            first_month=month_index(date_from) if date_from else None,
+            # The upper bound is exclusive
+            last_month=month_index(date_to - timedelta(microseconds=1)) if date_to else None
+        ))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/user/{user_id}/analytics/categories", response_model=dict)
+async def get_user_category_breakdown(
+    user_id: str,
+    request: Request,
+    transaction_type: Optional[str] = Query(None),
+    date_from: Union[datetime, date, None] = Query(None, alias="from", description="Inclusive lower bound on date"),
+    date_to: Union[datetime, date, None] = Query(None, alias="to", description="Exclusive upper bound on date"),
+    by_month: bool = Query(False, description="Include per-month totals for every category"),
+    db: FinanceRepository = Depends(get_db)
+):
+    """Totals per category and transaction type, largest first"""
+    columns = await _user_columns(db, user_id, transaction_type, _date_bound(date_from), _date_bound(date_to))
+    try:
+        return encoded_response(request, category_report(columns, by_month=by_month))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/user/{user_id}/stream")
+async def stream_user_finance_records(
+    user_id: str,
+    transaction_type: Optional[str] = Query(None),
+    db: FinanceRepository = Depends(get_db)
+):
+    """Stream all finance records for a user as NDJSON, newest first"""
+    async def generate():
+        async for record in db.iter_for_user(user_id, transaction_type=transaction_type):
+            yield dumps_json(project(FinanceRecordResponse, record)) + b"\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+# Records fetched per storage query while exporting
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "1000"))
+
+@router.get("/user/{user_id}/export")
+async def export_user_finance_records(
+    user_id: str,
+    format: Literal["csv", "parquet"] = Query("csv"),
+    transaction_type: Optional[str] = Query(None),
+    date_from: Union[datetime, date, None] = Query(None, alias="from", description="Inclusive lower bound on date"),
+    date_to: Union[datetime, date, None] = Query(None, alias="to", description="Exclusive upper bound on date"),
+    db: FinanceRepository = Depends(get_db)
+):
+    """Download all of a user's records, newest first, as CSV or Parquet.
+
+    Records are read one page at a time and the file is streamed as it is
+    produced: CSV every few hundred rows, Parquet one row group at a time.
+    """
+    date_from, date_to = _date_bound(date_from), _date_bound(date_to)
+    if date_from and date_to and date_from >= date_to:
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
+    if format == "parquet" and export.pyarrow is None:
+        raise HTTPException(status_code=501, detail="Parquet export is not available on this server")
+
+    records = db.iter_for_user(
+        user_id,
+        transaction_type=transaction_type,
+        page_size=EXPORT_PAGE_SIZE,
+        date_from=date_from,
+        date_to=date_to,
+        fields=export.EXPORT_FIELDS
+    )
+    filename = f"{re.sub(r'[^A-Za-z0-9_.-]', '_', user_id)}-finance-records.{format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+    if format == "csv":
+        return StreamingResponse(export.iter_csv(records), media_type="text/csv", headers=headers)
+    return StreamingResponse(
+        export.iter_parquet(records), media_type="application/vnd.apache.parquet", headers=headers
+    )
+
+@router.get("/{record_id}", response_model=FinanceRecordResponse)
+async def get_finance_record(record_id: str, request: Request, db: FinanceRepository = Depends(get_db)):
     """Get a specific finance record"""
     try:
-        if db is None:
-            return {
-                "id": record_id,
-                "transaction_type": "income",
-                "amount": 50000,
-                "category": "investment",
-                "description": "Stock dividend"
-            }
-        
-        doc_ref = db.collection('finance_records').document(record_id)
-        doc = doc_ref.get()
+        record = await db.get(record_id)
         
-        if doc.exists:
-            return doc.to_dict()
+        if record is not None:
+            return encoded_response(request, project(FinanceRecordResponse, record))
         else:
             raise HTTPException(status_code=404, detail="Finance record not found")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.put("/{record_id}", response_model=dict)
-async def update_finance_record(record_id: str, record: FinanceRecord, db=Depends(get_db)):
+async def update_finance_record(record_id: str, record: FinanceRecord, db: FinanceRepository = Depends(get_db)):
     """Update a finance record"""
     try:
-        if db is None:
-            return {"message": "Finance record updated successfully", "id": record_id}
-        
         record_data = record.dict()
         record_data["updated_at"] = datetime.now()
         
-        doc_ref = db.collection('finance_records').document(record_id)
-        doc_ref.update(record_data)
+        await db.update(record_id, record_data)
         
         return {"message": "Finance record updated successfully", "id": record_id}
+    except DocumentNotFound:
+        raise HTTPException(status_code=404, detail="Finance record not found")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/{record_id}", response_model=dict)
-async def delete_finance_record(record_id: str, db=Depends(get_db)):
+async def delete_finance_record(record_id: str, db: FinanceRepository = Depends(get_db)):
     """Delete a finance record"""
     try:
-        if db is None:
-            return {"message": "Finance record deleted successfully", "id": record_id}
-        
-        doc_ref = db.collection('finance_records').document(record_id)
-        doc_ref.delete()
+        await db.delete(record_id)
         
         return {"message": "Finance record deleted successfully", "id": record_id}
     except Exception as e:
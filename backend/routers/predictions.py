@@ -1,79 +1,224 @@
-from fastapi import APIRouter, HTTPException
-from models.schemas import PredictionRequest, PredictionResponse, UserProfile
+from fastapi import APIRouter, HTTPException, Query, Request
+from models.schemas import (
+    PredictionRequest, PredictionResponse, UserProfile,
+    BatchPredictionRequest, BatchPredictionResponse, RetirementSweepRequest
+)
+from models.encoding import encoded_response
+from ml.cache import prediction_cache, PREDICTION_MODELS
+from ml.executor import inference_executor, InferenceBusy, InferenceTimeout
 from ml.predictor import FinancialPredictor
+from ml.sweep import SWEEP_AXES, sweep_values
 from datetime import datetime
+from typing import Literal, Optional
+import os
 
 router = APIRouter()
 
 # Initialize ML predictor
 predictor = FinancialPredictor()
 
+# Paths simulated per block in Monte Carlo mode; bounds peak memory per request
+MONTECARLO_CHUNK_PATHS = int(os.getenv("MONTECARLO_CHUNK_PATHS", "2000"))
+
+def prediction_error(e: Exception, detail: Optional[str] = None) -> HTTPException:
+    """Map an inference failure to the HTTP error returned to the client"""
+    if isinstance(e, InferenceBusy):
+        return HTTPException(
+            status_code=503,
+            detail="Prediction service is at capacity, please retry",
+            headers={"Retry-After": "1"}
+        )
+    if isinstance(e, InferenceTimeout):
+        return HTTPException(status_code=504, detail=str(e))
+    return HTTPException(status_code=500, detail=detail or str(e))
+
+async def cached_prediction(profile: dict, prediction_type: str):
+    """Serve a prediction from the cache, computing it on the inference executor on a miss.
+
+    "combined" yields the predict_all() details used to build a
+    PredictionResponse; other types yield their single-type result.
+    """
+    key = prediction_cache.key(
+        profile,
+        prediction_type,
+        "+".join(predictor.registry.active_version(model) for model in PREDICTION_MODELS[prediction_type])
+    )
+    result = prediction_cache.get(key)
+    if result is None:
+        if prediction_type == "combined":
+            result = await inference_executor.run("predict_all", profile)
+        else:
+            result = await inference_executor.run("predict_details", profile, prediction_type)
+        prediction_cache.put(key, result)
+    return result
+
+async def prediction_response(profile: dict, prediction_type: str) -> dict:
+    """PredictionResponse fields; build_response() already produces the schema's types"""
+    details = await cached_prediction(profile, "combined")
+    fields = predictor.build_response(prediction_type, details)
+    fields["generated_at"] = datetime.now()
+    return fields
+
 @router.post("/", response_model=PredictionResponse)
-async def get_financial_prediction(request: PredictionRequest):
+async def get_financial_prediction(request: PredictionRequest, http_request: Request):
     """Get ML-based financial predictions"""
     try:
-        # Get prediction from ML model
-        prediction_result = predictor.predict(
-            user_profile=request.user_profile.dict(),
-            prediction_type=request.prediction_type
+        return encoded_response(
+            http_request,
+            await prediction_response(request.user_profile.dict(), request.prediction_type)
         )
-        
-        return PredictionResponse(
-            prediction_type=request.prediction_type,
-            recommendations=prediction_result["recommendations"],
-            risk_score=prediction_result["risk_score"],
-            projected_returns=prediction_result["projected_returns"],
-            investment_allocation=prediction_result["investment_allocation"],
-            confidence_score=prediction_result["confidence_score"],
-            generated_at=datetime.now()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise prediction_error(e, f"Prediction error: {str(e)}")
+
+@router.post("/combined", response_model=PredictionResponse)
+async def get_combined_prediction(user_profile: UserProfile, request: Request):
+    """Retirement, investment and risk predictions in one response"""
+    try:
+        return encoded_response(request, await prediction_response(user_profile.dict(), "combined"))
+    except Exception as e:
+        raise prediction_error(e, f"Prediction error: {str(e)}")
+
+@router.post("/batch", response_model=BatchPredictionResponse)
+async def get_batch_predictions(request: BatchPredictionRequest, http_request: Request):
+    """Score many user profiles in one vectorized pass"""
+    try:
+        results = await inference_executor.run(
+            "predict_batch",
+            [profile.dict() for profile in request.user_profiles],
+            request.prediction_type
         )
+        return encoded_response(http_request, {
+            "prediction_type": request.prediction_type,
+            "count": len(results),
+            "results": results,
+            "generated_at": datetime.now()
+        })
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+        raise prediction_error(e, f"Prediction error: {str(e)}")
 
 @router.post("/retirement")
-async def get_retirement_prediction(user_profile: UserProfile):
+async def get_retirement_prediction(
+    user_profile: UserProfile,
+    request: Request,
+    mode: Literal["deterministic", "montecarlo"] = Query("deterministic"),
+    paths: int = Query(10000, ge=100, le=100000, description="Simulated paths in montecarlo mode"),
+    seed: Optional[int] = Query(None, description="Random seed for reproducible simulations")
+):
     """Get retirement planning predictions"""
     try:
-        prediction_result = predictor.predict_retirement(user_profile.dict())
-        return {
+        if mode == "montecarlo":
+            simulation = await inference_executor.run(
+                "simulate_retirement",
+                user_profile.dict(),
+                paths=paths,
+                seed=seed,
+                chunk_size=MONTECARLO_CHUNK_PATHS
+            )
+            return encoded_response(request, {
+                "prediction_type": "retirement",
+                "mode": "montecarlo",
+                "retirement_corpus_needed": simulation["corpus_needed"],
+                "years_to_retirement": simulation["years_to_retirement"],
+                "success_probability": simulation["success_probability"],
+                "corpus_percentiles": simulation["corpus_percentiles"],
+                "nominal_corpus_percentiles": simulation["nominal_corpus_percentiles"],
+                "paths": simulation["paths"],
+                "allocation": simulation["allocation"],
+                "assumptions": simulation["assumptions"],
+                "recommendations": simulation["recommendations"],
+                "generated_at": datetime.now()
+            })
+
+        prediction_result = await cached_prediction(user_profile.dict(), "retirement")
+        return encoded_response(request, {
             "prediction_type": "retirement",
             "retirement_corpus_needed": prediction_result["corpus_needed"],
             "monthly_sip_required": prediction_result["monthly_sip"],
             "years_to_retirement": prediction_result["years_to_retirement"],
             "recommendations": prediction_result["recommendations"],
             "generated_at": datetime.now()
-        }
+        })
+    except Exception as e:
+        raise prediction_error(e)
+
+@router.post("/retirement/sweep")
+async def get_retirement_sweep(request: RetirementSweepRequest, http_request: Request):
+    """Required monthly SIP over a grid of what-if parameters, in one request.
+
+    ``monthly_sip`` is nested in the order of ``axes``: retirement age,
+    yearly SIP step-up, annual return, inflation. Axes that are not given
+    hold the assumptions of /retirement, whose SIP is the grid's value at
+    those points.
+    """
+    profile = request.user_profile.dict()
+    try:
+        planned_age = min(profile["age"] + profile["goal_timeline_years"], 60)
+        axes = {}
+        for name, default in zip(SWEEP_AXES, (planned_age, 0.0, 0.12, 0.0)):
+            bounds = getattr(request, name)
+            axes[name] = (
+                sweep_values(bounds.start, bounds.stop, bounds.step, integer=name == "retirement_age")
+                if bounds is not None else [default]
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        sweep = await inference_executor.run("sweep_retirement", profile, *axes.values())
+        return encoded_response(http_request, {
+            "prediction_type": "retirement",
+            "mode": "sweep",
+            "axes": axes,
+            **sweep,
+            "generated_at": datetime.now()
+        })
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise prediction_error(e)
 
 @router.post("/investment")
-async def get_investment_recommendation(user_profile: UserProfile):
+async def get_investment_recommendation(
+    user_profile: UserProfile,
+    request: Request,
+    mode: Literal["rules", "optimizer"] = Query("rules")
+):
     """Get investment allocation recommendations"""
     try:
-        prediction_result = predictor.predict_investment_allocation(user_profile.dict())
-        return {
+        if mode == "optimizer":
+            # A cold frontier is a full solve, so like every prediction it runs
+            # on the inference executor rather than the event loop
+            prediction_result = await inference_executor.run("optimize_investment_allocation", user_profile.dict())
+        else:
+            prediction_result = await cached_prediction(user_profile.dict(), "investment")
+        return encoded_response(request, {
             "prediction_type": "investment",
+            "mode": mode,
             "allocation": prediction_result["allocation"],
             "expected_returns": prediction_result["expected_returns"],
             "risk_level": prediction_result["risk_level"],
             "recommendations": prediction_result["recommendations"],
             "generated_at": datetime.now()
-        }
+        })
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise prediction_error(e)
 
 @router.post("/risk-assessment")
-async def get_risk_assessment(user_profile: UserProfile):
+async def get_risk_assessment(user_profile: UserProfile, request: Request):
     """Get financial risk assessment"""
     try:
-        prediction_result = predictor.assess_financial_risk(user_profile.dict())
-        return {
+        prediction_result = await cached_prediction(user_profile.dict(), "risk_assessment")
+        return encoded_response(request, {
             "prediction_type": "risk_assessment",
             "risk_score": prediction_result["risk_score"],
             "risk_category": prediction_result["risk_category"],
             "risk_factors": prediction_result["risk_factors"],
             "mitigation_strategies": prediction_result["mitigation_strategies"],
             "generated_at": datetime.now()
-        }
+        })
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise prediction_error(e)
@@ -1,22 +1,21 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
+from models.encoding import encoded_response
 from models.schemas import UserProfile, UserProfileResponse
-from config.firebase_config import get_firestore_client
+from ml.cache import prediction_cache, changed_prediction_types
+from storage.backends import DocumentNotFound
+from storage.repositories import UserRepository
 from datetime import datetime
 from typing import List
 
 router = APIRouter()
 
-def get_db():
-    return get_firestore_client()
+def get_db(request: Request) -> UserRepository:
+    return request.app.state.users
 
 @router.post("/", response_model=dict)
-async def create_user_profile(profile: UserProfile, user_id: str, db=Depends(get_db)):
+async def create_user_profile(profile: UserProfile, user_id: str, db: UserRepository = Depends(get_db)):
     """Create or update user profile"""
     try:
-        if db is None:
-            # Mock response for demo
-            return {"message": "User profile created successfully", "user_id": user_id}
-        
         profile_data = profile.dict()
         profile_data.update({
             "user_id": user_id,
@@ -24,65 +23,57 @@ async def create_user_profile(profile: UserProfile, user_id: str, db=Depends(get
             "updated_at": datetime.now()
         })
         
-        # Save to Firestore
-        doc_ref = db.collection('users').document(user_id)
-        doc_ref.set(profile_data)
+        # Save to storage
+        await db.set(user_id, profile_data)
         
         return {"message": "User profile created successfully", "user_id": user_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/{user_id}", response_model=dict)
-async def get_user_profile(user_id: str, db=Depends(get_db)):
+async def get_user_profile(user_id: str, request: Request, db: UserRepository = Depends(get_db)):
     """Get user profile by ID"""
     try:
-        if db is None:
-            # Mock response for demo
-            return {
-                "user_id": user_id,
-                "name": "Demo User",
-                "age": 30,
-                "annual_income": 1200000,
-                "monthly_income": 100000,
-                "risk_taking_ability": "Moderate"
-            }
-        
-        doc_ref = db.collection('users').document(user_id)
-        doc = doc_ref.get()
+        profile = await db.get(user_id)
         
-        if doc.exists:
-            return doc.to_dict()
+        if profile is not None:
+            return encoded_response(request, profile)
         else:
             raise HTTPException(status_code=404, detail="User profile not found")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.put("/{user_id}", response_model=dict)
-async def update_user_profile(user_id: str, profile: UserProfile, db=Depends(get_db)):
+async def update_user_profile(user_id: str, profile: UserProfile, db: UserRepository = Depends(get_db)):
     """Update user profile"""
     try:
-        if db is None:
-            return {"message": "User profile updated successfully", "user_id": user_id}
-        
         profile_data = profile.dict()
         profile_data["updated_at"] = datetime.now()
         
-        doc_ref = db.collection('users').document(user_id)
-        doc_ref.update(profile_data)
+        previous = await db.get(user_id)
+        if previous is None:
+            raise DocumentNotFound(f"users/{user_id}")
+        await db.update(user_id, profile_data)
+        
+        # Cached predictions for the old values can no longer be requested
+        # on this user's behalf
+        changed = changed_prediction_types(previous, profile_data)
+        if changed:
+            prediction_cache.invalidate_profile(previous, changed)
         
         return {"message": "User profile updated successfully", "user_id": user_id}
+    except DocumentNotFound:
+        raise HTTPException(status_code=404, detail="User profile not found")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/{user_id}", response_model=dict)
-async def delete_user_profile(user_id: str, db=Depends(get_db)):
+async def delete_user_profile(user_id: str, db: UserRepository = Depends(get_db)):
     """Delete user profile"""
     try:
-        if db is None:
-            return {"message": "User profile deleted successfully", "user_id": user_id}
-        
-        doc_ref = db.collection('users').document(user_id)
-        doc_ref.delete()
+        await db.delete(user_id)
         
         return {"message": "User profile deleted successfully", "user_id": user_id}
     except Exception as e:
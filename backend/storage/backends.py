@@ -0,0 +1,417 @@
+import itertools
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# (field, operator, value), e.g. ("user_id", "==", "abc")
+Filter = Tuple[str, str, Any]
+# (field, "asc" | "desc")
+OrderBy = Tuple[str, str]
+
+# Firestore rejects batched writes with more operations than this
+MAX_BATCH_SIZE = 500
+
+Operation = Tuple[Any, ...]
+
+def utc_datetime(value: datetime) -> datetime:
+    """A datetime as Firestore stores it: time-zone aware UTC, naive taken as UTC"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+class DocumentNotFound(Exception):
+    """Raised when updating a document that does not exist"""
+
+class StorageBackend:
+    """Document storage used by the repositories.
+
+    Methods are synchronous. ``blocking`` tells the repositories whether a
+    call may wait on the network and must be pushed to the storage thread
+    pool, or can run directly on the event loop.
+    """
+
+    name = "base"
+    blocking = True
+
+    def get(self, collection: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def get_many(self, collection: str, doc_ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """Read several documents; ids that do not exist are left out"""
+        docs = {}
+        for doc_id in doc_ids:
+            data = self.get(collection, doc_id)
+            if data is not None:
+                docs[doc_id] = data
+        return docs
+
+    def set(self, collection: str, doc_id: str, data: Dict[str, Any]):
+        raise NotImplementedError
+
+    def update(self, collection: str, doc_id: str, data: Dict[str, Any]):
+        raise NotImplementedError
+
+    def delete(self, collection: str, doc_id: str):
+        raise NotImplementedError
+
+    def commit(self, operations: Sequence[Operation]):
+        """Apply up to MAX_BATCH_SIZE write operations atomically.
+
+        Operations are tuples:
+          ("set", collection, doc_id, data)
+          ("update", collection, doc_id, data)
+          ("delete", collection, doc_id)
+          ("increment", collection, doc_id, {group: {name: delta}}, fields)
+        An increment adds each delta to the nested numeric field
+        ``group.name``, creating the document with ``fields`` if needed.
+        """
+        raise NotImplementedError
+
+    def transact(self, collection: str, doc_id: str,
+                 plan: Callable[[Optional[Dict[str, Any]]], Sequence[Operation]]) -> Optional[Dict[str, Any]]:
+        """Read a document and commit the operations derived from it atomically.
+
+        ``plan`` gets the document as it is (None when it does not exist)
+        and returns at most MAX_BATCH_SIZE operations, which are committed
+        only if the document has not changed in between. It may be called
+        more than once, so it should have no side effects. Returns the
+        document ``plan`` was last given.
+        """
+        raise NotImplementedError
+
+    def write_batch(self, collection: str, docs: Sequence[Tuple[str, Dict[str, Any]]]):
+        """Set many documents, committing them in batches of MAX_BATCH_SIZE"""
+        for start in range(0, len(docs), MAX_BATCH_SIZE):
+            self.commit([("set", collection, doc_id, data) for doc_id, data in docs[start:start + MAX_BATCH_SIZE]])
+
+    def stream(self, collection: str, filters: Sequence[Filter] = (),
+               order_by: Sequence[OrderBy] = (), limit: Optional[int] = None,
+               start_after: Optional[Sequence[Any]] = None,
+               fields: Optional[Sequence[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Yield documents matching all filters.
+
+        ``start_after`` holds one value per ``order_by`` field and resumes the
+        ordering just past that position. ``fields`` limits the returned
+        documents to those fields (a server-side projection on Firestore).
+        """
+        raise NotImplementedError
+
+    def aggregate(self, collection: str, filters: Sequence[Filter], sum_field: str) -> Dict[str, Any]:
+        """Count of the matching documents and the sum of one numeric field.
+
+        This default reads every match; Firestore computes both server-side.
+        """
+        count = 0
+        total = 0
+        for doc in self.stream(collection, filters=filters, fields=[sum_field]):
+            count += 1
+            value = doc.get(sum_field)
+            if isinstance(value, (int, float)):
+                total += value
+        return {"count": count, "sum": total}
+
+    def close(self):
+        pass
+
+class FirestoreBackend(StorageBackend):
+    """Cloud Firestore, spread round-robin over a pool of clients"""
+
+    name = "firestore"
+    blocking = True
+
+    def __init__(self, clients: List[Any]):
+        if not clients:
+            raise ValueError("FirestoreBackend needs at least one client")
+        self.clients = clients
+        self._next_client = itertools.cycle(clients)
+        self._client_lock = threading.Lock()
+
+    def _client(self):
+        with self._client_lock:
+            return next(self._next_client)
+
+    def _doc(self, collection: str, doc_id: str):
+        return self._client().collection(collection).document(doc_id)
+
+    def get(self, collection, doc_id):
+        doc = self._doc(collection, doc_id).get()
+        return doc.to_dict() if doc.exists else None
+
+    def get_many(self, collection, doc_ids):
+        # One round trip for all of them instead of one per document
+        client = self._client()
+        refs = [client.collection(collection).document(doc_id) for doc_id in doc_ids]
+        return {doc.id: doc.to_dict() for doc in client.get_all(refs) if doc.exists}
+
+    def set(self, collection, doc_id, data):
+        self._doc(collection, doc_id).set(data)
+
+    def update(self, collection, doc_id, data):
+        from google.api_core.exceptions import NotFound
+        try:
+            self._doc(collection, doc_id).update(data)
+        except NotFound as e:
+            raise DocumentNotFound(f"{collection}/{doc_id}") from e
+
+    def delete(self, collection, doc_id):
+        self._doc(collection, doc_id).delete()
+
+    @staticmethod
+    def _write(writer, client, operations: Sequence[Operation]):
+        """Add operations to a write batch or transaction"""
+        from google.cloud.firestore import Increment
+
+        if len(operations) > MAX_BATCH_SIZE:
+            raise ValueError(f"A batch holds at most {MAX_BATCH_SIZE} operations")
+        for kind, collection, doc_id, *args in operations:
+            ref = client.collection(collection).document(doc_id)
+            if kind == "set":
+                writer.set(ref, args[0])
+            elif kind == "update":
+                writer.update(ref, args[0])
+            elif kind == "delete":
+                writer.delete(ref)
+            elif kind == "increment":
+                deltas, fields = args
+                data = dict(fields)
+                for group, values in deltas.items():
+                    data[group] = {name: Increment(value) for name, value in values.items()}
+                writer.set(ref, data, merge=True)
+            else:
+                raise ValueError(f"Unknown operation: {kind}")
+
+    def commit(self, operations):
+        from google.api_core.exceptions import NotFound
+
+        if not operations:
+            return
+        client = self._client()
+        batch = client.batch()
+        self._write(batch, client, operations)
+        try:
+            batch.commit()
+        except NotFound as e:
+            raise DocumentNotFound(str(e)) from e
+
+    def transact(self, collection, doc_id, plan):
+        from google.api_core.exceptions import NotFound
+        from google.cloud.firestore import transactional
+
+        client = self._client()
+        ref = client.collection(collection).document(doc_id)
+
+        # Firestore locks the document read and retries the function when a
+        # concurrent write conflicts
+        @transactional
+        def run(transaction):
+            snapshot = ref.get(transaction=transaction)
+            doc = snapshot.to_dict() if snapshot.exists else None
+            self._write(transaction, client, plan(doc))
+            return doc
+
+        try:
+            return run(client.transaction())
+        except NotFound as e:
+            raise DocumentNotFound(str(e)) from e
+
+    def stream(self, collection, filters=(), order_by=(), limit=None, start_after=None, fields=None):
+        from google.cloud.firestore import Query
+
+        query = self._client().collection(collection)
+        for field, op, value in filters:
+            query = query.where(field, op, value)
+        for field, direction in order_by:
+            query = query.order_by(
+                field,
+                direction=Query.DESCENDING if direction == "desc" else Query.ASCENDING
+            )
+        if start_after is not None:
+            query = query.start_after({field: value for (field, _), value in zip(order_by, start_after)})
+        if limit is not None:
+            query = query.limit(limit)
+        if fields is not None:
+            query = query.select(list(fields))
+        for doc in query.stream():
+            yield doc.to_dict()
+
+    def aggregate(self, collection, filters, sum_field):
+        # Aggregation queries are billed one read per 1000 index entries
+        # matched, and no documents are transferred
+        query = self._client().collection(collection)
+        for field, op, value in filters:
+            query = query.where(field, op, value)
+        aggregation = query.count(alias="count")
+        if not hasattr(aggregation, "sum"):
+            # google-cloud-firestore before 2.14 only counts
+            return super().aggregate(collection, filters, sum_field)
+        aggregation.sum(sum_field, alias="sum")
+        results = {result.alias: result.value for result in aggregation.get()[0]}
+        return {"count": int(results["count"]), "sum": results["sum"]}
+
+    def close(self):
+        for client in self.clients:
+            close = getattr(client, "close", None)
+            if close is not None:
+                close()
+
+def _copy(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy a document deep enough that callers cannot mutate stored state"""
+    return {
+        key: dict(value) if isinstance(value, dict) else list(value) if isinstance(value, list) else value
+        for key, value in data.items()
+    }
+
+def _stored(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a document as written, with datetimes normalized like Firestore's"""
+    return {
+        key: utc_datetime(value) if isinstance(value, datetime) else value
+        for key, value in _copy(data).items()
+    }
+
+def _query_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return utc_datetime(value)
+    if isinstance(value, (list, tuple)):
+        return [_query_value(item) for item in value]
+    return value
+
+_OPERATORS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "in": lambda a, b: a in b,
+}
+
+class MemoryBackend(StorageBackend):
+    """In-process storage with Firestore's query semantics.
+
+    Data lives only as long as the process. It is meant for local
+    development and for load-testing the API without network access.
+    Like Firestore, it returns datetimes as aware UTC whatever was written,
+    so documents with naive and aware dates still sort together.
+    """
+
+    name = "memory"
+    blocking = False
+
+    def __init__(self):
+        self._collections: Dict[str, Dict[str, Dict[str, Any]]] = defaultdict(dict)
+        self._lock = threading.RLock()
+
+    def get(self, collection, doc_id):
+        with self._lock:
+            data = self._collections[collection].get(doc_id)
+            return _copy(data) if data is not None else None
+
+    def get_many(self, collection, doc_ids):
+        with self._lock:
+            docs = self._collections[collection]
+            return {doc_id: _copy(docs[doc_id]) for doc_id in doc_ids if doc_id in docs}
+
+    def set(self, collection, doc_id, data):
+        with self._lock:
+            self._collections[collection][doc_id] = _stored(data)
+
+    def update(self, collection, doc_id, data):
+        with self._lock:
+            existing = self._collections[collection].get(doc_id)
+            if existing is None:
+                raise DocumentNotFound(f"{collection}/{doc_id}")
+            existing.update(_stored(data))
+
+    def delete(self, collection, doc_id):
+        with self._lock:
+            self._collections[collection].pop(doc_id, None)
+
+    def commit(self, operations):
+        if len(operations) > MAX_BATCH_SIZE:
+            raise ValueError(f"A batch holds at most {MAX_BATCH_SIZE} operations")
+        with self._lock:
+            # Validate first so a failing batch leaves nothing half-applied
+            for kind, collection, doc_id, *_ in operations:
+                if kind == "update" and doc_id not in self._collections[collection]:
+                    raise DocumentNotFound(f"{collection}/{doc_id}")
+            for kind, collection, doc_id, *args in operations:
+                docs = self._collections[collection]
+                if kind == "set":
+                    docs[doc_id] = _stored(args[0])
+                elif kind == "update":
+                    docs[doc_id].update(_stored(args[0]))
+                elif kind == "delete":
+                    docs.pop(doc_id, None)
+                elif kind == "increment":
+                    deltas, fields = args
+                    doc = docs.setdefault(doc_id, {})
+                    doc.update(_stored(fields))
+                    for group, values in deltas.items():
+                        target = doc.setdefault(group, {})
+                        for name, value in values.items():
+                            target[name] = target.get(name, 0) + value
+                else:
+                    raise ValueError(f"Unknown operation: {kind}")
+
+    def transact(self, collection, doc_id, plan):
+        # Holding the lock from the read through the commit keeps concurrent
+        # transactions on the document in sequence
+        with self._lock:
+            doc = self.get(collection, doc_id)
+            self.commit(plan(doc))
+            return doc
+
+    def stream(self, collection, filters=(), order_by=(), limit=None, start_after=None, fields=None):
+        predicates = [(field, _OPERATORS[op], _query_value(value)) for field, op, value in filters]
+        with self._lock:
+            docs = [
+                doc for doc in self._collections[collection].values()
+                if all(field in doc and test(doc[field], value) for field, test, value in predicates)
+                # Like Firestore, ordering on a field excludes documents without it
+                and all(field in doc for field, _ in order_by)
+            ]
+        if start_after is not None:
+            start_after = _query_value(start_after)
+            docs = [doc for doc in docs if _is_after(doc, order_by, start_after)]
+        for field, direction in reversed(order_by):
+            docs.sort(key=lambda doc: doc[field], reverse=direction == "desc")
+        if limit is not None:
+            docs = docs[:limit]
+        if fields is not None:
+            for doc in docs:
+                yield {field: doc[field] for field in fields if field in doc}
+            return
+        for doc in docs:
+            yield _copy(doc)
+
+def _is_after(doc: Dict[str, Any], order_by: Sequence[OrderBy], cursor: Sequence[Any]) -> bool:
+    for (field, direction), value in zip(order_by, cursor):
+        if doc[field] == value:
+            continue
+        return doc[field] > value if direction != "desc" else doc[field] < value
+    return False
+
+def create_backend(kind: Optional[str] = None) -> StorageBackend:
+    """Build the storage backend selected by STORAGE_BACKEND.
+
+    ``firestore`` (the default) fails at startup when Firestore cannot be
+    initialized rather than running on storage that is not persisted;
+    ``memory`` never touches the network and must be chosen explicitly.
+    """
+    kind = (kind or os.getenv("STORAGE_BACKEND", "firestore")).lower()
+    if kind == "memory":
+        return MemoryBackend()
+    if kind != "firestore":
+        raise ValueError(f"Unknown storage backend: {kind}")
+
+    from config.firebase_config import create_firestore_clients
+    try:
+        clients = create_firestore_clients(int(os.getenv("FIRESTORE_CHANNEL_POOL_SIZE", "4")))
+    except Exception as e:
+        raise RuntimeError(
+            f"Firestore is not available ({type(e).__name__}: {e}); "
+            "set STORAGE_BACKEND=memory to run without it"
+        ) from e
+    return FirestoreBackend(clients)
@@ -0,0 +1,165 @@
+import asyncio
+import codecs
+import csv
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from storage.backends import MAX_BATCH_SIZE
+
+# An element larger than this without a complete JSON value is treated as malformed
+MAX_PENDING_TEXT = 1024 * 1024
+
+class BulkParseError(ValueError):
+    """Raised when an upload cannot be parsed any further"""
+
+async def _iter_text(byte_chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    async for chunk in byte_chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+async def _iter_lines(byte_chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    pending = ""
+    async for text in _iter_text(byte_chunks):
+        pending += text
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    if pending:
+        yield pending.rstrip("\r")
+
+async def iter_json_array(byte_chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    """Yield the elements of a top-level JSON array as soon as each is complete"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    started = finished = False
+    async for text in _iter_text(byte_chunks):
+        buffer += text
+        pos = 0
+        while not finished:
+            while pos < len(buffer) and (buffer[pos].isspace() or (started and buffer[pos] == ",")):
+                pos += 1
+            if pos >= len(buffer):
+                break
+            if not started:
+                if buffer[pos] != "[":
+                    raise BulkParseError("Expected a JSON array")
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                finished = True
+                break
+            try:
+                element, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Most likely an element split across chunks; wait for more text
+                break
+            yield element
+        buffer = buffer[pos:]
+        if len(buffer) > MAX_PENDING_TEXT:
+            raise BulkParseError("Malformed JSON array element")
+    if not finished:
+        raise BulkParseError("Unexpected end of JSON array")
+
+async def iter_ndjson(byte_chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    """Yield one parsed value per non-empty line; unparsable lines yield the error"""
+    async for line in _iter_lines(byte_chunks):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            yield BulkParseError(f"Invalid JSON: {e.msg}")
+
+async def iter_csv(byte_chunks: AsyncIterator[bytes]) -> AsyncIterator[Dict[str, Any]]:
+    """Yield one dict per CSV row, keyed by the header row.
+
+    Rows are released only once their quotes are balanced, so quoted fields
+    may span lines. Empty cells are dropped so optional fields keep their
+    defaults.
+    """
+    header = None
+    record_lines: List[str] = []
+    async for line in _iter_lines(byte_chunks):
+        record_lines.append(line)
+        text = "\n".join(record_lines)
+        if text.count('"') % 2:
+            continue
+        record_lines = []
+        if not text.strip():
+            continue
+        row = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in row]
+            continue
+        yield {name: value for name, value in zip(header, row) if value != ""}
+    if record_lines:
+        raise BulkParseError("Unterminated quoted field in CSV")
+
+PARSERS = {
+    "application/json": iter_json_array,
+    "application/x-ndjson": iter_ndjson,
+    "application/jsonl": iter_ndjson,
+    "text/csv": iter_csv,
+}
+
+def get_parser(content_type: Optional[str]):
+    media_type = (content_type or "application/json").split(";")[0].strip().lower()
+    parser = PARSERS.get(media_type)
+    if parser is None:
+        raise BulkParseError(
+            f"Unsupported content type '{media_type}'; use one of {', '.join(PARSERS)}"
+        )
+    return parser
+
+class BatchWriter:
+    """Collect documents into batches of up to MAX_BATCH_SIZE and commit them.
+
+    Up to ``max_inflight`` batches are committed concurrently while parsing
+    continues, which bounds memory to roughly that many batches. A failed
+    commit reports every row of its batch as failed.
+    """
+
+    def __init__(self, commit: Callable[[List[Dict[str, Any]]], Awaitable[None]],
+                 batch_size: int = MAX_BATCH_SIZE, max_inflight: int = 4):
+        self.commit = commit
+        self.batch_size = min(batch_size, MAX_BATCH_SIZE)
+        self.max_inflight = max_inflight
+        self.written = 0
+        self.failures: List[Tuple[List[int], str]] = []
+        self._rows: List[int] = []
+        self._docs: List[Dict[str, Any]] = []
+        self._inflight = set()
+
+    async def add(self, row: int, doc: Dict[str, Any]):
+        self._rows.append(row)
+        self._docs.append(doc)
+        if len(self._docs) >= self.batch_size:
+            await self._flush()
+
+    async def _flush(self):
+        if not self._docs:
+            return
+        rows, docs = self._rows, self._docs
+        self._rows, self._docs = [], []
+        while len(self._inflight) >= self.max_inflight:
+            _, self._inflight = await asyncio.wait(self._inflight, return_when=asyncio.FIRST_COMPLETED)
+        self._inflight.add(asyncio.ensure_future(self._commit(rows, docs)))
+
+    async def _commit(self, rows: List[int], docs: List[Dict[str, Any]]):
+        try:
+            await self.commit(docs)
+            self.written += len(docs)
+        except Exception as e:
+            self.failures.append((rows, str(e)))
+
+    async def close(self):
+        await self._flush()
+        if self._inflight:
+            await asyncio.wait(self._inflight)
+            self._inflight = set()
@@ -0,0 +1,110 @@
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from monitoring.metrics import storage_coalesced_reads
+from storage.backends import _copy
+
+Document = Optional[Dict[str, Any]]
+
+class ReadCoalescer:
+    """Single-flight document reads for one collection.
+
+    Concurrent reads of the same document id share one in-flight fetch;
+    every caller but the first gets its own copy of the result. When
+    ``batch_window`` is set, reads of distinct ids that arrive within that
+    many seconds are fetched together with ``fetch_many`` (Firestore
+    ``get_all``), at most ``max_batch`` ids per call.
+
+    A fetch is shared only while it is in flight, so this never serves a
+    result older than a read issued at the same moment would. Writes call
+    forget() so that readers arriving after the write completes start a
+    fresh fetch instead of joining one that may predate it.
+    """
+
+    def __init__(self, collection: str,
+                 fetch_one: Callable[[str], Awaitable[Document]],
+                 fetch_many: Callable[[List[str]], Awaitable[Dict[str, Dict[str, Any]]]],
+                 batch_window: Optional[float] = None, max_batch: Optional[int] = None):
+        self.collection = collection
+        self.fetch_one = fetch_one
+        self.fetch_many = fetch_many
+        self.batch_window = float(
+            batch_window if batch_window is not None
+            else os.getenv("STORAGE_READ_BATCH_WINDOW", "0")
+        )
+        self.max_batch = int(
+            max_batch if max_batch is not None
+            else os.getenv("STORAGE_READ_BATCH_SIZE", "100")
+        )
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Reads waiting for the current batch window to close
+        self._queued: Dict[str, asyncio.Future] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._batches: Set[asyncio.Task] = set()
+
+    async def get(self, doc_id: str) -> Document:
+        future = self._inflight.get(doc_id)
+        if future is None:
+            # A queued read has not started yet, so it is fresh even after forget()
+            future = self._queued.get(doc_id)
+        if future is not None:
+            storage_coalesced_reads.inc(collection=self.collection)
+            # Shielded so that a cancelled caller does not cancel the fetch for the others
+            result = await asyncio.shield(future)
+            return _copy(result) if result is not None else None
+
+        if self.batch_window > 0:
+            future = self._enqueue(doc_id)
+        else:
+            future = asyncio.ensure_future(self.fetch_one(doc_id))
+        self._inflight[doc_id] = future
+        future.add_done_callback(lambda done: self._finished(doc_id, done))
+        return await asyncio.shield(future)
+
+    def forget(self, *doc_ids: str):
+        """Stop sharing in-flight reads of these documents with later callers"""
+        for doc_id in doc_ids:
+            self._inflight.pop(doc_id, None)
+
+    def _finished(self, doc_id: str, future: asyncio.Future):
+        if self._inflight.get(doc_id) is future:
+            del self._inflight[doc_id]
+        if not future.cancelled():
+            # Marks the error as retrieved when every waiter was cancelled
+            future.exception()
+
+    def _enqueue(self, doc_id: str) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queued[doc_id] = future
+        if len(self._queued) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_window, self._flush)
+        return future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._queued = self._queued, {}
+        task = asyncio.ensure_future(self._fetch_batch(batch))
+        self._batches.add(task)
+        task.add_done_callback(self._batches.discard)
+
+    async def _fetch_batch(self, batch: Dict[str, asyncio.Future]):
+        try:
+            if len(batch) == 1:
+                doc_id = next(iter(batch))
+                docs = {doc_id: await self.fetch_one(doc_id)}
+            else:
+                docs = await self.fetch_many(list(batch))
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for doc_id, future in batch.items():
+            if not future.done():
+                future.set_result(docs.get(doc_id))
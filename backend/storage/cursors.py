@@ -0,0 +1,32 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Sequence
+
+# Page tokens are opaque to clients: base64url-encoded JSON holding the sort
+# key values of the last document on the previous page
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    return value
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "$dt" in value:
+        return datetime.fromisoformat(value["$dt"])
+    return value
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    payload = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(token: str) -> List[Any]:
+    """Decode a page token, raising ValueError when it is malformed"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception as e:
+        raise ValueError("Invalid page token") from e
+    if not isinstance(values, list):
+        raise ValueError("Invalid page token")
+    return [_decode_value(v) for v in values]
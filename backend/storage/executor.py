@@ -0,0 +1,47 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Iterable, List, Optional
+
+# The Firestore client is synchronous; every call it makes runs on this pool
+# so that a slow round trip only occupies a worker thread, never the event loop
+_executor: Optional[ThreadPoolExecutor] = None
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("STORAGE_MAX_WORKERS", "32")),
+            thread_name_prefix="storage"
+        )
+    return _executor
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+async def run_blocking(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking storage call on the storage thread pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), partial(func, *args, **kwargs))
+
+def _next_chunk(iterator, chunk_size: int) -> List[Any]:
+    chunk = []
+    for item in iterator:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            break
+    return chunk
+
+async def iterate_blocking(iterable: Iterable[Any], chunk_size: int = 100) -> AsyncIterator[Any]:
+    """Consume a blocking iterator on the pool, yielding items as each chunk arrives"""
+    iterator = iter(iterable)
+    while True:
+        chunk = await run_blocking(_next_chunk, iterator, chunk_size)
+        if not chunk:
+            return
+        for item in chunk:
+            yield item
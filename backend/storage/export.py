@@ -0,0 +1,125 @@
+import asyncio
+import csv
+import io
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List
+
+# pyarrow is optional (it is in requirements.txt): without it only CSV
+# exports are offered and format=parquet answers 501
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover - depends on the environment
+    pyarrow = None
+
+EXPORT_FIELDS = ("id", "user_id", "date", "transaction_type", "category", "amount", "description", "created_at")
+
+# Spreadsheet apps run cells starting with these as formulas
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+async def iter_csv(records: AsyncIterator[Dict[str, Any]], chunk_rows: int = 500) -> AsyncIterator[bytes]:
+    """Encode records as CSV, yielding the header and then every ``chunk_rows`` rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    rows = 0
+    async for record in records:
+        writer.writerow([_csv_value(record.get(field)) for field in EXPORT_FIELDS])
+        rows += 1
+        if rows % chunk_rows == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+def _naive_utc(value: Any) -> Any:
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def parquet_schema():
+    return pyarrow.schema([
+        ("id", pyarrow.string()),
+        ("user_id", pyarrow.string()),
+        ("date", pyarrow.timestamp("us")),
+        ("transaction_type", pyarrow.string()),
+        ("category", pyarrow.string()),
+        ("amount", pyarrow.float64()),
+        ("description", pyarrow.string()),
+        ("created_at", pyarrow.timestamp("us")),
+    ])
+
+class _ChunkSink:
+    """Write-only file that hands out what was written since the last drain.
+
+    ParquetWriter writes each finished row group (and the footer on close)
+    through it, so the bytes can be sent while the next group is built.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+async def iter_parquet(records: AsyncIterator[Dict[str, Any]], row_group_rows: int = 10000) -> AsyncIterator[bytes]:
+    """Encode records as Parquet, yielding each row group as soon as it is written.
+
+    Only one row group is held in memory at a time. Timestamps are stored
+    as UTC without a time zone.
+    """
+    if pyarrow is None:
+        raise RuntimeError("Parquet export needs pyarrow installed")
+    schema = parquet_schema()
+    loop = asyncio.get_running_loop()
+    columns: Dict[str, List[Any]] = {field: [] for field in EXPORT_FIELDS}
+    sink = _ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema, compression="zstd")
+
+    def write():
+        writer.write_table(pyarrow.Table.from_pydict(columns, schema=schema))
+        for values in columns.values():
+            values.clear()
+
+    try:
+        async for record in records:
+            for field in EXPORT_FIELDS:
+                columns[field].append(_naive_utc(record.get(field)))
+            if len(columns["id"]) >= row_group_rows:
+                # Encoding and compression are CPU work; keep them off the event loop
+                await loop.run_in_executor(None, write)
+                yield sink.drain()
+        if columns["id"]:
+            await loop.run_in_executor(None, write)
+    finally:
+        writer.close()
+    # The footer, written on close
+    yield sink.drain()
@@ -0,0 +1,110 @@
+import time
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+from monitoring.metrics import storage_documents, storage_operation_duration
+from storage.backends import StorageBackend, Filter, OrderBy, Operation
+
+class InstrumentedBackend(StorageBackend):
+    """Wraps a backend and records the latency and volume of every call.
+
+    Stream timings only cover the time spent inside the backend producing
+    documents, not the time the caller spends consuming them.
+    """
+
+    def __init__(self, backend: StorageBackend):
+        self.backend = backend
+        self.name = backend.name
+        self.blocking = backend.blocking
+
+    def _observe(self, operation: str, collection: str, started: float, outcome: str, documents: int = 0):
+        storage_operation_duration.observe(
+            time.perf_counter() - started,
+            backend=self.name, operation=operation, collection=collection, outcome=outcome
+        )
+        if documents:
+            storage_documents.inc(documents, backend=self.name, operation=operation, collection=collection)
+
+    def _timed(self, operation: str, collection: str, func, *args, documents: int = 1) -> Any:
+        started = time.perf_counter()
+        try:
+            result = func(*args)
+        except Exception:
+            self._observe(operation, collection, started, "error")
+            raise
+        if operation == "get" and result is None:
+            documents = 0
+        self._observe(operation, collection, started, "ok", documents)
+        return result
+
+    def get(self, collection: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        return self._timed("get", collection, self.backend.get, collection, doc_id)
+
+    def get_many(self, collection: str, doc_ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        started = time.perf_counter()
+        try:
+            docs = self.backend.get_many(collection, doc_ids)
+        except Exception:
+            self._observe("get_many", collection, started, "error")
+            raise
+        self._observe("get_many", collection, started, "ok", len(docs))
+        return docs
+
+    def set(self, collection: str, doc_id: str, data: Dict[str, Any]):
+        self._timed("set", collection, self.backend.set, collection, doc_id, data)
+
+    def update(self, collection: str, doc_id: str, data: Dict[str, Any]):
+        self._timed("update", collection, self.backend.update, collection, doc_id, data)
+
+    def delete(self, collection: str, doc_id: str):
+        self._timed("delete", collection, self.backend.delete, collection, doc_id)
+
+    def commit(self, operations: Sequence[Operation]):
+        # A batch may touch several collections (records plus their summaries)
+        collection = "+".join(sorted({operation[1] for operation in operations}))
+        self._timed("commit", collection, self.backend.commit, operations, documents=len(operations))
+
+    def transact(self, collection: str, doc_id: str, plan) -> Optional[Dict[str, Any]]:
+        return self._timed("transact", collection, self.backend.transact, collection, doc_id, plan)
+
+    def write_batch(self, collection: str, docs):
+        self._timed("write_batch", collection, self.backend.write_batch, collection, docs, documents=len(docs))
+
+    def aggregate(self, collection: str, filters: Sequence[Filter], sum_field: str) -> Dict[str, Any]:
+        return self._timed("aggregate", collection, self.backend.aggregate, collection, filters, sum_field,
+                           documents=0)
+
+    def stream(self, collection: str, filters: Sequence[Filter] = (),
+               order_by: Sequence[OrderBy] = (), limit: Optional[int] = None,
+               start_after: Optional[Sequence[Any]] = None,
+               fields: Optional[Sequence[str]] = None) -> Iterator[Dict[str, Any]]:
+        documents = 0
+        elapsed = 0.0
+        outcome = "ok"
+        iterator = self.backend.stream(
+            collection, filters=filters, order_by=order_by, limit=limit, start_after=start_after,
+            fields=fields
+        )
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    doc = next(iterator)
+                except StopIteration:
+                    elapsed += time.perf_counter() - started
+                    break
+                except Exception:
+                    elapsed += time.perf_counter() - started
+                    outcome = "error"
+                    raise
+                elapsed += time.perf_counter() - started
+                documents += 1
+                yield doc
+        finally:
+            storage_operation_duration.observe(
+                elapsed, backend=self.name, operation="stream", collection=collection, outcome=outcome
+            )
+            if documents:
+                storage_documents.inc(documents, backend=self.name, operation="stream", collection=collection)
+
+    def close(self):
+        self.backend.close()
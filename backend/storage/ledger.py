@@ -0,0 +1,337 @@
+import bisect
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from storage.backends import utc_datetime
+
+# Fields of a finance record held in slots; anything else goes to ``extra``
+RECORD_FIELDS = (
+    "id", "user_id", "transaction_type", "amount", "category",
+    "description", "date", "created_at", "updated_at"
+)
+
+def _utc(value: Any) -> Any:
+    return utc_datetime(value) if isinstance(value, datetime) else value
+
+class LedgerEntry:
+    """One finance record in a fixed-slot object.
+
+    About a third of the size of the equivalent dict; user ids, types and
+    categories are interned so repeated values share one string. Datetimes
+    are held as aware UTC, the form storage returns them in, whether the
+    record came from storage or from a write the API just made.
+    """
+
+    __slots__ = RECORD_FIELDS + ("extra",)
+
+    def __init__(self, record: Dict[str, Any]):
+        self.id = record["id"]
+        self.user_id = sys.intern(record["user_id"])
+        self.transaction_type = sys.intern(record["transaction_type"])
+        self.amount = record["amount"]
+        self.category = sys.intern(record["category"])
+        self.description = record.get("description")
+        self.date = _utc(record["date"])
+        self.created_at = _utc(record.get("created_at"))
+        self.updated_at = _utc(record.get("updated_at"))
+        extra = {key: value for key, value in record.items() if key not in RECORD_FIELDS}
+        self.extra = extra or None
+
+    @property
+    def order_key(self) -> Tuple[Any, str]:
+        return (self.date, self.id)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The record as the storage backend returns it"""
+        record = {
+            "user_id": self.user_id,
+            "transaction_type": self.transaction_type,
+            "amount": self.amount,
+            "category": self.category,
+            "description": self.description,
+            "date": self.date,
+            "id": self.id,
+            "created_at": self.created_at
+        }
+        if self.updated_at is not None:
+            record["updated_at"] = self.updated_at
+        if self.extra:
+            record.update(self.extra)
+        return record
+
+class UserLedger:
+    """Every record of one user, kept sorted by (date, id) ascending"""
+
+    __slots__ = ("keys", "entries", "by_id", "loaded_at")
+
+    def __init__(self, entries: List[LedgerEntry]):
+        entries.sort(key=lambda entry: entry.order_key)
+        self.entries = entries
+        self.keys = [entry.order_key for entry in entries]
+        self.by_id = {entry.id: entry for entry in entries}
+        self.loaded_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def put(self, entry: LedgerEntry):
+        self.remove(entry.id)
+        index = bisect.bisect_left(self.keys, entry.order_key)
+        self.keys.insert(index, entry.order_key)
+        self.entries.insert(index, entry)
+        self.by_id[entry.id] = entry
+
+    def remove(self, record_id: str) -> bool:
+        entry = self.by_id.pop(record_id, None)
+        if entry is None:
+            return False
+        index = bisect.bisect_left(self.keys, entry.order_key)
+        del self.keys[index]
+        del self.entries[index]
+        return True
+
+    def newest_first(self, start_after: Optional[Sequence[Any]] = None,
+                     transaction_type: Optional[str] = None, date_from: Optional[datetime] = None,
+                     date_to: Optional[datetime] = None) -> Iterator[LedgerEntry]:
+        """Entries in (date desc, id desc) order, filtered like the storage query.
+
+        ``start_after`` resumes past a keyset cursor; ``date_from`` is
+        inclusive and ``date_to`` exclusive.
+        """
+        date_from, date_to = _utc(date_from), _utc(date_to)
+        end = len(self.entries)
+        if start_after is not None:
+            end = bisect.bisect_left(self.keys, tuple(_utc(value) for value in start_after))
+        if date_to is not None:
+            end = min(end, bisect.bisect_left(self.keys, (date_to,)))
+        for index in range(end - 1, -1, -1):
+            entry = self.entries[index]
+            if date_from is not None and entry.date < date_from:
+                return
+            if transaction_type is None or entry.transaction_type == transaction_type:
+                yield entry
+
+class LedgerCache:
+    """Write-through cache of whole per-user ledgers, LRU-evicted by user.
+
+    A user is loaded once they have been read ``warm_after`` times within
+    the cache's lifetime; from then on their record reads are served from
+    memory and FinanceRepository applies every write it makes to the cache
+    after it commits. ``max_records`` caps the total number of cached
+    records; users above ``max_user_records`` are never cached.
+
+    The cache only sees writes made through this process. With several
+    server workers, ``ttl_seconds`` bounds how long another worker's writes
+    can go unseen.
+
+    A user whose load turned out too large (or whose records could not be
+    cached) is remembered for ``skip_seconds`` and read straight from
+    storage meanwhile, so heavy users do not pay for a full read that is
+    thrown away every ``warm_after`` requests.
+    """
+
+    def __init__(self, max_records: int = 200000, max_user_records: int = 50000,
+                 warm_after: int = 3, ttl_seconds: float = 60, skip_seconds: float = 600):
+        self.max_records = max_records
+        self.max_user_records = min(max_user_records, max_records)
+        self.warm_after = warm_after
+        self.ttl_seconds = ttl_seconds
+        self.skip_seconds = skip_seconds
+        self._users: "OrderedDict[str, UserLedger]" = OrderedDict()
+        self._record_users: Dict[str, str] = {}
+        self._reads: "OrderedDict[str, int]" = OrderedDict()
+        # Users not to load again until the given monotonic time
+        self._skipped: "OrderedDict[str, float]" = OrderedDict()
+        # Users being loaded -> whether a write touched them meanwhile
+        self._loading: Dict[str, bool] = {}
+        self._lock = threading.RLock()
+        self.records = 0
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.evictions = 0
+        self.skips = 0
+
+    @classmethod
+    def from_env(cls) -> "LedgerCache":
+        return cls(
+            max_records=int(os.getenv("LEDGER_CACHE_MAX_RECORDS", "200000")),
+            max_user_records=int(os.getenv("LEDGER_CACHE_MAX_USER_RECORDS", "50000")),
+            warm_after=int(os.getenv("LEDGER_CACHE_WARM_AFTER", "3")),
+            ttl_seconds=float(os.getenv("LEDGER_CACHE_TTL", "60")),
+            skip_seconds=float(os.getenv("LEDGER_CACHE_SKIP_TTL", "600"))
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_records > 0
+
+    def ledger(self, user_id: str) -> Optional[UserLedger]:
+        """The user's cached ledger, or None (and a counted read) when cold"""
+        with self._lock:
+            ledger = self._users.get(user_id)
+            if ledger is not None and time.monotonic() >= ledger.loaded_at + self.ttl_seconds:
+                self._drop(user_id)
+                ledger = None
+            if ledger is None:
+                self.misses += 1
+                return None
+            self._users.move_to_end(user_id)
+            self.hits += 1
+            return ledger
+
+    def should_load(self, user_id: str) -> bool:
+        """Count a cold read of a user; True once they are hot enough to load"""
+        if not self.enabled:
+            return False
+        with self._lock:
+            if user_id in self._loading:
+                return False
+            skipped_until = self._skipped.get(user_id)
+            if skipped_until is not None:
+                if time.monotonic() < skipped_until:
+                    return False
+                del self._skipped[user_id]
+            reads = self._reads.pop(user_id, 0) + 1
+            if reads >= self.warm_after:
+                self._loading[user_id] = False
+                return True
+            self._reads[user_id] = reads
+            # Read counts of users that never got hot are forgotten first
+            while len(self._reads) > 10000:
+                self._reads.popitem(last=False)
+            return False
+
+    def install(self, user_id: str, records: Optional[List[Dict[str, Any]]]):
+        """Finish a load started after should_load(); None abandons it"""
+        with self._lock:
+            written = self._loading.pop(user_id, True)
+            # A write raced the load, so the snapshot may be stale
+            if records is None or written:
+                return
+            if len(records) > self.max_user_records:
+                self._skip(user_id)
+                return
+            try:
+                ledger = UserLedger([LedgerEntry(record) for record in records])
+            except Exception:
+                # A record the ledger cannot hold; keep serving this user from storage
+                self._skip(user_id)
+                return
+            self._drop(user_id)
+            self._users[user_id] = ledger
+            for entry in ledger.entries:
+                self._record_users[entry.id] = user_id
+            self.records += len(ledger)
+            self.loads += 1
+            self._evict()
+
+    def skip(self, user_id: str):
+        """Finish a load that found the user too large to cache"""
+        with self._lock:
+            self._loading.pop(user_id, None)
+            self._skip(user_id)
+
+    def _skip(self, user_id: str):
+        self._skipped[user_id] = time.monotonic() + self.skip_seconds
+        self._skipped.move_to_end(user_id)
+        self.skips += 1
+        while len(self._skipped) > 10000:
+            self._skipped.popitem(last=False)
+
+    def _drop(self, user_id: str):
+        ledger = self._users.pop(user_id, None)
+        if ledger is not None:
+            for record_id in ledger.by_id:
+                self._record_users.pop(record_id, None)
+            self.records -= len(ledger)
+
+    def _evict(self):
+        while self.records > self.max_records and self._users:
+            user_id = next(iter(self._users))
+            self._drop(user_id)
+            self.evictions += 1
+
+    def get_record(self, record_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            user_id = self._record_users.get(record_id)
+            if user_id is None:
+                return None
+            ledger = self.ledger(user_id)
+            entry = ledger.by_id.get(record_id) if ledger is not None else None
+            return entry.to_dict() if entry is not None else None
+
+    def _touch(self, user_id: str) -> Optional[UserLedger]:
+        if user_id in self._loading:
+            self._loading[user_id] = True
+        return self._users.get(user_id)
+
+    def put(self, record: Dict[str, Any]):
+        """Apply a committed create or update"""
+        with self._lock:
+            previous_user = self._record_users.get(record["id"])
+            if previous_user is not None and previous_user != record["user_id"]:
+                # Record moved to another user
+                self.remove(record["id"], previous_user)
+            ledger = self._touch(record["user_id"])
+            if ledger is None:
+                return
+            before = len(ledger)
+            try:
+                ledger.put(LedgerEntry(record))
+            except Exception:
+                # The write has committed; reload this user rather than fail it
+                self.records += len(ledger) - before
+                self._drop(record["user_id"])
+                self._record_users.pop(record["id"], None)
+                return
+            self._record_users[record["id"]] = record["user_id"]
+            self.records += len(ledger) - before
+            if len(ledger) > self.max_user_records:
+                self._drop(record["user_id"])
+            self._evict()
+
+    def remove(self, record_id: str, user_id: str):
+        """Apply a committed delete"""
+        with self._lock:
+            ledger = self._touch(user_id)
+            self._record_users.pop(record_id, None)
+            if ledger is not None and ledger.remove(record_id):
+                self.records -= 1
+
+    def invalidate(self, user_id: Optional[str] = None):
+        with self._lock:
+            if user_id is None:
+                self._users.clear()
+                self._record_users.clear()
+                self.records = 0
+                for loading in self._loading:
+                    self._loading[loading] = True
+            else:
+                self._drop(user_id)
+                self._touch(user_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "users": len(self._users),
+                "records": self.records,
+                "max_records": self.max_records,
+                "max_user_records": self.max_user_records,
+                "warm_after": self.warm_after,
+                "ttl_seconds": self.ttl_seconds,
+                "skip_seconds": self.skip_seconds,
+                "skipped_users": len(self._skipped),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "skips": self.skips
+            }
@@ -0,0 +1,375 @@
+import asyncio
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+from storage.backends import StorageBackend, Filter, OrderBy
+from storage.backends import DocumentNotFound, MAX_BATCH_SIZE, Operation
+from storage.coalescing import ReadCoalescer
+from storage.cursors import encode_cursor
+from storage.executor import run_blocking, iterate_blocking
+from storage.ledger import LedgerCache, UserLedger
+from storage import summaries
+
+class Repository:
+    """Async access to one collection of a storage backend"""
+
+    collection: str = ""
+
+    def __init__(self, backend: StorageBackend):
+        self.backend = backend
+        # Concurrent reads of one document share a single backend call
+        self.reads = ReadCoalescer(
+            self.collection,
+            lambda doc_id: run_blocking(self.backend.get, self.collection, doc_id),
+            lambda doc_ids: run_blocking(self.backend.get_many, self.collection, doc_ids)
+        )
+
+    async def _call(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        # Network-backed calls go to the storage thread pool; local backends
+        # answer immediately and are called inline
+        if self.backend.blocking:
+            return await run_blocking(func, *args, **kwargs)
+        return func(*args, **kwargs)
+
+    async def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        if self.backend.blocking:
+            return await self.reads.get(doc_id)
+        return self.backend.get(self.collection, doc_id)
+
+    async def set(self, doc_id: str, data: Dict[str, Any]):
+        try:
+            await self._call(self.backend.set, self.collection, doc_id, data)
+        finally:
+            self.reads.forget(doc_id)
+
+    async def update(self, doc_id: str, data: Dict[str, Any]):
+        try:
+            await self._call(self.backend.update, self.collection, doc_id, data)
+        finally:
+            self.reads.forget(doc_id)
+
+    async def delete(self, doc_id: str):
+        try:
+            await self._call(self.backend.delete, self.collection, doc_id)
+        finally:
+            self.reads.forget(doc_id)
+
+    async def _stream(self, **query) -> AsyncIterator[Dict[str, Any]]:
+        """Yield documents as the backend produces them"""
+        if self.backend.blocking:
+            async for doc in iterate_blocking(self.backend.stream(self.collection, **query)):
+                yield doc
+        else:
+            for doc in self.backend.stream(self.collection, **query):
+                yield doc
+
+    async def iter_all(self, order_by: Sequence[OrderBy], filters: Sequence[Filter] = (),
+                       page_size: int = 500, fields: Optional[Sequence[str]] = None
+                       ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield every matching document, fetching one keyset page at a time.
+
+        ``order_by`` must be a total order (end it with a unique field) so
+        pages neither skip nor repeat documents. When ``fields`` is given,
+        the ordering fields are fetched as well to continue from.
+        """
+        if fields is not None:
+            fields = list(dict.fromkeys([*fields, *(field for field, _ in order_by)]))
+        start_after = None
+        while True:
+            count = 0
+            last = None
+            async for doc in self._stream(
+                filters=filters,
+                order_by=order_by,
+                limit=page_size,
+                start_after=start_after,
+                fields=fields
+            ):
+                count += 1
+                last = doc
+                yield doc
+            if count < page_size:
+                return
+            start_after = [last[field] for field, _ in order_by]
+
+    async def commit(self, operations: List[Operation]):
+        """Apply write operations, at most MAX_BATCH_SIZE per atomic batch"""
+        try:
+            for start in range(0, len(operations), MAX_BATCH_SIZE):
+                await self._call(self.backend.commit, operations[start:start + MAX_BATCH_SIZE])
+        finally:
+            self.reads.forget(*(
+                operation[2] for operation in operations if operation[1] == self.collection
+            ))
+
+class UserRepository(Repository):
+    """Async access to the ``users`` collection"""
+
+    collection = "users"
+
+class FinanceRepository(Repository):
+    """Async access to the ``finance_records`` collection"""
+
+    collection = "finance_records"
+
+    def __init__(self, backend: StorageBackend, ledger: Optional[LedgerCache] = None):
+        super().__init__(backend)
+        # Optional write-through cache of hot users' records, see storage/ledger.py
+        self.ledger = ledger
+
+    async def get(self, record_id: str) -> Optional[Dict[str, Any]]:
+        if self.ledger is not None:
+            record = self.ledger.get_record(record_id)
+            if record is not None:
+                return record
+        return await super().get(record_id)
+
+    # Every write below also applies the matching deltas to the monthly
+    # summaries in the same atomic commit, see storage/summaries.py. Old
+    # values are always read from storage, inside the transaction that
+    # writes the change, since the deltas must match what is stored.
+
+    async def create(self, record_data: Dict[str, Any]):
+        await self.commit(
+            [("set", self.collection, record_data["id"], record_data)]
+            + summaries.increment_operations(summaries.record_deltas((record_data, 1)))
+        )
+        if self.ledger is not None:
+            self.ledger.put(record_data)
+
+    async def create_many(self, records: List[Dict[str, Any]]):
+        """Write records in atomic batches that also carry their summary increments.
+
+        Deltas are merged per user and month, so a statement import costs one
+        summary write per month rather than one per record. Up to
+        MAX_BATCH_SIZE // 2 records always fit in a single batch; when a later
+        batch of a larger call fails, the earlier ones stay written.
+        """
+        try:
+            for operations in summaries.batched_operations(records, self.collection, MAX_BATCH_SIZE):
+                await self._call(self.backend.commit, operations)
+        except Exception:
+            # Some batches may have been written; reload these users on demand
+            if self.ledger is not None:
+                for user_id in {record["user_id"] for record in records}:
+                    self.ledger.invalidate(user_id)
+            raise
+        finally:
+            self.reads.forget(*(record["id"] for record in records))
+        if self.ledger is not None:
+            for record in records:
+                self.ledger.put(record)
+
+    async def update(self, record_id: str, data: Dict[str, Any]):
+        def plan(old: Optional[Dict[str, Any]]) -> List[Operation]:
+            if old is None:
+                raise DocumentNotFound(f"{self.collection}/{record_id}")
+            new = {**old, **data}
+            return (
+                [("update", self.collection, record_id, data)]
+                + summaries.increment_operations(summaries.record_deltas((old, -1), (new, 1)))
+            )
+
+        try:
+            old = await self._call(self.backend.transact, self.collection, record_id, plan)
+        finally:
+            self.reads.forget(record_id)
+        if self.ledger is not None:
+            self.ledger.put({**old, **data})
+
+    async def delete(self, record_id: str):
+        def plan(old: Optional[Dict[str, Any]]) -> List[Operation]:
+            if old is None:
+                return []
+            return (
+                [("delete", self.collection, record_id)]
+                + summaries.increment_operations(summaries.record_deltas((old, -1)))
+            )
+
+        try:
+            old = await self._call(self.backend.transact, self.collection, record_id, plan)
+        finally:
+            self.reads.forget(record_id)
+        if self.ledger is not None and old is not None:
+            self.ledger.remove(record_id, old["user_id"])
+
+    async def summaries_for_user(self, user_id: str, from_month: Optional[str] = None,
+                                 to_month: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Monthly summaries of a user, oldest first; months are "YYYY-MM" """
+        filters = [("user_id", "==", user_id)]
+        if from_month:
+            filters.append(("month", ">=", from_month))
+        if to_month:
+            filters.append(("month", "<=", to_month))
+        return await self._call(lambda: list(self.backend.stream(
+            summaries.SUMMARY_COLLECTION,
+            filters=filters,
+            order_by=(("month", "asc"),)
+        )))
+
+    async def rebuild_summaries(self, user_id: str) -> int:
+        """Recompute a user's summaries from their records; returns the month count"""
+        deltas_by_key = {}
+        async for record in self._iter_stored_for_user(user_id):
+            summaries.add_record(deltas_by_key, record)
+
+        existing = await self.summaries_for_user(user_id)
+        operations = [
+            ("delete", summaries.SUMMARY_COLLECTION, summaries.summary_id(user_id, doc["month"]))
+            for doc in existing
+        ]
+        operations += [
+            ("set", summaries.SUMMARY_COLLECTION, summaries.summary_id(user_id, doc["month"]), doc)
+            for doc in summaries.summary_documents(deltas_by_key)
+        ]
+        await self.commit(operations)
+        return len(deltas_by_key)
+
+    async def iter_user_ids(self) -> AsyncIterator[str]:
+        """Yield each distinct user_id that has finance records"""
+        previous = None
+        async for record in self.iter_all(order_by=(("user_id", "asc"), ("id", "asc"))):
+            if record["user_id"] != previous:
+                previous = record["user_id"]
+                yield previous
+
+    # Newest first; id breaks ties between records on the same date so the
+    # ordering is total and usable as a keyset cursor
+    user_order: Sequence[OrderBy] = (("date", "desc"), ("id", "desc"))
+
+    def _user_filters(self, user_id: str, transaction_type: Optional[str],
+                      date_from: Optional[datetime] = None, date_to: Optional[datetime] = None) -> List[Filter]:
+        filters = [("user_id", "==", user_id)]
+        if transaction_type:
+            filters.append(("transaction_type", "==", transaction_type))
+        # Indexes, see firestore.indexes.json:
+        #   listing and paging - (user_id, [transaction_type,] date desc, id desc),
+        #     which also serve the date range since date leads the ordering
+        #   totals (aggregations, no ordering) - (user_id, [transaction_type,] date asc)
+        if date_from is not None:
+            filters.append(("date", ">=", date_from))
+        if date_to is not None:
+            filters.append(("date", "<", date_to))
+        return filters
+
+    def _cursor_for(self, record: Dict[str, Any]) -> str:
+        return encode_cursor([record[field] for field, _ in self.user_order])
+
+    async def _user_ledger(self, user_id: str) -> Optional[UserLedger]:
+        """The user's cached ledger, loading it once the user has become hot"""
+        if self.ledger is None:
+            return None
+        ledger = self.ledger.ledger(user_id)
+        if ledger is not None or not self.ledger.should_load(user_id):
+            return ledger
+        records = []
+        # One record over the cap is enough to know the user will not fit
+        page_size = min(MAX_BATCH_SIZE * 10, self.ledger.max_user_records + 1)
+        try:
+            async for record in self._iter_stored_for_user(user_id, page_size=page_size):
+                records.append(record)
+                if len(records) > self.ledger.max_user_records:
+                    break
+        except BaseException:
+            # Never install what a failed or cancelled load read so far
+            self.ledger.install(user_id, None)
+            raise
+        if len(records) > self.ledger.max_user_records:
+            self.ledger.skip(user_id)
+            return None
+        self.ledger.install(user_id, records)
+        return self.ledger.ledger(user_id)
+
+    async def list_for_user(self, user_id: str, transaction_type: Optional[str] = None,
+                            limit: int = 100, start_after: Optional[Sequence[Any]] = None,
+                            date_from: Optional[datetime] = None, date_to: Optional[datetime] = None
+                            ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Return one page of a user's records and the token for the next page.
+
+        ``date_from`` is inclusive and ``date_to`` exclusive.
+        """
+        ledger = await self._user_ledger(user_id)
+        if ledger is not None:
+            records = []
+            for entry in ledger.newest_first(start_after, transaction_type, date_from, date_to):
+                records.append(entry.to_dict())
+                if len(records) == limit:
+                    break
+            next_token = self._cursor_for(records[-1]) if len(records) == limit else None
+            return records, next_token
+
+        records = await self._call(lambda: list(self.backend.stream(
+            self.collection,
+            filters=self._user_filters(user_id, transaction_type, date_from, date_to),
+            order_by=self.user_order,
+            limit=limit,
+            start_after=start_after
+        )))
+        next_token = self._cursor_for(records[-1]) if len(records) == limit else None
+        return records, next_token
+
+    async def totals_for_user(self, user_id: str, transaction_types: Sequence[Optional[str]],
+                              date_from: Optional[datetime] = None, date_to: Optional[datetime] = None
+                              ) -> Dict[Optional[str], Dict[str, Any]]:
+        """Record count and amount sum for each given transaction type; None means all types.
+
+        Computed by the backend (Firestore aggregation queries, one per
+        type, run concurrently) or from the ledger cache when the user is
+        already cached; records are never fetched for this.
+        """
+        ledger = self.ledger.ledger(user_id) if self.ledger is not None else None
+        if ledger is None:
+            results = await asyncio.gather(*(
+                self._call(
+                    self.backend.aggregate,
+                    self.collection,
+                    self._user_filters(user_id, name, date_from, date_to),
+                    "amount"
+                )
+                for name in transaction_types
+            ))
+            return dict(zip(transaction_types, results))
+
+        totals = {name: {"count": 0, "sum": 0} for name in transaction_types}
+        for entry in ledger.newest_first(None, None, date_from, date_to):
+            for name in (entry.transaction_type, None):
+                if name in totals:
+                    totals[name]["count"] += 1
+                    totals[name]["sum"] += entry.amount
+        return totals
+
+    async def iter_for_user(self, user_id: str, transaction_type: Optional[str] = None,
+                            page_size: int = 500, date_from: Optional[datetime] = None,
+                            date_to: Optional[datetime] = None, fields: Optional[Sequence[str]] = None
+                            ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield every record of a user, newest first.
+
+        Fetches one keyset page at a time, or reads the ledger cache when
+        the user is cached. ``date_from`` is inclusive and ``date_to``
+        exclusive.
+        """
+        ledger = await self._user_ledger(user_id)
+        if ledger is not None:
+            if fields is not None:
+                # Same projection as iter_all(), which adds the ordering fields
+                fields = list(dict.fromkeys([*fields, *(field for field, _ in self.user_order)]))
+            # Snapshot first: writes may change the ledger while we yield
+            for entry in list(ledger.newest_first(None, transaction_type, date_from, date_to)):
+                record = entry.to_dict()
+                yield record if fields is None else {field: record[field] for field in fields if field in record}
+            return
+        async for record in self._iter_stored_for_user(
+            user_id, transaction_type, page_size, date_from, date_to, fields
+        ):
+            yield record
+
+    async def _iter_stored_for_user(self, user_id: str, transaction_type: Optional[str] = None,
+                                    page_size: int = 500, date_from: Optional[datetime] = None,
+                                    date_to: Optional[datetime] = None, fields: Optional[Sequence[str]] = None
+                                    ) -> AsyncIterator[Dict[str, Any]]:
+        async for record in self.iter_all(
+            order_by=self.user_order,
+            filters=self._user_filters(user_id, transaction_type, date_from, date_to),
+            page_size=page_size,
+            fields=fields
+        ):
+            yield record
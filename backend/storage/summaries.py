@@ -0,0 +1,107 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+from storage.backends import utc_datetime
+
+# Monthly rollups of finance_records, one document per user and month:
+#   {user_id, month: "YYYY-MM", totals: {type: amount}, counts: {type: n},
+#    categories: {category: amount}}
+# They are kept current with signed deltas on every record write, so reading
+# a user's history costs one document per month instead of one per record.
+SUMMARY_COLLECTION = "finance_summaries"
+
+SummaryKey = Tuple[str, str]  # (user_id, month)
+
+def record_month(value: Any) -> str:
+    """Month of a record date in UTC, the form Firestore hands it back in"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return utc_datetime(value).strftime("%Y-%m")
+
+def summary_id(user_id: str, month: str) -> str:
+    return f"{user_id}_{month}"
+
+def empty_deltas() -> Dict[str, Dict[str, float]]:
+    return {"totals": defaultdict(float), "counts": defaultdict(int), "categories": defaultdict(float)}
+
+def add_record(deltas_by_key: Dict[SummaryKey, Dict[str, Dict[str, float]]],
+               record: Dict[str, Any], sign: int = 1):
+    """Accumulate a record's contribution (sign=-1 removes it) into per-month deltas"""
+    key = (record["user_id"], record_month(record["date"]))
+    deltas = deltas_by_key.get(key)
+    if deltas is None:
+        deltas = deltas_by_key[key] = empty_deltas()
+    amount = float(record.get("amount") or 0)
+    deltas["totals"][record["transaction_type"]] += sign * amount
+    deltas["counts"][record["transaction_type"]] += sign
+    deltas["categories"][record["category"]] += sign * amount
+
+def record_deltas(*changes: Tuple[Dict[str, Any], int]) -> Dict[SummaryKey, Dict[str, Dict[str, float]]]:
+    """Per-month deltas for a set of (record, sign) changes"""
+    deltas_by_key: Dict[SummaryKey, Dict[str, Dict[str, float]]] = {}
+    for record, sign in changes:
+        add_record(deltas_by_key, record, sign)
+    return deltas_by_key
+
+def batched_operations(records: List[Dict[str, Any]], collection: str,
+                       max_operations: int) -> List[List[tuple]]:
+    """Batches that each set some records along with their summary increments.
+
+    Records are packed in order while the record writes plus one increment
+    per (user, month) they touch fit in ``max_operations``, so every batch
+    can be committed atomically.
+    """
+    batches = []
+    chunk: List[Dict[str, Any]] = []
+    keys = set()
+
+    def flush():
+        batches.append(
+            [("set", collection, record["id"], record) for record in chunk]
+            + increment_operations(record_deltas(*((record, 1) for record in chunk)))
+        )
+
+    for record in records:
+        key = (record["user_id"], record_month(record["date"]))
+        if chunk and len(chunk) + 1 + len(keys | {key}) > max_operations:
+            flush()
+            chunk, keys = [], set()
+        chunk.append(record)
+        keys.add(key)
+    if chunk:
+        flush()
+    return batches
+
+def increment_operations(deltas_by_key: Dict[SummaryKey, Dict[str, Dict[str, float]]]) -> List[tuple]:
+    """Storage operations that apply per-month deltas to the summary documents"""
+    operations = []
+    for (user_id, month), deltas in deltas_by_key.items():
+        changes = {
+            group: {name: value for name, value in values.items() if value}
+            for group, values in deltas.items()
+        }
+        changes = {group: values for group, values in changes.items() if values}
+        if not changes:
+            continue
+        operations.append((
+            "increment",
+            SUMMARY_COLLECTION,
+            summary_id(user_id, month),
+            changes,
+            {"user_id": user_id, "month": month}
+        ))
+    return operations
+
+def summary_documents(deltas_by_key: Dict[SummaryKey, Dict[str, Dict[str, float]]]) -> List[Dict[str, Any]]:
+    """Full summary documents for accumulated deltas, as written by a rebuild"""
+    return [
+        {
+            "user_id": user_id,
+            "month": month,
+            "totals": dict(deltas["totals"]),
+            "counts": dict(deltas["counts"]),
+            "categories": dict(deltas["categories"])
+        }
+        for (user_id, month), deltas in sorted(deltas_by_key.items())
+    ]
@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+# Tests import the backend's top-level packages (main, storage, ml, ...) the
+# way the server does, from the backend directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Never reach out to Firestore or load models in the background from a test
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("PREWARM_MODELS", "0")
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from main import app
+
+    with TestClient(app) as client:
+        yield client
+
+@pytest.fixture
+def profile() -> dict:
+    return {
+        "name": "Test", "age": 30, "gender": "female", "occupation": "engineer",
+        "maritalStatus": "single", "numberOfDependents": 0, "annualIncome": 1200000,
+        "monthlyIncome": 100000, "monthlyExpenses": 50000, "currentNetWorth": 500000,
+        "investedAsset": 200000, "riskTakingAbility": "medium", "preferredInvestmentHorizon": "long",
+        "primaryFinancialGoal": "retirement", "goalTimelineYears": 25, "monthlySurplus": 30000,
+        "startingPrincipal": 100000, "liquidityPreference": "medium", "loan": 0, "insurance": 0
+    }
@@ -0,0 +1,31 @@
+import threading
+
+from ml.registry import model_registry
+
+def test_activate_loads_the_model_off_the_event_loop(client, monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    calls = []
+
+    def activate(model_type, version):
+        calls.append((model_type, version, threading.current_thread()))
+        return {"model_type": model_type, "active_version": version}
+
+    monkeypatch.setattr(model_registry, "activate", activate)
+    event_loop_thread = client.portal.call(threading.current_thread)
+    response = client.post(
+        "/api/admin/models/retirement/activate", params={"version": "v2"},
+        headers={"X-Admin-Token": "secret"}
+    )
+    assert response.status_code == 200
+    assert response.json()["active_version"] == "v2"
+    [(model_type, version, thread)] = calls
+    assert (model_type, version) == ("retirement", "v2")
+    assert thread is not event_loop_thread
+
+def test_activate_unknown_version_is_not_found(client, monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    response = client.post(
+        "/api/admin/models/retirement/activate", params={"version": "does-not-exist"},
+        headers={"X-Admin-Token": "secret"}
+    )
+    assert response.status_code == 404
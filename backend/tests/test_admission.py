@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from monitoring.admission import ConcurrencyLimiter, Rejected
+
+async def _waiting(limiter: ConcurrencyLimiter) -> asyncio.Task:
+    """Start an acquire() that has to queue, and let it reach the queue"""
+    task = asyncio.ensure_future(limiter.acquire(retry_after=1.0))
+    await asyncio.sleep(0)
+    assert limiter.queued == 1
+    return task
+
+def test_cancel_after_timeout_does_not_release_a_slot():
+    async def scenario():
+        limiter = ConcurrencyLimiter(max_concurrent=1, max_queue=1, queue_timeout=60)
+        await limiter.acquire(retry_after=1.0)
+        waiter = await _waiting(limiter)
+        # The queue timeout rejects the waiter, and the client disconnects
+        # before the waiter gets to run again
+        limiter._expire(limiter._waiters[0], 1.0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return limiter
+
+    limiter = asyncio.run(scenario())
+    assert limiter.active == 1
+    assert limiter.queued == 0
+
+def test_cancel_after_grant_releases_the_slot():
+    async def scenario():
+        limiter = ConcurrencyLimiter(max_concurrent=1, max_queue=1, queue_timeout=60)
+        await limiter.acquire(retry_after=1.0)
+        waiter = await _waiting(limiter)
+        # The slot is handed over just as the client disconnects
+        limiter.release()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return limiter
+
+    limiter = asyncio.run(scenario())
+    assert limiter.active == 0
+
+def test_queue_timeout_rejects_and_keeps_the_limit():
+    async def scenario():
+        limiter = ConcurrencyLimiter(max_concurrent=1, max_queue=1, queue_timeout=0.01)
+        await limiter.acquire(retry_after=1.0)
+        with pytest.raises(Rejected) as rejected:
+            await limiter.acquire(retry_after=1.0)
+        assert rejected.value.reason == "queue_timeout"
+        # A full queue is rejected right away
+        waiter = await _waiting(limiter)
+        with pytest.raises(Rejected) as rejected:
+            await limiter.acquire(retry_after=1.0)
+        assert rejected.value.reason == "queue_full"
+        limiter.release()
+        await waiter
+        return limiter
+
+    limiter = asyncio.run(scenario())
+    assert limiter.active == 1
+    assert limiter.queued == 0
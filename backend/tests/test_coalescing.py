@@ -0,0 +1,64 @@
+import asyncio
+
+from storage.coalescing import ReadCoalescer
+
+class Backend:
+    """Counts fetches; each one waits until released"""
+
+    def __init__(self, error: Exception = None):
+        self.calls = 0
+        self.error = error
+        self.release = asyncio.Event()
+
+    async def fetch_one(self, doc_id: str):
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return {"id": doc_id, "nested": {"value": 1}}
+
+    async def fetch_many(self, doc_ids):
+        return {doc_id: await self.fetch_one(doc_id) for doc_id in doc_ids}
+
+async def _concurrent_gets(backend: Backend, count: int):
+    reads = ReadCoalescer("test", backend.fetch_one, backend.fetch_many, batch_window=0)
+    tasks = [asyncio.ensure_future(reads.get("doc")) for _ in range(count)]
+    await asyncio.sleep(0)
+    backend.release.set()
+    return await asyncio.gather(*tasks, return_exceptions=True)
+
+def test_concurrent_identical_reads_share_one_fetch():
+    async def scenario():
+        backend = Backend()
+        return backend, await _concurrent_gets(backend, 10)
+
+    backend, results = asyncio.run(scenario())
+    assert backend.calls == 1
+    assert all(result == {"id": "doc", "nested": {"value": 1}} for result in results)
+    # Every caller but the first gets its own copy
+    results[1]["nested"]["value"] = 2
+    assert results[0]["nested"]["value"] == 1
+    assert results[2]["nested"]["value"] == 1
+
+def test_fetch_error_reaches_every_waiter():
+    error = RuntimeError("backend down")
+
+    async def scenario():
+        backend = Backend(error)
+        return backend, await _concurrent_gets(backend, 5)
+
+    backend, results = asyncio.run(scenario())
+    assert backend.calls == 1
+    assert len(results) == 5
+    assert all(result is error for result in results)
+
+def test_reads_after_completion_fetch_again():
+    async def scenario():
+        backend = Backend()
+        backend.release.set()
+        reads = ReadCoalescer("test", backend.fetch_one, backend.fetch_many, batch_window=0)
+        await reads.get("doc")
+        await reads.get("doc")
+        return backend.calls
+
+    assert asyncio.run(scenario()) == 2
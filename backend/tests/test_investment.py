@@ -0,0 +1,14 @@
+from monitoring.metrics import predictor_duration
+
+def _optimizer_calls() -> int:
+    entry = predictor_duration._values.get(("optimize_investment_allocation", "ok"))
+    return sum(entry[0]) if entry else 0
+
+def test_optimizer_mode_runs_on_the_inference_executor(client, profile):
+    before = _optimizer_calls()
+    response = client.post("/api/predict/investment?mode=optimizer", json=profile)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["mode"] == "optimizer"
+    assert sum(body["allocation"].values()) == 100
+    assert _optimizer_calls() == before + 1
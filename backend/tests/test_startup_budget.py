@@ -0,0 +1,23 @@
+import os
+import statistics
+
+from manage import probe_startup
+
+# Seconds from process launch until the app is ready to serve requests;
+# raise STARTUP_BUDGET_S on slow CI machines
+STARTUP_BUDGET_S = float(os.getenv("STARTUP_BUDGET_S", "3"))
+RUNS = 3
+
+def test_startup_is_within_budget():
+    runs = [probe_startup() for _ in range(RUNS)]
+    ready = statistics.median(run["ready_s"] for run in runs)
+    assert ready < STARTUP_BUDGET_S, (
+        f"App took {ready:.2f}s to become ready (median of {RUNS}), over the {STARTUP_BUDGET_S:.2f}s budget; "
+        f"slowest imports: {sorted(runs[-1]['imports'].items(), key=lambda item: -item[1])[:5]}"
+    )
+
+def test_startup_does_not_import_model_libraries():
+    # Models load in the background after startup, see lifespan() in main.py
+    imports = probe_startup()["imports"]
+    assert "sklearn" not in imports
+    assert "joblib" not in imports
@@ -0,0 +1,74 @@
+import asyncio
+from datetime import datetime, timezone
+
+from storage import summaries
+from storage.backends import MemoryBackend
+from storage.repositories import FinanceRepository
+
+def record(record_id: str, user_id: str, date: datetime, transaction_type: str, amount: float,
+           category: str) -> dict:
+    return {
+        "id": record_id, "user_id": user_id, "date": date, "transaction_type": transaction_type,
+        "amount": amount, "category": category, "created_at": date
+    }
+
+def normalized(docs) -> list:
+    """Summary documents without zero entries, with amounts rounded"""
+    return [
+        {
+            "month": doc["month"],
+            **{
+                group: {name: round(value, 6) for name, value in doc.get(group, {}).items() if round(value, 6)}
+                for group in ("totals", "counts", "categories")
+            }
+        }
+        for doc in docs
+    ]
+
+async def recomputed(finance: FinanceRepository, user_id: str) -> list:
+    records = [doc for doc in finance.backend.stream(finance.collection) if doc["user_id"] == user_id]
+    return summaries.summary_documents(summaries.record_deltas(*((doc, 1) for doc in records)))
+
+def test_summaries_match_a_recompute_after_every_kind_of_write():
+    async def scenario():
+        finance = FinanceRepository(MemoryBackend())
+        checks = []
+
+        async def check():
+            for user_id in ("u1", "u2"):
+                checks.append((
+                    normalized(await finance.summaries_for_user(user_id)),
+                    normalized(await recomputed(finance, user_id))
+                ))
+
+        await finance.create(record("r1", "u1", datetime(2024, 1, 5), "income", 1000.1, "salary"))
+        await finance.create(record("r2", "u1", datetime(2024, 1, 31, 23, tzinfo=timezone.utc),
+                                    "expense", 200.2, "food"))
+        await check()
+
+        await finance.create_many([
+            record(f"b{i}", "u1" if i % 3 else "u2", datetime(2024, 1 + i % 4, 1 + i % 28),
+                   ("income", "expense", "investment")[i % 3], 10.5 * i, f"cat{i % 5}")
+            for i in range(300)
+        ])
+        await check()
+
+        # Moves the record to another month, type and category
+        await finance.update("r1", {"date": datetime(2024, 3, 2), "transaction_type": "investment",
+                                    "category": "stocks"})
+        await finance.update("b4", {"amount": 0.3})
+        await check()
+
+        await finance.delete("r2")
+        await finance.delete("b5")
+        await finance.delete("missing")
+        await check()
+
+        # A rebuild writes exactly what the increments produced
+        before = normalized(await finance.summaries_for_user("u1"))
+        await finance.rebuild_summaries("u1")
+        checks.append((normalized(await finance.summaries_for_user("u1")), before))
+        return checks
+
+    for stored, expected in asyncio.run(scenario()):
+        assert stored == expected
@@ -0,0 +1,50 @@
+import pytest
+
+from ml.sweep import retirement_sweep
+
+def sweep(client, profile, **ranges):
+    return client.post("/api/predict/retirement/sweep", json={"user_profile": profile, **ranges})
+
+def test_sweep_grid(client, profile):
+    response = sweep(
+        client, profile,
+        retirement_age={"start": 55, "stop": 60, "step": 5},
+        annual_return={"start": 0.08, "stop": 0.12, "step": 0.02}
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["axes"]["retirement_age"] == [55, 60]
+    assert len(body["monthly_sip"]) == 2
+    assert len(body["monthly_sip"][0][0]) == 3
+
+@pytest.mark.parametrize("ranges", [
+    {"annual_return": {"start": 1e300, "stop": 1e300}},
+    {"inflation": {"start": 0, "stop": 1e308, "step": 1e300}},
+    {"retirement_age": {"start": 60, "stop": 10000}},
+    {"sip_step_up": {"start": -5, "stop": 0, "step": 0.1}},
+    {"annual_return": {"start": 0.1, "stop": 0.05, "step": 0.01}},
+    {"annual_return": {"start": 0, "stop": 0.2, "step": 1e-300}},
+    {
+        "sip_step_up": {"start": 0, "stop": 0.5, "step": 0.01},
+        "annual_return": {"start": 0, "stop": 0.5, "step": 0.01},
+        "inflation": {"start": 0, "stop": 0.5, "step": 0.01},
+    },
+])
+def test_out_of_range_sweeps_are_rejected(client, profile, ranges):
+    assert sweep(client, profile, **ranges).status_code == 422
+
+def test_unrepresentable_sip_is_a_client_error(client, profile):
+    # The range bounds hold, but a profile this far from retirement has no
+    # finite SIP
+    response = client.post("/api/predict/retirement/sweep", json={
+        "user_profile": {**profile, "age": -100000},
+        "retirement_age": {"start": 60, "stop": 60},
+        "annual_return": {"start": 1, "stop": 1}
+    })
+    assert response.status_code == 400
+
+def test_retirement_sweep_raises_value_error_on_overflow():
+    with pytest.raises(ValueError):
+        retirement_sweep(-100000, 1200000, [60], [0.0], [1.0], [0.0])
+    with pytest.raises(ValueError):
+        retirement_sweep(-100000, 1200000, [60], [0.1], [1.0], [0.0])
@@ -120,6 +120,12 @@ export const predictionAPI = {
       body: JSON.stringify(userProfile),
     }),
 
+  getCombinedPrediction: (userProfile) =>
+    apiRequest("/predict/combined", {
+      method: "POST",
+      body: JSON.stringify(userProfile),
+    }),
+
   getGeneralPrediction: (userProfile, predictionType) =>
     apiRequest("/predict/", {
       method: "POST",